@@ -0,0 +1,122 @@
+import re
+import itertools
+import numpy as np
+import config
+
+MONTHS = {m: i + 1 for i, m in enumerate(
+    ["january", "february", "march", "april", "may", "june", "july",
+     "august", "september", "october", "november", "december"])}
+# Cumulative deadlines only: "in March" / "in June" are disjoint windows, not a ladder
+DATE_RE = re.compile(r'\b(?:by|before)\s+(?:the\s+end\s+of\s+)?(' + '|'.join(MONTHS) + r')(?:\s+(\d{1,2})(?!\d))?(?:,?\s+(\d{4}))?', re.I)
+
+def date_ladder_implications(markets):
+    """
+    Find "by March" / "by June" style ladders: questions identical except for a
+    deadline. An earlier deadline implies every later one.
+    Returns [(sub_idx, master_idx), ...] (sub implies master).
+    """
+    ladders = {}
+    for i, m in enumerate(markets):
+        q = (m.get('question') or '').lower()
+        match = DATE_RE.search(q)
+        if not match: continue
+        month, day, year = match.group(1), match.group(2), match.group(3)
+        base = (q[:match.start()] + q[match.end():]).strip(' ?')
+        key = (int(year) if year else 0, MONTHS[month.lower()], int(day) if day else 31)
+        ladders.setdefault(base, []).append((key, i))
+
+    edges = []
+    for rungs in ladders.values():
+        # Undated rungs can't be ordered against dated ones: skip mixed ladders
+        if len({k[0] == 0 for k, _ in rungs}) > 1: continue
+        rungs.sort()
+        for (k1, a), (k2, b) in zip(rungs, rungs[1:]):
+            if k1 != k2: edges.append((a, b))
+    return edges
+
+def enumerate_states(n, exclusive=False, exhaustive=False, implications=()):
+    """
+    All outcome vectors (1 = that market resolves YES) consistent with the constraints.
+    exclusive: at most one YES; exhaustive: at least one YES;
+    implications: [(sub, master)] meaning sub YES forces master YES.
+    """
+    if exclusive:
+        states = [tuple(1 if j == i else 0 for j in range(n)) for i in range(n)]
+        if not exhaustive: states.append((0,) * n)
+    else:
+        states = itertools.product((0, 1), repeat=n)
+    out = []
+    for s in states:
+        if exhaustive and not any(s): continue
+        if any(s[sub] and not s[master] for sub, master in implications): continue
+        out.append(s)
+    return np.array(out, dtype=np.float64).reshape(-1, n)
+
+def solve_basket(legs, states, budget_usd, fee_pct=None):
+    """
+    Small LP over buy legs. legs: [{'market': idx, 'outcome': 'yes'|'no', 'price', 'size', ...}]
+    Maximize the guaranteed profit t such that, in every feasible state,
+        payout(state) - cost >= t,   cost <= budget,   0 <= shares <= visible size.
+    Returns (basket_legs_with_shares, cost, guaranteed_profit) or None.
+    """
+    from scipy.optimize import linprog
+
+    if fee_pct is None: fee_pct = config.FEE_PCT
+    fee_mult = 1 + fee_pct / 100
+    n_legs = len(legs)
+    prices = np.array([l['price'] * fee_mult for l in legs])
+
+    # Payout of one share of each leg in each state
+    payout = np.zeros((len(states), n_legs))
+    for j, l in enumerate(legs):
+        col = states[:, l['market']]
+        payout[:, j] = col if l['outcome'] == 'yes' else 1 - col
+
+    # Variables: [x_0..x_{L-1}, t]; minimize -t
+    c = np.zeros(n_legs + 1)
+    c[-1] = -1.0
+    # t - (payout @ x - prices @ x) <= 0  for every state
+    a_states = np.hstack([-(payout - prices), np.ones((len(states), 1))])
+    a_budget = np.append(prices, 0.0)[None, :]
+    a_ub = np.vstack([a_states, a_budget])
+    b_ub = np.append(np.zeros(len(states)), budget_usd)
+    bounds = [(0, l['size']) for l in legs] + [(None, None)]
+
+    res = linprog(c, A_ub=a_ub, b_ub=b_ub, bounds=bounds, method='highs')
+    if not res.success: return None
+    shares = res.x[:-1]
+    profit = float(res.x[-1])
+    cost = float(prices @ shares)
+    if profit <= 0 or cost <= 0: return None
+    basket = [dict(l, shares=float(s)) for l, s in zip(legs, shares) if s > 1e-6]
+    return basket, cost, profit
+
+class GroupArbSolver:
+    """
+    Batched per event group; the last result is reused until any leg's quote
+    (or the group's constraint set) changes.
+    """
+    def __init__(self):
+        self.cache = {}  # {group_key: (signature, result)}
+        self.solves = 0
+        self.reuses = 0
+
+    def solve(self, group_key, legs, states, budget_usd):
+        signature = (states.shape, hash(states.tobytes()),
+                     tuple((l['token'], round(l['price'], 4), round(l['size'], 2)) for l in legs))
+        cached = self.cache.get(group_key)
+        if cached and cached[0] == signature:
+            self.reuses += 1
+            return cached[1]
+        self.solves += 1
+        try:
+            result = solve_basket(legs, states, budget_usd)
+        except Exception as e:
+            print(f"Arb solver error ({group_key}): {e}")
+            result = None
+        self.cache[group_key] = (signature, result)
+        return result
+
+    def prune(self, live_keys):
+        for k in [k for k in self.cache if k not in live_keys]:
+            del self.cache[k]
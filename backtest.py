@@ -10,10 +10,95 @@ import config
 from cross_scanner import get_vwap_price as calc_vwap
 from poly_scanner import calculate_kelly_size, get_dynamic_threshold, check_internal_arbitrage
 from maker_scanner import check_maker_opportunity
-from hf_scanner import check_hf_arbitrage
+from hf_scanner import check_hf_arbitrage, hf_signal, get_vwap_price as hf_vwap, HF_TARGET_TRADE_SIZE, HF_MIN_PROFIT_PCT
+from maker_strategy import maker_signal
 from cross_scanner import check_cross_platform_arb
+from book_model import parse_poly_price
+from columnar_archive import ArchiveWriter, read_snapshots, convert_jsonl
 
 ARCHIVE_FILE = "market_archive.jsonl"
+COLUMNAR_ARCHIVE_FILE = "market_archive.pmca"
+
+def strategy_params(**overrides):
+    """Tunable strategy parameters (current config / module values), with overrides by name."""
+    params = {
+        "MAKER_MIN_PROFIT_PCT": config.MAKER_MIN_PROFIT_PCT,
+        "MAKER_MAX_QUEUE_DEPTH_USD": getattr(config, 'MAKER_MAX_QUEUE_DEPTH_USD', 500),
+        "MIN_LIQUIDITY_USD": getattr(config, 'MIN_LIQUIDITY_USD', 10.0),
+        "HF_MIN_PROFIT_PCT": HF_MIN_PROFIT_PCT,
+    }
+    params.update(overrides)
+    return params
+
+class MarketFeatures:
+    """
+    Parameter-independent inputs of the simulated strategies for one archived market row.
+    Computed once per row, so re-evaluating with other parameters skips parsing and VWAPs.
+    """
+    FIELDS = ('volume24hr', 'y_bid', 'n_bid', 'y_depth', 'n_depth', 'hf_y', 'hf_n', 'internal', 'is_hf')
+    __slots__ = FIELDS
+
+    def __init__(self, volume24hr, y_bid, n_bid, y_depth, n_depth, hf_y, hf_n, internal, is_hf):
+        self.volume24hr = volume24hr
+        self.y_bid = y_bid          # Best bids and USD depth resting at them
+        self.n_bid = n_bid
+        self.y_depth = y_depth
+        self.n_depth = n_depth
+        self.hf_y = hf_y            # VWAP asks for the HF ticket (0 = too thin)
+        self.hf_n = hf_n
+        self.internal = internal    # Taker internal arb at $200 (no tunable parameters)
+        self.is_hf = is_hf          # "Up or Down" market
+
+def market_features(m, ob):
+    y_bids = ob.get('yes', {}).get('bids', [])
+    n_bids = ob.get('no', {}).get('bids', [])
+    y_bid, n_bid = get_best_bid(y_bids), get_best_bid(n_bids)
+    is_hf = "Up or Down" in m.get('question', '')
+    hf_y = hf_n = 0.0
+    if is_hf:
+        hf_y = hf_vwap(ob.get('yes', {}).get('asks', []), HF_TARGET_TRADE_SIZE / 2) or 0.0
+        hf_n = hf_vwap(ob.get('no', {}).get('asks', []), HF_TARGET_TRADE_SIZE / 2) or 0.0
+    try: vol = float(m.get('volume24hr', 0) or 0)
+    except (TypeError, ValueError): vol = 0.0
+    return MarketFeatures(vol, y_bid, n_bid, get_liquidity_depth(y_bids, y_bid), get_liquidity_depth(n_bids, n_bid),
+                          hf_y, hf_n, _sim_poly_internal(ob), is_hf)
+
+def maker_hit(f, params):
+    """Maker (split) entry on archived features. Returns the spread profit % or None."""
+    if f.volume24hr < getattr(config, 'MIN_VOLUME_24H', 10000): return None
+    if not config.MAKER_ALLOW_DEAD_MARKETS:
+        # Must have at least X cents of bids on both sides to be "Alive"
+        if f.y_bid < config.MAKER_MIN_SIDE_PRICE or f.n_bid < config.MAKER_MIN_SIDE_PRICE: return None
+    status, profit_pct = maker_signal(f.y_bid, f.y_depth, f.n_bid, f.n_depth,
+                                      min_profit_pct=params["MAKER_MIN_PROFIT_PCT"],
+                                      max_depth_usd=params["MAKER_MAX_QUEUE_DEPTH_USD"],
+                                      min_liquidity_usd=params["MIN_LIQUIDITY_USD"])
+    return profit_pct if status == "trade" else None
+
+def hf_hit(f, params):
+    """HF taker arb on archived features. Returns the profit % or None."""
+    if not f.is_hf: return None
+    hit = hf_signal(f.hf_y, f.hf_n, min_profit_pct=params["HF_MIN_PROFIT_PCT"])
+    return hit[1] if hit else None
+
+def get_best_bid(orders):
+    prices = [p for p in (parse_poly_price(o.get('price')) for o in orders or []) if p is not None]
+    return max(prices) if prices else 0.0
+
+def get_liquidity_depth(orders, best_p):
+    """USD resting at the best bid."""
+    if not orders or not best_p: return 0.0
+    return sum(float(o.get('size', 0)) * best_p for o in orders if parse_poly_price(o.get('price')) == best_p)
+
+def _sim_poly_internal(ob):
+    try:
+        y_book = ob.get('yes', {}).get('asks', [])
+        n_book = ob.get('no', {}).get('asks', [])
+        p1 = calc_vwap(y_book, 200)
+        p2 = calc_vwap(n_book, 200)
+        if p1 and p2 and (p1 + p2 < 0.99): return True
+    except: pass
+    return False
 
 class BacktestEngine:
     """
@@ -27,7 +112,7 @@ class BacktestEngine:
         """Fetch and return a complete snapshot of all active markets and their orderbooks."""
         print(f"[{datetime.now().strftime('%H:%M:%S')}] Collecting snapshot (Parallel)...")
         p_active = self.poly.fetch_active_markets(config.MIN_VOLUME_24H, config.MAX_P_MARKETS)
-        k_active = self.kalshi.fetch_active_markets(config.MAX_K_MARKETS)
+        k_active = self.kalshi.fetch_active_markets(config.MAX_K_MARKETS) or []
         
         snapshot = {
             "timestamp": datetime.now().isoformat(),
@@ -62,23 +147,55 @@ class BacktestEngine:
         return snapshot
 
     def run_collector(self, interval_sec=300, once=False):
-        """Continuously collect data and append to jsonl file."""
-        print(f"Data Collector started. Saving to {ARCHIVE_FILE}. Interval: {interval_sec}s")
-        
-        while True:
-            try:
-                snap = self.collect_snapshot()
-                with open(ARCHIVE_FILE, 'a', encoding='utf-8') as f:
-                    f.write(json.dumps(snap) + "\n")
-                    f.flush()
-                print(f"  - Snapshot recorded safely to {ARCHIVE_FILE}")
-                if once: break
-                time.sleep(interval_sec)
-            except KeyboardInterrupt:
-                break
-            except Exception as e:
-                print(f"Collector Error: {e}")
-                time.sleep(60)
+        """Continuously collect data and append to the archive (columnar or jsonl, see config.ARCHIVE_FORMAT)."""
+        columnar = getattr(config, 'ARCHIVE_FORMAT', 'columnar') == 'columnar'
+        archive_file = COLUMNAR_ARCHIVE_FILE if columnar else ARCHIVE_FILE
+        print(f"Data Collector started. Saving to {archive_file}. Interval: {interval_sec}s")
+        # Kept open across snapshots: a chunk (plus footer) is written every ARCHIVE_CHUNK_SNAPSHOTS
+        writer = ArchiveWriter(archive_file, getattr(config, 'ARCHIVE_CHUNK_SNAPSHOTS', 12)) if columnar else None
+
+        try:
+            while True:
+                try:
+                    snap = self.collect_snapshot()
+                    if writer:
+                        writer.append(snap)
+                        n = len(writer.pending)
+                        print(f"  - Snapshot buffered ({n}/{writer.chunk_snapshots})" if n else f"  - Chunk written to {archive_file}")
+                    else:
+                        with open(archive_file, 'a', encoding='utf-8') as f:
+                            f.write(json.dumps(snap) + "\n")
+                            f.flush()
+                        print(f"  - Snapshot recorded safely to {archive_file}")
+                    if once: break
+                    time.sleep(interval_sec)
+                except KeyboardInterrupt:
+                    break
+                except Exception as e:
+                    print(f"Collector Error: {e}")
+                    time.sleep(60)
+        finally:
+            if writer: writer.close()
+
+    def record_ticks(self, report_sec=60):
+        """Record every WS book event of the active markets (tick_recorder segments) until Ctrl-C."""
+        from ws_client import poly_ws
+        from tick_recorder import tick_recorder
+        p_active = self.poly.fetch_active_markets(config.MIN_VOLUME_24H, config.MAX_P_MARKETS)
+        token_ids = [tid for m in p_active for tid in json.loads(m.get('clobTokenIds', '[]'))]
+        tick_recorder.attach(poly_ws)
+        poly_ws.start()
+        time.sleep(2)
+        poly_ws.subscribe(token_ids)
+        print(f"Tick recorder started: {len(token_ids)} tokens -> {tick_recorder.directory}/")
+        try:
+            while True:
+                time.sleep(report_sec)
+                s = tick_recorder.get_status()
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] {s['recorded']} events, {s['dropped']} dropped, "
+                      f"{s['queued']} queued (peak {s['queue_hwm']}), {s['bytes'] / 1e6:.1f}MB in {s['segments']} segments")
+        except KeyboardInterrupt:
+            tick_recorder.stop()
 
     def _check_internal_sim(self, m, ob):
         # 1. Sniper Strategy (Taker): Check Asks
@@ -119,10 +236,16 @@ class BacktestEngine:
         
         return None
 
-    def analyze_archive(self, file_path):
+    def iter_archive(self, file_path):
+        """Snapshots from a columnar archive or a JSONL file (format auto-detected)."""
+        return read_snapshots(file_path)
+
+    def analyze_archive(self, file_path, params=None):
         """
         Replay ALL strategies against archived data.
+        params: strategy_params() overrides (default: current config).
         """
+        params = params or strategy_params()
         print(f"Deep Backtest Analysis: {file_path}")
         stats = {
             "POLY_INTERNAL": 0,
@@ -136,43 +259,40 @@ class BacktestEngine:
         maker_hits = [] 
 
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    snap = json.loads(line)
-                    p_markets = snap.get('poly_markets', [])
-                    k_markets = snap.get('kalshi_markets', [])
+            for snap in self.iter_archive(file_path):
+                p_markets = snap.get('poly_markets', [])
+                k_markets = snap.get('kalshi_markets', [])
+                
+                for row in p_markets:
+                    m = row['market']
+                    ob = row['orderbook']
+                    f = market_features(m, ob)
                     
-                    for row in p_markets:
-                        m = row['market']
-                        ob = row['orderbook']
-                        
-                        # 1. POLY INTERNAL
-                        if self._sim_poly_internal(m, ob): stats["POLY_INTERNAL"] += 1
-                        
-                        # 2. HF SCALPING
-                        if self._sim_hf(m, ob): stats["HF_SCALPING"] += 1
+                    # 1. POLY INTERNAL
+                    if f.internal: stats["POLY_INTERNAL"] += 1
+                    
+                    # 2. HF SCALPING
+                    if hf_hit(f, params) is not None: stats["HF_SCALPING"] += 1
 
-                        # 3. MAKER (SPLIT)
-                        # Uses config.MAKER_MIN_PROFIT_PCT and config.MAKER_ALLOW_DEAD_MARKETS dynamically
-                        is_maker = self._sim_maker(m, ob)
-                        if is_maker:
-                            # Classify as HF or Gen
-                            if "Up or Down" in m.get('question', ''):
-                                stats["MAKER_HF"] += 1
-                            else:
-                                stats["MAKER_GEN"] += 1
-                                maker_hits.append(m.get('question'))
+                    # 3. MAKER (SPLIT)
+                    if maker_hit(f, params) is not None:
+                        # Classify as HF or Gen
+                        if f.is_hf:
+                            stats["MAKER_HF"] += 1
+                        else:
+                            stats["MAKER_GEN"] += 1
+                            maker_hits.append(m.get('question'))
 
-                        # 4. CROSS PLATFORM
-                        if k_markets:
-                            p_slug = m.get('slug', '').lower()
-                            # Simple substring match
-                            for km in k_markets:
-                                if km.get('ticker', '').lower() in p_slug:
-                                    if self._sim_cross(m, ob, km): 
-                                        stats["CROSS_PLATFORM"] += 1
-                                    break
-                        
+                    # 4. CROSS PLATFORM
+                    if k_markets:
+                        p_slug = m.get('slug', '').lower()
+                        # Simple substring match
+                        for km in k_markets:
+                            if km.get('ticker', '').lower() in p_slug:
+                                if self._sim_cross(m, ob, km): 
+                                    stats["CROSS_PLATFORM"] += 1
+                                break
+                    
         except Exception as e:
             print(f"Analysis failed: {e}")
             return
@@ -197,58 +317,6 @@ class BacktestEngine:
         # Real logic is in cross_scanner.py
         return False
 
-    # Simulation Wrappers (Adapters)
-    def _sim_maker(self, m, ob):
-        try:
-            # 0. High-Volume Check (New!)
-            vol = float(m.get('volume24hr', 0))
-            min_vol = getattr(config, 'MIN_VOLUME_24H', 10000)
-            if vol < min_vol:
-                return False
-
-            y_bids = ob.get('yes', {}).get('bids', [])
-            n_bids = ob.get('no', {}).get('bids', [])
-            
-            y_bid = float(y_bids[0]['price']) if y_bids else 0
-            n_bid = float(n_bids[0]['price']) if n_bids else 0
-            
-            # 1. Check Dead Markets (Low Liquidity)
-            if not config.MAKER_ALLOW_DEAD_MARKETS:
-                # Must have at least X cents of bids on both sides to be "Alive"
-                if y_bid < config.MAKER_MIN_SIDE_PRICE or n_bid < config.MAKER_MIN_SIDE_PRICE: 
-                    return False
-
-            # 2. Queue Depth Check (New!)
-            max_depth = getattr(config, 'MAKER_MAX_QUEUE_DEPTH_USD', 500)
-            y_depth = sum(float(o.get('size', 0)) * y_bid for o in y_bids if float(o.get('price', 0)) == y_bid)
-            n_depth = sum(float(o.get('size', 0)) * n_bid for o in n_bids if float(o.get('price', 0)) == n_bid)
-            
-            if y_depth > max_depth or n_depth > max_depth:
-                return False
-
-            # 3. Check Profit Threshold from Config
-            cost = y_bid + n_bid
-            threshold = 1.0 - (config.MAKER_MIN_PROFIT_PCT / 100.0)
-            
-            if cost < threshold:
-                return True
-        except: pass
-        return False
-
-    def _sim_poly_internal(self, m, ob):
-        try:
-            y_book = ob.get('yes', {}).get('asks', [])
-            n_book = ob.get('no', {}).get('asks', [])
-            p1 = calc_vwap(y_book, 200)
-            p2 = calc_vwap(n_book, 200)
-            if p1 and p2 and (p1 + p2 < 0.99): return True
-        except: pass
-        return False
-    def _sim_hf(self, m, ob):
-        # HF looks for 'Up or Down' keywords and fast arb
-        if "Up or Down" not in m.get('question', ''): return False
-        return self._sim_poly_internal(m, ob) # HF uses same math, just faster
-
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser(description="Polymarket Arbitrage Backtesting Engine")
@@ -256,11 +324,33 @@ if __name__ == "__main__":
     parser.add_argument("--analyze", type=str, help="Analyze a specific archive file")
     parser.add_argument("--interval", type=int, default=300, help="Collection interval in seconds")
     parser.add_argument("--once", action="store_true", help="Run only one iteration of collection")
+    parser.add_argument("--record-ticks", action="store_true", help="Record every WebSocket book event (tick segments)")
+    parser.add_argument("--sweep", type=str, metavar="ARCHIVE", help="Parameter sweep over an archive (see --grid)")
+    parser.add_argument("--grid", action="append", metavar="NAME=V1,V2", help="Sweep values, e.g. MAKER_MIN_PROFIT_PCT=0.5,1,2 (repeatable)")
+    parser.add_argument("--workers", type=int, default=None, help="Sweep worker processes (default: CPU count)")
+    parser.add_argument("--csv", type=str, help="Also write the sweep results to this CSV file")
+    parser.add_argument("--convert", nargs=2, metavar=("JSONL", "OUT"), help="Convert a JSONL archive to the columnar format")
     
     args = parser.parse_args()
+    if args.convert:
+        t0 = time.time()
+        n, src_bytes, dst_bytes = convert_jsonl(*args.convert)
+        print(f"Converted {n} snapshots in {time.time() - t0:.1f}s: {src_bytes / 1e6:.1f}MB -> {dst_bytes / 1e6:.1f}MB "
+              f"({src_bytes / max(dst_bytes, 1):.1f}x smaller)")
+        raise SystemExit
+    if args.sweep:
+        from param_sweep import run_sweep, parse_grid, print_table, write_csv
+        grid = parse_grid(args.grid)
+        if not grid: parser.error("--sweep needs at least one --grid NAME=V1,V2,...")
+        results = run_sweep(args.sweep, grid, workers=args.workers)
+        print_table(results, list(grid))
+        if args.csv: write_csv(results, args.csv)
+        raise SystemExit
     engine = BacktestEngine()
     
-    if args.collect:
+    if args.record_ticks:
+        engine.record_ticks()
+    elif args.collect:
         engine.run_collector(args.interval, once=args.once)
     elif args.analyze:
         engine.analyze_archive(args.analyze)
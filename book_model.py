@@ -0,0 +1,145 @@
+import config
+
+TICKS_PER_DOLLAR = 1000   # 0.1c resolution: covers Polymarket (0.001/0.01 ticks) and Kalshi (1c)
+
+def to_ticks(price):
+    return int(round(price * TICKS_PER_DOLLAR))
+
+def parse_poly_price(p_str):
+    try:
+        val = float(p_str)
+        if val > 1.0: return val / 100.0
+        return val
+    except: return None
+
+class FlatFeeModel:
+    """Fee as a fixed percentage of notional (our Polymarket buffer, config.FEE_PCT)."""
+    def __init__(self, pct):
+        self.rate = pct / 100.0
+
+    def fee_per_share(self, price):
+        return price * self.rate
+
+class KalshiFeeModel:
+    """Kalshi taker fee: rate * P * (1 - P) per contract (P in dollars)."""
+    def __init__(self, rate=0.07):
+        self.rate = rate
+
+    def fee_per_share(self, price):
+        return self.rate * price * (1.0 - price)
+
+class Book:
+    """
+    Venue-neutral ladder for ONE outcome token.
+    bids: [(tick, size)] best (highest) first; asks: [(tick, size)] best (lowest) first.
+    Sizes are in shares/contracts, prices in integer ticks (see TICKS_PER_DOLLAR).
+    """
+    __slots__ = ('venue', 'bids', 'asks', 'fee_model')
+
+    def __init__(self, venue, bids, asks, fee_model):
+        self.venue = venue
+        self.bids = sorted(bids, key=lambda l: -l[0])
+        self.asks = sorted(asks, key=lambda l: l[0])
+        self.fee_model = fee_model
+
+    def best_bid(self):
+        return self.bids[0][0] / TICKS_PER_DOLLAR if self.bids else 0.0
+
+    def best_ask(self):
+        return self.asks[0][0] / TICKS_PER_DOLLAR if self.asks else None
+
+    def vwap_ask(self, target_usd):
+        """Average price (dollars) to buy `target_usd` worth from the asks, or None if too thin."""
+        spent = 0.0
+        qty = 0.0
+        for tick, size in self.asks:
+            price = tick / TICKS_PER_DOLLAR
+            level_usd = price * size
+            remaining = target_usd - spent
+            if level_usd >= remaining:
+                qty += remaining / price
+                spent += remaining
+                return spent / qty
+            spent += level_usd
+            qty += size
+        return None
+
+class BinaryBook:
+    """YES and NO ladders for one binary market on one venue."""
+    __slots__ = ('venue', 'yes', 'no')
+
+    def __init__(self, venue, yes, no):
+        self.venue = venue
+        self.yes = yes
+        self.no = no
+
+def poly_fee_model():
+    return FlatFeeModel(config.FEE_PCT)
+
+def kalshi_fee_model():
+    return KalshiFeeModel(getattr(config, 'KALSHI_FEE_RATE', 0.07))
+
+def _poly_levels(orders):
+    levels = []
+    for o in orders or []:
+        p = parse_poly_price(o.get('price'))
+        s = float(o.get('size', 0) or 0)
+        if p is not None and p > 0 and s > 0:
+            levels.append((to_ticks(p), s))
+    return levels
+
+def from_poly_book(raw):
+    """CLOB /book payload ({'bids': [{'price','size'}], 'asks': [...]}) -> Book."""
+    raw = raw or {}
+    return Book('poly', _poly_levels(raw.get('bids')), _poly_levels(raw.get('asks')), poly_fee_model())
+
+def from_poly_market_books(obs):
+    """PolyClient.get_market_orderbooks() output -> BinaryBook (binary markets only)."""
+    if not obs or not obs.get('yes') or not obs.get('no'): return None
+    return BinaryBook('poly', from_poly_book(obs['yes']), from_poly_book(obs['no']))
+
+def from_kalshi_orderbook(ob):
+    """
+    Kalshi v2 orderbook -> BinaryBook.
+    Kalshi only publishes BIDS: 'yes' and 'no' are [[price_cents, qty], ...].
+    A NO bid at c cents is a YES ask at (100 - c), and vice versa; derived here once.
+    """
+    ob = ob or {}
+    cent = TICKS_PER_DOLLAR // 100
+    yes_bids = [(int(p) * cent, float(q)) for p, q in (ob.get('yes') or []) if float(q) > 0]
+    no_bids = [(int(p) * cent, float(q)) for p, q in (ob.get('no') or []) if float(q) > 0]
+    yes_asks = [(TICKS_PER_DOLLAR - t, q) for t, q in no_bids]
+    no_asks = [(TICKS_PER_DOLLAR - t, q) for t, q in yes_bids]
+    fees = kalshi_fee_model()
+    return BinaryBook('kalshi', Book('kalshi', yes_bids, yes_asks, fees), Book('kalshi', no_bids, no_asks, fees))
+
+def pair_cost(leg_a, leg_b, target_usd):
+    """
+    Buy equal share counts of two complementary outcomes (e.g. Poly YES + Kalshi NO)
+    by walking both ask ladders together. Returns (cost_per_pair_incl_fees, shares)
+    for a `target_usd` total spend, or (None, 0) if the books cannot fill it.
+    """
+    ia = ib = 0
+    rem_a = leg_a.asks[0][1] if leg_a.asks else 0
+    rem_b = leg_b.asks[0][1] if leg_b.asks else 0
+    spent = 0.0
+    shares = 0.0
+    while ia < len(leg_a.asks) and ib < len(leg_b.asks):
+        pa = leg_a.asks[ia][0] / TICKS_PER_DOLLAR
+        pb = leg_b.asks[ib][0] / TICKS_PER_DOLLAR
+        unit = pa + leg_a.fee_model.fee_per_share(pa) + pb + leg_b.fee_model.fee_per_share(pb)
+        take = min(rem_a, rem_b)
+        if spent + take * unit >= target_usd:
+            shares += (target_usd - spent) / unit
+            return target_usd / shares, shares
+        spent += take * unit
+        shares += take
+        rem_a -= take
+        rem_b -= take
+        if rem_a <= 0:
+            ia += 1
+            if ia < len(leg_a.asks): rem_a = leg_a.asks[ia][1]
+        if rem_b <= 0:
+            ib += 1
+            if ib < len(leg_b.asks): rem_b = leg_b.asks[ib][1]
+    return None, 0
@@ -0,0 +1,325 @@
+import time
+import random
+import bisect
+import argparse
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+import config
+from book_model import to_ticks, TICKS_PER_DOLLAR
+
+class SimOrder:
+    __slots__ = ('id', 'token_id', 'side', 'tick', 'size', 'matched', 'status', 'seq', 'ours')
+
+    def __init__(self, oid, token_id, side, tick, size, seq, ours):
+        self.id = oid
+        self.token_id = token_id
+        self.side = side
+        self.tick = tick
+        self.size = size
+        self.matched = 0.0
+        self.status = "LIVE"
+        self.seq = seq
+        self.ours = ours
+
+    @property
+    def remaining(self):
+        return self.size - self.matched
+
+    def to_api(self):
+        """Shape of a CLOB /data/order response (the fields the executor reads)."""
+        return {"id": self.id, "asset_id": self.token_id, "side": self.side,
+                "price": f"{self.tick / TICKS_PER_DOLLAR:.3f}", "original_size": str(self.size),
+                "size_matched": str(self.matched), "status": self.status}
+
+class SimBook:
+    """
+    One token's resting orders: {tick: deque(orders)} per side plus sorted tick lists.
+    FIFO within a level + best price first = price-time priority.
+    """
+    def __init__(self):
+        self.levels = {"BUY": {}, "SELL": {}}
+        self.ticks = {"BUY": [], "SELL": []}  # ascending
+
+    def best(self, side):
+        ticks = self.ticks[side]
+        if not ticks: return None
+        return ticks[-1] if side == "BUY" else ticks[0]
+
+    def rest(self, order):
+        levels = self.levels[order.side]
+        if order.tick not in levels:
+            levels[order.tick] = deque()
+            bisect.insort(self.ticks[order.side], order.tick)
+        levels[order.tick].append(order)
+
+    def remove(self, order):
+        levels = self.levels[order.side]
+        q = levels.get(order.tick)
+        if not q: return
+        try: q.remove(order)
+        except ValueError: return
+        if not q: self._drop_level(order.side, order.tick)
+
+    def _drop_level(self, side, tick):
+        del self.levels[side][tick]
+        ticks = self.ticks[side]
+        del ticks[bisect.bisect_left(ticks, tick)]
+
+    def snapshot(self):
+        """CLOB /book payload for this token (aggregated sizes)."""
+        agg = lambda side: [{"price": f"{t / TICKS_PER_DOLLAR:.3f}", "size": str(sum(o.remaining for o in self.levels[side][t]))}
+                            for t in self.ticks[side]]
+        return {"bids": agg("BUY"), "asks": agg("SELL")}
+
+class ClobSimulator:
+    """
+    In-process stand-in for the authenticated ClobClient.
+
+    Implements create_order / post_order / post_orders / get_order / get_orders /
+    cancel / cancel_orders with price-time priority matching and partial fills.
+    latency_ms (+ jitter) is slept on every request, reject_rate randomly refuses
+    posts. Fills on our orders are pushed to listeners with the user-channel
+    signature fn(order_id, size_matched, original_size, event_type), so the
+    simulator can stand in for the fill stream as well.
+    """
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, reject_rate=0.0, sign_ms=0.0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.reject_rate = reject_rate
+        self.sign_ms = sign_ms
+        self.rng = random.Random(seed)
+        self.books = {}      # {token_id: SimBook}
+        self.orders = {}     # {order_id: SimOrder}
+        self.listeners = []
+        self.seq = 0
+        self.stats = {"requests": 0, "posts": 0, "rejects": 0, "fills": 0, "cancels": 0}
+        self.lock = threading.Lock()
+
+    # --- ClobClient surface -------------------------------------------------
+
+    def create_order(self, order_args):
+        if self.sign_ms: time.sleep(self.sign_ms / 1000)
+        return {"token_id": order_args.token_id, "price": float(order_args.price), "size": float(order_args.size),
+                "side": order_args.side, "salt": self.rng.getrandbits(64)}
+
+    def post_order(self, signed, orderType=None):
+        self._network()
+        return self._post(signed)
+
+    def post_orders(self, args):
+        self._network()
+        return [self._post(a.order) for a in args]
+
+    def get_order(self, order_id):
+        self._network()
+        with self.lock:
+            o = self.orders.get(order_id)
+            return o.to_api() if o else None
+
+    def get_orders(self, params=None, next_cursor=None):
+        self._network()
+        with self.lock:
+            return [o.to_api() for o in self.orders.values() if o.ours and o.status == "LIVE"]
+
+    def cancel(self, order_id):
+        return self.cancel_orders([order_id])
+
+    def cancel_orders(self, order_ids):
+        self._network()
+        canceled, not_canceled, events = [], {}, []
+        with self.lock:
+            for oid in order_ids:
+                o = self.orders.get(oid)
+                if not o or o.status != "LIVE":
+                    not_canceled[oid] = "order can't be found - already canceled or matched"
+                    continue
+                self.books[o.token_id].remove(o)
+                o.status = "CANCELED"
+                canceled.append(oid)
+                self.stats["cancels"] += 1
+                events.append((oid, o.matched, o.size, "CANCELLATION"))
+        self._notify(events)
+        return {"canceled": canceled, "not_canceled": not_canceled}
+
+    def get_order_book(self, token_id):
+        with self.lock:
+            book = self.books.get(token_id)
+            return book.snapshot() if book else {"bids": [], "asks": []}
+
+    # --- Fill stream (PolyUserWebSocket-compatible) --------------------------
+
+    def add_listener(self, fn):
+        if fn not in self.listeners:
+            self.listeners.append(fn)
+
+    def is_alive(self, max_silence_sec=30):
+        return True
+
+    # --- Counterparty flow -------------------------------------------------
+
+    def submit_flow(self, token_id, side, price, size, rest=True):
+        """
+        Order from the rest of the market. rest=False makes it IOC (a taker that
+        never rests). Returns the filled quantity.
+        """
+        with self.lock:
+            o, events = self._enter(token_id, side, price, size, ours=False, rest=rest)
+        self._notify(events)
+        return o.matched
+
+    def seed_book(self, token_id, bids=(), asks=()):
+        """Resting third-party liquidity: bids/asks as [(price, size), ...]."""
+        for p, s in bids: self.submit_flow(token_id, "BUY", p, s)
+        for p, s in asks: self.submit_flow(token_id, "SELL", p, s)
+
+    # --- Internals ---------------------------------------------------------
+
+    def _network(self):
+        self.stats["requests"] += 1
+        delay = self.latency_ms + (self.rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0)
+        if delay > 0: time.sleep(delay / 1000)
+
+    def _post(self, signed):
+        if self.rng.random() < self.reject_rate:
+            self.stats["rejects"] += 1
+            return {"success": False, "errorMsg": "simulated rejection"}
+        with self.lock:
+            self.stats["posts"] += 1
+            o, events = self._enter(signed["token_id"], signed["side"], signed["price"], signed["size"], ours=True, rest=True)
+        self._notify(events)
+        return {"success": True, "orderID": o.id, "status": "matched" if o.status == "MATCHED" else "live"}
+
+    def _enter(self, token_id, side, price, size, ours, rest):
+        """Match an incoming order against the opposite side, rest the remainder. Lock held."""
+        self.seq += 1
+        o = SimOrder(f"0x{self.seq:064x}", token_id, side, to_ticks(price), float(size), self.seq, ours)
+        self.orders[o.id] = o
+        book = self.books.setdefault(token_id, SimBook())
+        opp = "SELL" if side == "BUY" else "BUY"
+        crosses = (lambda t: t <= o.tick) if side == "BUY" else (lambda t: t >= o.tick)
+        events = []
+
+        while o.remaining > 1e-9:
+            best = book.best(opp)
+            if best is None or not crosses(best): break
+            queue = book.levels[opp][best]
+            maker = queue[0]
+            qty = min(o.remaining, maker.remaining)
+            maker.matched += qty
+            o.matched += qty
+            self.stats["fills"] += 1
+            if maker.remaining <= 1e-9:
+                maker.status = "MATCHED"
+                queue.popleft()
+                if not queue: book._drop_level(opp, best)
+            if maker.ours: events.append((maker.id, maker.matched, maker.size, "UPDATE"))
+
+        if o.remaining <= 1e-9:
+            o.status = "MATCHED"
+        elif rest:
+            book.rest(o)
+        else:
+            o.status = "CANCELED"  # IOC remainder
+        if ours and o.matched > 0: events.append((o.id, o.matched, o.size, "UPDATE"))
+        return o, events
+
+    def _notify(self, events):
+        for e in events:
+            for fn in self.listeners:
+                try: fn(*e)
+                except Exception as err: print(f"Sim listener error: {err}")
+
+class SyntheticFlow:
+    """
+    Random taker flow against a set of tokens: each step picks a token and sends
+    an IOC order at the opposite touch, so resting bids (ours included) get hit
+    in price-time order. Recorded flow can be fed the same way via replay().
+    """
+    def __init__(self, sim, tokens, sell_prob=0.5, max_size=50, seed=None):
+        self.sim = sim
+        self.tokens = list(tokens)
+        self.sell_prob = sell_prob
+        self.max_size = max_size
+        self.rng = random.Random(seed)
+
+    def step(self):
+        token = self.rng.choice(self.tokens)
+        size = self.rng.uniform(1, self.max_size)
+        if self.rng.random() < self.sell_prob:
+            return self.sim.submit_flow(token, "SELL", 0.001, size, rest=False)  # Hits the best bids
+        return self.sim.submit_flow(token, "BUY", 0.999, size, rest=False)
+
+    def run(self, steps):
+        return sum(self.step() for _ in range(steps))
+
+    def replay(self, events):
+        """events: iterable of (token_id, side, price, size[, rest])."""
+        for e in events:
+            self.sim.submit_flow(*e)
+
+def run_benchmark(pairs=200, flow_steps=2000, latency_ms=5.0, reject_rate=0.02, seed=7):
+    """
+    Drive the real TradeExecutor against the simulator: place `pairs` maker pairs,
+    push synthetic flow, then run the hedge chaser. Prints throughput, rollbacks
+    and chase outcomes.
+    """
+    config.LIVE_TRADING = True
+    config.USER_WS_ENABLED = False
+    config.JOURNAL_ENABLED = False
+    config.MAX_TOTAL_OPEN_TRADES = pairs * 2
+    config.MAX_EXPOSURE_PER_MARKET_USD = 1e9
+    config.MAX_EVENT_EXPOSURE_USD = 1e9
+    from trade_executor import TradeExecutor
+    from risk_manager import risk_manager
+    risk_manager.starting_bankroll = 1e9
+
+    sim = ClobSimulator(latency_ms=latency_ms, jitter_ms=latency_ms / 2, reject_rate=reject_rate, seed=seed)
+    executor = TradeExecutor()
+    executor.clob = sim
+    executor.fill_stream = sim
+    sim.add_listener(executor.on_order_update)
+
+    rng = random.Random(seed)
+    markets, tokens = [], []
+    for i in range(pairs):
+        y, n = f"yes-{i}", f"no-{i}"
+        y_bid = round(rng.uniform(0.2, 0.7), 2)
+        n_bid = round(0.97 - y_bid, 2)
+        sim.seed_book(y, bids=[(y_bid - 0.01, 100)], asks=[(y_bid + 0.02, 500)])
+        sim.seed_book(n, bids=[(n_bid - 0.01, 100)], asks=[(n_bid + 0.02, 500)])
+        markets.append(({"id": f"m{i}", "question": f"Sim market {i}", "clobTokenIds": [y, n]}, y_bid, n_bid))
+        tokens += [y, n]
+
+    t0 = time.perf_counter()
+    for m, y_bid, n_bid in markets:
+        executor.place_maker_orders(m, y_bid, n_bid, size_usd=10)
+    place_sec = time.perf_counter() - t0
+    placed = len(executor.hedge_pairs)
+
+    filled = SyntheticFlow(sim, tokens, sell_prob=0.9, seed=seed).run(flow_steps)
+    time.sleep(0.2)  # Let fill-event handlers on the executor pool finish
+
+    # Age the remaining pairs past the timeout so the REST chaser acts on them
+    for p in executor.hedge_pairs:
+        p['timestamp'] = datetime.now() - timedelta(seconds=config.HEDGE_TIMEOUT_SEC + 1)
+    requests_before = sim.stats["requests"]
+    t1 = time.perf_counter()
+    executor.check_and_chase_hedges()
+    chase_sec = time.perf_counter() - t1
+
+    print(f"Placed {placed}/{pairs} pairs in {place_sec:.2f}s ({pairs / place_sec:.0f} pairs/s, "
+          f"{latency_ms:.0f}ms simulated latency, {reject_rate:.0%} rejects)")
+    print(f"Rollbacks: {pairs - placed} | Flow filled {filled:.0f} shares")
+    print(f"Chaser cycle: {chase_sec * 1000:.0f}ms, {sim.stats['requests'] - requests_before} requests, "
+          f"{len(executor.hedge_pairs)} pairs still open")
+    print(f"Sim stats: {sim.stats} | Submit stats: {executor.get_submit_stats()}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline CLOB simulator benchmark for TradeExecutor")
+    parser.add_argument("--pairs", type=int, default=200)
+    parser.add_argument("--flow", type=int, default=2000, help="Synthetic taker orders to send")
+    parser.add_argument("--latency", type=float, default=5.0, help="Simulated request latency (ms)")
+    parser.add_argument("--reject", type=float, default=0.02, help="Post rejection rate (0-1)")
+    args = parser.parse_args()
+    run_benchmark(args.pairs, args.flow, args.latency, args.reject)
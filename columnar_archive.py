@@ -0,0 +1,322 @@
+import io
+import os
+import json
+import mmap
+import zlib
+import struct
+import numpy as np
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MAGIC = b"PMCARC01"
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+TRAILER = struct.Struct("<QI8s")   # footer offset, footer length, magic
+CHUNK_HEADER = struct.Struct("<IB")  # payload length, codec
+
+# Per-snapshot numeric market fields kept as float64 columns (NaN = missing)
+NUMERIC_FIELDS = ("volume24hr", "volume", "liquidity", "bestBid", "bestAsk", "lastTradePrice", "spread")
+# Fast-changing Gamma fields that are dropped from the static metadata
+VOLATILE_FIELDS = {"updatedAt", "outcomePrices", "oneHourPriceChange", "oneDayPriceChange", "oneWeekPriceChange",
+                   "oneMonthPriceChange", "competitive", "volumeNum", "liquidityNum", "volumeClob", "liquidityClob",
+                   "volume24hrClob", "volume1wk", "volume1mo", "volume1yr", "volume1wkClob", "volume1moClob", "volume1yrClob"}
+
+TICKS = 1000  # Price resolution 0.1c (see book_model.TICKS_PER_DOLLAR)
+
+def compress(raw):
+    if zstandard is not None:
+        return CODEC_ZSTD, zstandard.ZstdCompressor(level=9).compress(raw)
+    return CODEC_ZLIB, zlib.compress(raw, 6)
+
+def decompress(codec, payload):
+    if codec == CODEC_ZSTD:
+        if zstandard is None: raise RuntimeError("Archive chunk is zstd-compressed: pip install zstandard")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    return zlib.decompress(payload)
+
+def pack_arrays(arrays):
+    """{name: ndarray} -> bytes (JSON header + raw little-endian buffers)."""
+    header, body = [], io.BytesIO()
+    for name, a in arrays.items():
+        a = np.ascontiguousarray(a)
+        header.append([name, a.dtype.str, len(a)])
+        body.write(a.tobytes())
+    h = json.dumps(header).encode()
+    return struct.pack("<I", len(h)) + h + body.getvalue()
+
+def unpack_arrays(raw):
+    (hlen,) = struct.unpack_from("<I", raw)
+    header = json.loads(raw[4:4 + hlen])
+    out, pos = {}, 4 + hlen
+    for name, dtype, n in header:
+        dt = np.dtype(dtype)
+        out[name] = np.frombuffer(raw, dtype=dt, count=n, offset=pos)
+        pos += dt.itemsize * n
+    return out
+
+def _json_bytes(obj):
+    return np.frombuffer(json.dumps(obj).encode(), dtype=np.uint8)
+
+def static_part(market):
+    return {k: v for k, v in market.items()
+            if k not in VOLATILE_FIELDS and k not in NUMERIC_FIELDS}
+
+def _num(v):
+    try: return float(v)
+    except (TypeError, ValueError): return np.nan
+
+class ArchiveWriter:
+    """
+    Appends snapshots (same dicts as BacktestEngine.collect_snapshot) to a columnar archive.
+
+    Market dicts are split into a deduplicated static metadata table (stored once,
+    in the footer) and per-row numeric columns; Kalshi market dicts are
+    deduplicated the same way. Order books become flat level arrays
+    (code = token_position * 2 + is_ask, price in ticks, size). Each chunk of
+    snapshots is compressed with zstd (zlib if zstandard is not installed).
+
+    Each chunk also carries the table entries first interned in it, and the footer
+    is rewritten after every chunk, so a write cut short anywhere only loses the
+    torn tail: the reader rebuilds the index by scanning chunk headers, and
+    re-opening an existing file continues after its last complete chunk.
+    """
+    def __init__(self, path, chunk_snapshots=16):
+        self.path = path
+        self.chunk_snapshots = chunk_snapshots
+        self.pending = []
+        self.chunks, self.markets, self.kalshi = [], [], []
+        self.market_index, self.kalshi_index = {}, {}
+        self.footer_written = False
+        if os.path.exists(path) and os.path.getsize(path) > len(MAGIC):
+            reader = ArchiveReader(path)
+            self.chunks, self.markets, self.kalshi = reader.chunks, reader.markets, reader.kalshi
+            self.data_end = reader.data_end
+            self.footer_written = not reader.recovered
+            reader.close()
+            self.market_index = {json.dumps(m, sort_keys=True): i for i, m in enumerate(self.markets)}
+            self.kalshi_index = {json.dumps(k, sort_keys=True): i for i, k in enumerate(self.kalshi)}
+            self.f = open(path, 'r+b')
+        else:
+            self.f = open(path, 'wb')
+            self.f.write(MAGIC)
+            self.data_end = len(MAGIC)
+        self.markets_written, self.kalshi_written = len(self.markets), len(self.kalshi)
+
+    def _intern(self, obj, table, index):
+        key = json.dumps(obj, sort_keys=True)
+        idx = index.get(key)
+        if idx is None:
+            idx = index[key] = len(table)
+            table.append(obj)
+        return idx
+
+    def append(self, snapshot):
+        self.pending.append(snapshot)
+        if len(self.pending) >= self.chunk_snapshots:
+            self.flush_chunk()
+
+    def flush_chunk(self):
+        if not self.pending: return
+        ts, row_off, k_off = [], [0], [0]
+        row_market, numeric, lvl_off = [], [], [0]
+        codes, ticks, sizes, k_idx = [], [], [], []
+        for snap in self.pending:
+            ts.append(snap.get("timestamp", ""))
+            for row in snap.get("poly_markets", []):
+                m, ob = row.get("market", {}), row.get("orderbook") or {}
+                row_market.append(self._intern(static_part(m), self.markets, self.market_index))
+                numeric.append([_num(m.get(f)) for f in NUMERIC_FIELDS])
+                books = ob.get("tokens") or {}
+                tids = m.get("clobTokenIds")
+                if isinstance(tids, str): tids = json.loads(tids)
+                order = list(tids or books.keys())
+                for pos, tid in enumerate(order):
+                    book = books.get(tid) or (ob.get("yes") if pos == 0 else ob.get("no") if pos == 1 else None) or {}
+                    for is_ask, side in ((0, "bids"), (1, "asks")):
+                        for lvl in book.get(side) or []:
+                            codes.append(pos * 2 + is_ask)
+                            ticks.append(int(round(float(lvl.get("price", 0)) * TICKS)))
+                            sizes.append(float(lvl.get("size", 0) or 0))
+                lvl_off.append(len(codes))
+            row_off.append(len(row_market))
+            for km in snap.get("kalshi_markets") or []:
+                k_idx.append(self._intern(km, self.kalshi, self.kalshi_index))
+            k_off.append(len(k_idx))
+
+        raw = pack_arrays({
+            "ts": np.array(ts, dtype="U32"),
+            "row_off": np.array(row_off, dtype=np.int64),
+            "row_market": np.array(row_market, dtype=np.int32),
+            "numeric": np.array(numeric, dtype=np.float64).reshape(-1),
+            "lvl_off": np.array(lvl_off, dtype=np.int64),
+            "code": np.array(codes, dtype=np.uint8),
+            "tick": np.array(ticks, dtype=np.uint16),
+            "size": np.array(sizes, dtype=np.float64),
+            "k_off": np.array(k_off, dtype=np.int64),
+            "k_idx": np.array(k_idx, dtype=np.int32),
+            # Table entries first seen in this chunk (lets a reader rebuild a lost footer)
+            "new_markets": _json_bytes(self.markets[self.markets_written:]),
+            "new_kalshi": _json_bytes(self.kalshi[self.kalshi_written:]),
+        })
+        codec, payload = compress(raw)
+        # Overwrite the previous footer; until the new one is written the reader recovers by scanning
+        self.f.seek(self.data_end)
+        self.f.truncate()
+        self.f.write(CHUNK_HEADER.pack(len(payload), codec))
+        self.f.write(payload)
+        self.chunks.append({"offset": self.data_end, "length": len(payload), "n": len(self.pending),
+                            "t0": ts[0], "t1": ts[-1]})
+        self.data_end = self.f.tell()
+        self.markets_written, self.kalshi_written = len(self.markets), len(self.kalshi)
+        self.pending = []
+        self._write_footer()
+
+    def _write_footer(self):
+        footer = json.dumps({"chunks": self.chunks, "markets": self.markets, "kalshi": self.kalshi,
+                             "numeric_fields": NUMERIC_FIELDS}).encode()
+        codec, payload = compress(footer)
+        self.f.seek(self.data_end)
+        self.f.truncate()
+        self.f.write(bytes([codec]) + payload)
+        self.f.write(TRAILER.pack(self.data_end, len(payload) + 1, MAGIC))
+        self.f.flush()
+        self.footer_written = True
+
+    def close(self):
+        self.flush_chunk()
+        if not self.footer_written: self._write_footer()
+        self.f.close()
+
+class ArchiveReader:
+    """
+    Memory-mapped reader. Only the footer is parsed on open; chunks are
+    decompressed on demand, and arrays are zero-copy views of the decompressed buffer.
+    """
+    def __init__(self, path):
+        self.f = open(path, 'rb')
+        self.mm = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mm[:len(MAGIC)] != MAGIC: raise ValueError(f"{path} is not a columnar archive")
+        self.recovered = False
+        footer = self._read_footer()
+        if footer is None:
+            # Writer interrupted after truncating the old footer: rebuild the index from the chunks
+            self._recover()
+            print(f"⚠️ {path}: no valid footer, recovered {len(self.chunks)} chunks ({len(self)} snapshots)")
+            return
+        self.chunks = footer["chunks"]
+        self.markets = footer["markets"]
+        self.kalshi = footer["kalshi"]
+        self.numeric_fields = tuple(footer.get("numeric_fields", NUMERIC_FIELDS))
+
+    def _read_footer(self):
+        if len(self.mm) < len(MAGIC) + TRAILER.size: return None
+        offset, length, magic = TRAILER.unpack_from(self.mm, len(self.mm) - TRAILER.size)
+        if magic != MAGIC or offset + length + TRAILER.size != len(self.mm): return None
+        try:
+            footer = json.loads(decompress(self.mm[offset], self.mm[offset + 1:offset + length]))
+        except Exception:
+            return None
+        self.data_end = offset
+        return footer
+
+    def _recover(self):
+        self.recovered = True
+        self.chunks, self.markets, self.kalshi = [], [], []
+        self.numeric_fields = NUMERIC_FIELDS
+        pos, end = len(MAGIC), len(self.mm)
+        while pos + CHUNK_HEADER.size <= end:
+            length, codec = CHUNK_HEADER.unpack_from(self.mm, pos)
+            start = pos + CHUNK_HEADER.size
+            if codec not in (CODEC_ZLIB, CODEC_ZSTD) or start + length > end: break
+            try:
+                a = unpack_arrays(decompress(codec, self.mm[start:start + length]))
+            except Exception:
+                break  # Torn chunk (or the head of a torn footer)
+            if "new_markets" not in a: raise ValueError("archive predates recoverable chunks, cannot rebuild its footer")
+            self.markets.extend(json.loads(a["new_markets"].tobytes()))
+            self.kalshi.extend(json.loads(a["new_kalshi"].tobytes()))
+            self.chunks.append({"offset": pos, "length": length, "n": len(a["ts"]),
+                                "t0": str(a["ts"][0]), "t1": str(a["ts"][-1])})
+            pos = start + length
+        self.data_end = pos
+
+    def __len__(self):
+        return sum(c["n"] for c in self.chunks)
+
+    def chunk(self, i):
+        c = self.chunks[i]
+        length, codec = CHUNK_HEADER.unpack_from(self.mm, c["offset"])
+        start = c["offset"] + CHUNK_HEADER.size
+        a = unpack_arrays(decompress(codec, self.mm[start:start + length]))
+        a["numeric"] = a["numeric"].reshape(-1, len(self.numeric_fields))
+        return a
+
+    def iter_chunks(self):
+        for i in range(len(self.chunks)):
+            yield self.chunk(i)
+
+    def iter_snapshots(self):
+        """Rebuild snapshot dicts in the JSONL shape (static metadata + numeric fields + books)."""
+        for a in self.iter_chunks():
+            for s in range(len(a["ts"])):
+                rows = []
+                for r in range(a["row_off"][s], a["row_off"][s + 1]):
+                    rows.append(self._row(a, r))
+                kalshi = [self.kalshi[k] for k in a["k_idx"][a["k_off"][s]:a["k_off"][s + 1]]]
+                yield {"timestamp": str(a["ts"][s]), "poly_markets": rows, "kalshi_markets": kalshi}
+
+    def _row(self, a, r):
+        market = dict(self.markets[a["row_market"][r]])
+        for f, v in zip(self.numeric_fields, a["numeric"][r]):
+            if not np.isnan(v): market[f] = v
+        lo, hi = a["lvl_off"][r], a["lvl_off"][r + 1]
+        tids = market.get("clobTokenIds")
+        if isinstance(tids, str): tids = json.loads(tids)
+        tids = list(tids or [])
+        books = {}
+        for code, tick, size in zip(a["code"][lo:hi].tolist(), a["tick"][lo:hi].tolist(), a["size"][lo:hi].tolist()):
+            pos = code >> 1
+            tid = tids[pos] if pos < len(tids) else str(pos)
+            book = books.setdefault(tid, {"bids": [], "asks": []})
+            book["asks" if code & 1 else "bids"].append({"price": f"{tick / TICKS:g}", "size": repr(size)})
+        ob = {"tokens": books}
+        if len(tids) == 2:
+            ob["yes"], ob["no"] = books.get(tids[0], {"bids": [], "asks": []}), books.get(tids[1], {"bids": [], "asks": []})
+        return {"market": market, "orderbook": ob}
+
+    def close(self):
+        self.mm.close()
+        self.f.close()
+
+def is_columnar(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+def read_snapshots(path):
+    """Snapshots from a columnar archive or a JSONL file (format auto-detected)."""
+    if is_columnar(path):
+        reader = ArchiveReader(path)
+        try: yield from reader.iter_snapshots()
+        finally: reader.close()
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip(): yield json.loads(line)
+
+def convert_jsonl(src, dst, chunk_snapshots=16):
+    """Convert a JSONL snapshot archive. Returns (snapshots, src_bytes, dst_bytes)."""
+    writer = ArchiveWriter(dst, chunk_snapshots)
+    n = 0
+    with open(src, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                writer.append(json.loads(line))
+                n += 1
+    writer.close()
+    return n, os.path.getsize(src), os.path.getsize(dst)
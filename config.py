@@ -58,6 +58,27 @@ HEDGE_TIMEOUT_SEC = 120            # Wait 2 minutes (Golden Middle) before "chas
 HEDGE_CHECK_INTERVAL_SEC = 30      # How often to check order status
 MAX_CHASE_PRICE = 0.99             # Never pay more than 0.99 to close a hedge (Safety Cap)
 MAKER_ORDER_STALE_SEC = 600        # Cancel completely unfilled trades after 10 minutes to rotate capital
+USER_WS_ENABLED = True             # Stream our own order fills over the authenticated user WebSocket
+HEDGE_FILL_GRACE_SEC = 0           # After a one-sided fill EVENT, wait this long for the other leg before chasing
+HEDGE_RECONCILE_INTERVAL_SEC = 120 # REST reconciliation interval while the fill stream is healthy
+REQUOTE_ENABLED = True             # Move resting maker bids back to the touch as the book moves
+REQUOTE_MIN_INTERVAL_SEC = 5       # At most one cancel/replace per market in this window
+JOURNAL_ENABLED = True             # Journal orders/fills to SQLite so a restart recovers live hedges
+JOURNAL_FILE = "order_journal.db"
+JOURNAL_COMPACT_EVERY = 5000       # Events between snapshots (replay = snapshot + short tail)
+RISK_STATE_FILE = None             # e.g. "risk_state.json": share exposure limits across bot processes (POSIX)
+RISK_RESERVATION_TTL_SEC = 120     # Uncommitted capital reservations expire after this long
+ARCHIVE_FORMAT = "columnar"        # Backtest collector output: "columnar" (market_archive.pmca) or "jsonl"
+ARCHIVE_CHUNK_SNAPSHOTS = 12       # Snapshots buffered per compressed chunk (12 x 300s = one chunk per hour)
+TICK_RECORDER_ENABLED = False      # Record every WS book event to TICK_RECORD_DIR (replayable microstructure)
+TICK_RECORD_DIR = "ticks"
+TICK_SEGMENT_MB = 64               # Rotate segment files at this size...
+TICK_SEGMENT_SEC = 3600            # ...or this age
+TICK_QUEUE_MAX = 50000             # Events buffered for the writer; beyond this they are dropped (and counted)
+LATENCY_TRACE_ENABLED = True       # Per-stage tick-to-trade histograms (printed with the heartbeat)
+LATENCY_TRACE_SLOWEST = 20         # Keep this many slowest end-to-end traces
+LATENCY_TRACE_DUMP = False         # Write the slowest traces to LATENCY_TRACE_FILE on exit
+LATENCY_TRACE_FILE = "latency_traces.jsonl"
 
 # HFT / WebSocket Settings
 WS_ENABLED = True
@@ -70,3 +91,34 @@ POLL_INTERVAL_CORR = 10            # Frequency for correlation/logical scanning
 MAX_K_MARKETS = 300                # Max active Kalshi markets to fetch
 POLL_INTERVAL_CROSS = 60           # Seconds between cross-platform scans
 NLP_MATCH_THRESHOLD = 0.82         # Minimum cosine similarity for semantic matching
+NLP_MODEL_NAME = "all-MiniLM-L6-v2" # SentenceTransformer model used for matching
+NLP_MATCH_TOP_K = 3                # Candidates kept per Poly market from the similarity matmul
+EMBEDDING_CACHE_FILE = "embedding_cache.npz"  # On-disk embedding store (only new texts get encoded)
+EMBEDDING_CACHE_MAX_ENTRIES = 20000           # LRU cap on cached embeddings
+ANN_BACKEND = "auto"               # "auto" (hnswlib if installed), "hnsw" or "lsh" for semantic matching
+LSH_TABLES = 8                     # LSH fallback: number of hash tables
+LSH_BITS = 10                      # LSH fallback: hyperplanes per table
+MATCH_STORE_FILE = "match_decisions.json"   # Cached accepted/rejected match decisions
+MATCH_REJECT_TTL_SEC = 3600        # Re-run matching for rejected Poly markets after this long
+MATCH_STORE_EXPORT_MAPPING = False # Write confident semantic matches into market_mapping.json (kept as auto matches)
+MATCH_EXPORT_MIN_SCORE = 0.90      # Minimum similarity for a match to be exported as an override
+NLP_BACKEND = "auto"               # "torch", "onnx" or "auto" (onnx if the exported model is present)
+NLP_ONNX_DIR = "onnx_model"        # Output of `python3 nlp_backend.py --export`
+NLP_ONNX_PRECISION = "int8"        # "int8" (quantized) or "fp32"
+NLP_NUM_THREADS = 2                # CPU threads for NLP inference (keep small on the VM)
+NLP_MAX_SEQ_LEN = 128              # Token limit per market title/question
+NLP_PARITY_TOLERANCE = 0.01        # Max (1 - cosine) between ONNX and torch embeddings
+KALSHI_MAX_RPS = 10                # Per-host request budget for Kalshi REST (reads/sec)
+KALSHI_BOOK_WORKERS = 8            # Concurrent Kalshi orderbook fetches
+KALSHI_BOOK_TTL_SEC = 2            # Reuse a fetched Kalshi book for this long
+KALSHI_FEE_RATE = 0.07             # Kalshi taker fee coefficient: rate * P * (1 - P) per contract
+
+# Correlated / Statistical Settings
+CORR_HISTORY_SAMPLES = 500         # Ring-buffer length (mid samples) kept per token and per pair
+CORR_MIN_SAMPLES = 30              # Samples required before a pair's z-score is trusted
+CORR_ZSCORE_THRESHOLD = 3.0        # |z| of the pair spread that triggers a divergence alert
+CORR_MAX_GROUP_SIZE = 8            # Max markets per group considered for pairs (by volume)
+ARB_BUDGET_USD = 10.0              # Max spend per multi-market basket (LP budget constraint)
+BATCH_ORDERS_ENABLED = True        # Post both maker legs in one CLOB batch request (else parallel posts)
+PRESIGN_TOP_MARKETS = 20           # Keep orders pre-signed for this many top-volume maker candidates
+PRESIGN_WORKERS = 2                # Worker threads doing EIP-712 signing off the hot path
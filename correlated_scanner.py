@@ -1,10 +1,17 @@
 import time
 import json
+import threading
 from datetime import datetime
 from poly_client import PolyClient
 from kalshi_client import KalshiClient
 import config
 from risk_manager import risk_manager
+from ws_client import poly_ws
+from implication_graph import ImplicationGraph
+from book_model import from_poly_book
+from price_history import PairSpreadTracker
+from event_graph import event_graph
+from arb_solver import GroupArbSolver, enumerate_states, date_ladder_implications
 
 poly = PolyClient()
 kalshi = KalshiClient()
@@ -15,7 +22,25 @@ class CorrelatedScanner:
     Handles pair trading logic (e.g., matching UP/DOWN markets).
     """
     def __init__(self):
-        self.market_history = {} # {ticker: [prices]}
+        self.spreads = PairSpreadTracker(getattr(config, 'CORR_HISTORY_SAMPLES', 500))
+        self.market_history = self.spreads.history # {token_id: RingBuffer of mids}
+        self.active_spread_alerts = set()  # {(token_a, token_b)} currently alerted
+        self.groups = {}         # {group_key: [market, ...]} from the last cycle
+        self.solver = GroupArbSolver()
+        self.active_baskets = {}  # {group_key: solver signature} currently alerted
+        self.graph = ImplicationGraph()   # Cached across cycles, updated incrementally
+        self.markets = {}        # {market_id: market}
+        self.token_sides = {}    # {token_id: (market_id, 'yes'|'no')}
+        self.linked = set()      # Market ids with implication edges (last cycle)
+        self.quotes = {}         # {market_id: {'yes_bid', 'yes_ask', 'no_ask'}}
+        self.active_violations = set()  # {(master_id, sub_id)} currently alerted
+        self.lock = threading.Lock()
+        self.ws = None           # Attached PolyWebSocket (its book events already feed record_mid)
+
+    def attach_ws(self, ws):
+        """Evaluate implication edges on every WS book update instead of once per cycle."""
+        ws.add_listener(self.on_book_update)
+        self.ws = ws
         
     def check_correlations(self):
         """
@@ -30,18 +55,47 @@ class CorrelatedScanner:
             self.scan_logical_violations(markets)
             
             # 2. Spread Detection (Statistical)
-            # Group by slug prefixes
-            groups = {}
-            for m in markets:
-                parts = m.get('slug', '').split('-')
-                base = "-".join(parts[:3]) if len(parts) > 3 else m.get('slug')
-                if base not in groups: groups[base] = []
-                groups[base].append(m)
+            # Group by Gamma event / neg-risk id (registry updated incrementally)
+            added, removed, moved = event_graph.update(markets)
+            if added or removed or moved:
+                print(f"  - Event graph: +{added}/-{removed}/~{moved} markets, {len(event_graph.members)} events")
+            groups = event_graph.groups(min_size=2)
                 
+            max_group = getattr(config, 'CORR_MAX_GROUP_SIZE', 8)
+            token_groups = []
+            grouped = []
+            self.groups = {}
             for base, related in groups.items():
                 if len(related) > 1:
-                    # Logic for computing Z-scores from historical mid-prices would go here
-                    pass
+                    related = sorted(related, key=lambda x: float(x.get('volume24hr', 0)), reverse=True)[:max_group]
+                    self.groups[base] = related
+                    yes_tokens = [yes_token(m) for m in related if yes_token(m)]
+                    if len(yes_tokens) > 1:
+                        token_groups.append(yes_tokens)
+                        grouped.extend(related)
+            with self.lock:
+                self.spreads.set_groups(token_groups)
+
+            # One subscription for both consumers: implication edges and spread/basket groups
+            if config.WS_ENABLED:
+                watched = self.linked | {market_key(m) for m in grouped}
+                tokens = [t for t, (mid, _) in self.token_sides.items() if mid in watched]
+                if tokens: poly_ws.subscribe(tokens)
+
+            # Feed mids from the book cache (WS first, REST fallback); WS ticks also
+            # arrive between cycles through on_book_update().
+            for m in grouped:
+                obs = poly.get_market_orderbooks(m)
+                if obs and obs.get('yes') and obs.get('no'):
+                    with self.lock:
+                        self._update_quote(market_key(m), 'yes', obs['yes'])
+                        self._update_quote(market_key(m), 'no', obs['no'])
+                        # A book served from the WS cache was already recorded by the listener
+                        if not (self.ws and obs['yes'] is self.ws.orderbooks.get(yes_token(m))):
+                            self.record_mid(yes_token(m), obs['yes'])
+
+            # 3. Multi-market no-arbitrage baskets per group
+            self.scan_triangular_arb()
         except Exception as e:
             print(f"Correlation check error: {e}")
 
@@ -49,18 +103,188 @@ class CorrelatedScanner:
         """
         Exploits mispricings where a sub-event (e.g. Harris wins) 
         costs more than the master event (e.g. Democrats win).
+
+        The implication graph is synced incrementally; prices are then checked only
+        along edges of markets whose books we (re)load. Live WS updates hit the same
+        check through on_book_update().
         """
-        lookup = {m.get('question', '').lower(): m for m in markets}
-        
-        for q, m in lookup.items():
-            for q2, m2 in lookup.items():
-                if q != q2 and q in q2:
-                    # Logic for price comparison goes here
-                    pass
+        with self.lock:
+            added, removed = self.graph.sync(markets, market_key)
+            self.markets = {market_key(m): m for m in markets if market_key(m)}
+            self.token_sides = {}
+            for mid, m in self.markets.items():
+                tids = m.get('clobTokenIds')
+                if isinstance(tids, str): tids = json.loads(tids)
+                if tids and len(tids) == 2:
+                    self.token_sides[tids[0]] = (mid, 'yes')
+                    self.token_sides[tids[1]] = (mid, 'no')
+            for mid in [mid for mid in self.quotes if mid not in self.markets]:
+                del self.quotes[mid]
+            linked = self.graph.linked_markets()
+        if added or removed:
+            print(f"  - Implication graph: +{added}/-{removed} markets, {self.graph.edge_count()} edges")
+
+        self.linked = linked
+
+        for mid in linked:
+            obs = poly.get_market_orderbooks(self.markets[mid])
+            if not obs or not obs.get('yes') or not obs.get('no'): continue
+            with self.lock:
+                self._update_quote(mid, 'yes', obs['yes'])
+                self._update_quote(mid, 'no', obs['no'])
+                self.check_market(mid)
+
+    def on_book_update(self, asset_id, book):
+        """WS listener: O(degree) re-check of the edges touching this token's market."""
+        side = self.token_sides.get(asset_id)
+        if not side: return
+        mid, outcome = side
+        with self.lock:
+            self._update_quote(mid, outcome, book)
+            self.check_market(mid)
+            if outcome == 'yes': self.record_mid(asset_id, book)
+
+    def record_mid(self, token_id, raw_book):
+        """O(1)-per-pair z-score update for every tracked pair containing this token."""
+        b = from_poly_book(raw_book)
+        if not b.bids or not b.asks: return
+        mid = (b.best_bid() + b.best_ask()) / 2
+        threshold = getattr(config, 'CORR_ZSCORE_THRESHOLD', 3.0)
+        min_samples = getattr(config, 'CORR_MIN_SAMPLES', 30)
+        for key, spread, z, n in self.spreads.update_mid(token_id, mid):
+            if n >= min_samples and abs(z) >= threshold:
+                if key not in self.active_spread_alerts:
+                    self.active_spread_alerts.add(key)
+                    ma = self.markets.get(self.token_sides.get(key[0], (None,))[0], {})
+                    mb = self.markets.get(self.token_sides.get(key[1], (None,))[0], {})
+                    print_spread_alert(ma, mb, spread, z, n)
+            elif abs(z) < threshold / 2:
+                self.active_spread_alerts.discard(key)
+
+    def _update_quote(self, mid, outcome, raw_book):
+        b = from_poly_book(raw_book)
+        q = self.quotes.setdefault(mid, {})
+        if outcome == 'yes':
+            q['yes_bid'] = b.best_bid()
+            q['yes_ask'] = b.best_ask()
+            q['yes_ask_size'] = b.asks[0][1] if b.asks else 0
+        else:
+            q['no_ask'] = b.best_ask()
+            q['no_ask_size'] = b.asks[0][1] if b.asks else 0
+
+    def check_market(self, mid):
+        """
+        For each edge (master, sub): sub implies master, so buying master YES and sub NO
+        pays at least $1 in every outcome. Alert when that basket costs < 1 - MIN_PROFIT_PCT.
+        """
+        for master_id, sub_id in self.graph.edges_for(mid):
+            qm = self.quotes.get(master_id, {})
+            qs = self.quotes.get(sub_id, {})
+            edge = (master_id, sub_id)
+            if not qm.get('yes_ask') or not qs.get('no_ask'):
+                self.active_violations.discard(edge)
+                continue
+            cost = (qm['yes_ask'] + qs['no_ask']) * (1 + config.FEE_PCT / 100)
+            if cost < 1 - (config.MIN_PROFIT_PCT / 100):
+                if edge not in self.active_violations:
+                    self.active_violations.add(edge)
+                    print_logical_alert(self.markets[master_id], self.markets[sub_id], qm, qs, cost)
+            else:
+                self.active_violations.discard(edge)
 
     def scan_triangular_arb(self):
-        """Detect mispriced loops between 3 related markets."""
-        pass
+        """
+        Multi-market no-arbitrage per event group: mutually exclusive outcomes (neg-risk),
+        nested conditions (implication graph) and date ladders ("by March" implies
+        "by June") become a small LP over live asks. Solved once per group and
+        reused until one of the legs' quotes changes.
+        """
+        budget = getattr(config, 'ARB_BUDGET_USD', config.TARGET_TRADE_SIZE_USD)
+        for key, related in self.groups.items():
+            ids = [market_key(m) for m in related]
+            pos = {mid: i for i, mid in enumerate(ids)}
+
+            with self.lock:
+                implications = {(pos[sub], pos[master]) for mid in ids
+                                for master, sub in self.graph.edges_for(mid)
+                                if master in pos and sub in pos}
+                quotes = {mid: dict(self.quotes.get(mid, {})) for mid in ids}
+            implications.update(date_ladder_implications(related))
+
+            exclusive = key.startswith('neg:')  # Neg-risk events: at most one outcome resolves YES
+            if not exclusive and not implications: continue
+
+            legs = []
+            for i, mid in enumerate(ids):
+                q = quotes[mid]
+                tids = related[i].get('clobTokenIds')
+                if isinstance(tids, str): tids = json.loads(tids)
+                if not tids or len(tids) < 2: continue
+                if q.get('yes_ask') and q.get('yes_ask_size'):
+                    legs.append({'market': i, 'outcome': 'yes', 'token': tids[0], 'price': q['yes_ask'], 'size': q['yes_ask_size']})
+                if q.get('no_ask') and q.get('no_ask_size'):
+                    legs.append({'market': i, 'outcome': 'no', 'token': tids[1], 'price': q['no_ask'], 'size': q['no_ask_size']})
+            if len(legs) < 2: continue
+
+            states = enumerate_states(len(ids), exclusive=exclusive, implications=sorted(implications))
+            result = self.solver.solve(key, legs, states, budget)
+            signature = self.solver.cache[key][0]
+            if not result:
+                self.active_baskets.pop(key, None)
+                continue
+            basket, cost, profit = result
+            if profit / cost * 100 >= config.MIN_PROFIT_PCT and self.active_baskets.get(key) != signature:
+                self.active_baskets[key] = signature
+                print_basket_alert(key, related, basket, cost, profit)
+        self.solver.prune(set(self.groups))
+
+def market_key(m):
+    return m.get('id') or m.get('conditionId')
+
+def yes_token(m):
+    tids = m.get('clobTokenIds')
+    if isinstance(tids, str): tids = json.loads(tids)
+    return tids[0] if tids else None
+
+def print_basket_alert(group_key, related, basket, cost, profit):
+    alert_text = f"\n[{datetime.now().strftime('%H:%M:%S')}] [CORR] 🔺 MULTI-MARKET ARBITRAGE ({group_key})\n"
+    for leg in basket:
+        q = related[leg['market']].get('question', '')
+        alert_text += f"BUY {leg['shares']:.1f} {leg['outcome'].upper()} @ {leg['price']:.3f} | {q[:60]}\n"
+    alert_text += f"Basket Cost: ${cost:.2f} | Guaranteed Profit: ${profit:.2f} ({profit / cost * 100:.2f}%)\n"
+    alert_text += "-" * 60 + "\n"
+    print(alert_text)
+    try:
+        with open('opportunities.log', 'a', encoding='utf-8') as f:
+            f.write(alert_text)
+    except: pass
+
+def print_spread_alert(ma, mb, spread, z, n):
+    alert_text = f"\n[{datetime.now().strftime('%H:%M:%S')}] [CORR] 📈 SPREAD DIVERGENCE (z={z:+.2f}, n={n})\n"
+    alert_text += f"A: {ma.get('question')}\n"
+    alert_text += f"B: {mb.get('question')}\n"
+    alert_text += f"Mid Spread (A - B): {spread:+.3f}\n"
+    alert_text += f"Link: https://polymarket.com/event/{ma.get('slug', '')}\n"
+    alert_text += "-" * 60 + "\n"
+    print(alert_text)
+    try:
+        with open('opportunities.log', 'a', encoding='utf-8') as f:
+            f.write(alert_text)
+    except: pass
+
+def print_logical_alert(master, sub, qm, qs, cost):
+    profit = (1 - cost) * 100
+    alert_text = f"\n[{datetime.now().strftime('%H:%M:%S')}] [CORR] 🧩 LOGICAL VIOLATION FOUND!\n"
+    alert_text += f"Master: {master.get('question')} (YES ask {qm['yes_ask']:.3f})\n"
+    alert_text += f"Sub:    {sub.get('question')} (YES bid {qs.get('yes_bid', 0):.3f}, NO ask {qs['no_ask']:.3f})\n"
+    alert_text += f"Basket: BUY Master YES + BUY Sub NO = ${cost:.3f} | Profit: {profit:.2f}%\n"
+    alert_text += f"Link: https://polymarket.com/event/{master.get('slug', '')}\n"
+    alert_text += "-" * 60 + "\n"
+    print(alert_text)
+    try:
+        with open('opportunities.log', 'a', encoding='utf-8') as f:
+            f.write(alert_text)
+    except: pass
 
 if __name__ == "__main__":
     import argparse
@@ -70,6 +294,9 @@ if __name__ == "__main__":
 
     scanner = CorrelatedScanner()
     print("Correlated Pairs & Spread Scanner (Ultra-Pro)")
+    if config.WS_ENABLED:
+        poly_ws.start()
+        scanner.attach_ws(poly_ws)
     while True:
         try:
             scanner.check_correlations()
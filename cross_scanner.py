@@ -7,19 +7,30 @@ from poly_client import PolyClient
 from kalshi_client import KalshiClient
 import config
 from risk_manager import risk_manager
+from embedding_cache import embedding_cache
+import numpy as np
+from match_index import MarketMatchIndex, kalshi_key
+from match_store import MatchDecisionStore
+from book_model import from_poly_market_books, pair_cost
+from event_graph import event_key_for
 
 # Global Instances
 poly = PolyClient()
 kalshi = KalshiClient()
+k_index = MarketMatchIndex()
+match_store = MatchDecisionStore()
 nlp_model = None
 
 def get_nlp_model():
     global nlp_model
     if nlp_model is None:
         try:
-            from sentence_transformers import SentenceTransformer
-            print("Loading NLP Model (all-MiniLM-L6-v2) for matching...")
-            nlp_model = SentenceTransformer('all-MiniLM-L6-v2')
+            import nlp_backend
+            print(f"Loading NLP Model ({nlp_backend.model_version()}) for matching...")
+            nlp_model = nlp_backend.load_encoder()
+            # The stores were stamped at import; follow an ONNX -> torch fallback
+            embedding_cache.set_model(nlp_backend.model_version())
+            match_store.model_name = nlp_backend.model_version()
         except Exception as e:
             print(f"NLP model loading failed: {e}")
     return nlp_model
@@ -42,14 +53,13 @@ def calculate_kelly_size(profit_pct):
     size = config.BANKROLL_USD * (profit_pct / 100) * config.KELLY_FRACTION * 10
     return max(config.TARGET_TRADE_SIZE_USD, min(size, config.MAX_EXPOSURE_PER_MARKET_USD))
 
-def get_vwap_price(order_list, target_usd, is_kalshi=False):
+def get_vwap_price(order_list, target_usd):
     if not order_list: return None
     total_spent = 0
     total_qty = 0
     normalized = []
     for o in order_list:
-        if is_kalshi: normalized.append({'p': float(o[0]) / 100.0, 's': float(o[1])})
-        else: normalized.append({'p': parse_p(o['price']), 's': float(o.get('size', 0))})
+        normalized.append({'p': parse_p(o['price']), 's': float(o.get('size', 0))})
     sorted_orders = sorted(normalized, key=lambda x: x['p'])
     for order in sorted_orders:
         price = order['p']
@@ -66,39 +76,105 @@ def get_vwap_price(order_list, target_usd, is_kalshi=False):
             total_qty += size
     return None
 
-def find_kalshi_match_semantic(poly_market, kalshi_markets, k_embeddings=None, mapping=None):
+def find_kalshi_match_semantic(poly_market, k_index, p_embedding=None, mapping=None):
+    """
+    Match a Polymarket market against the incrementally maintained Kalshi index.
+    p_embedding is the question embedding, batch-encoded once per cycle.
+    Returns (kalshi_market_or_None, score, method). On a rejection the score is
+    the best semantic similarity seen (for the decision store).
+    """
     poly_slug = poly_market.get('slug', '').lower()
-    poly_question = poly_market.get('question', '').lower()
     
     # 0. Manual Mapping Override (Highest Priority)
     if mapping and poly_slug in mapping:
-        k_ticker = mapping[poly_slug]
-        for km in kalshi_markets:
-            if (km.get('ticker') or km.get('event_ticker', '')) == k_ticker:
-                return km
-
-    # 1. Fast path: ticker/slug overlap
-    for km in kalshi_markets:
-        k_ticker = (km.get('ticker') or km.get('event_ticker', '')).lower()
-        if poly_slug and k_ticker and (poly_slug in k_ticker or k_ticker in poly_slug):
-            return km  
+        km = k_index.get(mapping[poly_slug])
+        if km: return km, 1.0, "manual"
+
+    # 1. Fast path: ticker/slug overlap (inverted token index)
+    km = k_index.match_slug(poly_slug)
+    if km: return km, 1.0, "slug"
     
-    # 2. Semantic Fallback (NLP)
-    model = get_nlp_model()
-    if model is None or k_embeddings is None: return None
-    try:
-        from sentence_transformers import util
-        p_emb = model.encode(poly_question, convert_to_tensor=True)
-        hits = util.cos_sim(p_emb, k_embeddings)[0]
-        best_idx = hits.argmax()
-        if hits[best_idx] > config.NLP_MATCH_THRESHOLD:
-            return kalshi_markets[best_idx]
-    except: pass
-    return None
+    # 2. Semantic Fallback (NLP, ANN index)
+    hits = k_index.search(p_embedding, getattr(config, 'NLP_MATCH_TOP_K', 3))
+    for km, score in hits:
+        if score > config.NLP_MATCH_THRESHOLD:
+            return km, score, "semantic"
+    return None, (hits[0][1] if hits else None), "semantic"
+
+def resolve_matches(p_active, model, mapping):
+    """
+    Map each Poly market index to its Kalshi match (or None).
+    Cached decisions are reused; only new/invalidated markets are encoded and matched.
+    """
+    matches = {}
+    pending = []
+    for i, market in enumerate(p_active):
+        if market.get('slug', '').lower() in mapping:
+            pending.append(i)  # Manual overrides are cheap and always authoritative
+            continue
+        hit, km = match_store.lookup(market, k_index, kalshi_text)
+        if hit: matches[i] = km
+        else: pending.append(i)
+
+    if not pending: return matches
+
+    p_embeddings = None
+    if model and len(k_index):
+        p_embeddings = embedding_cache.encode(model, [p_active[i].get('question', '').lower() for i in pending])
+
+    for j, i in enumerate(pending):
+        market = p_active[i]
+        p_emb = p_embeddings[j] if p_embeddings is not None else None
+        km, score, method = find_kalshi_match_semantic(market, k_index, p_emb, mapping)
+        matches[i] = km
+        # Semantic rejections are only meaningful when we actually had an embedding
+        if method != "manual" and (km is not None or p_emb is not None):
+            match_store.record(market, km, score, method, km is not None, kalshi_text)
+    return matches
+
+def recheck_rejections(p_active, model, tickers):
+    """
+    Re-match the stored rejections among p_active against the given (newly listed or
+    re-titled) Kalshi markets only, instead of dropping every rejection.
+    Returns the number of rejections turned into matches.
+    """
+    kms = [km for km in (k_index.get(t) for t in tickers) if km]
+    rejected = [m for m in p_active if match_store.is_rejected(m)]
+    if not kms or not rejected: return 0
+    k_emb = p_emb = None
+    if model:
+        k_emb = embedding_cache.encode(model, [kalshi_text(km) for km in kms])
+        p_emb = embedding_cache.encode(model, [m.get('question', '').lower() for m in rejected])
+    found = 0
+    for j, market in enumerate(rejected):
+        slug = market.get('slug', '').lower()
+        km, score, method = None, None, None
+        for cand in kms:
+            key = kalshi_key(cand).lower()
+            if slug and key and (slug in key or key in slug):
+                km, score, method = cand, 1.0, "slug"
+                break
+        if km is None and k_emb is not None and p_emb is not None:
+            sims = np.asarray(k_emb) @ np.asarray(p_emb[j])
+            best = int(np.argmax(sims))
+            if sims[best] > config.NLP_MATCH_THRESHOLD:
+                km, score, method = kms[best], float(sims[best]), "semantic"
+        if km:
+            match_store.record(market, km, score, method, True, kalshi_text)
+            found += 1
+    return found
 
-def check_cross_platform_arb(poly_market, poly_ob, kalshi_market):
-    fee_multiplier = 1 + (config.FEE_PCT / 100)
-    target_leg = config.TARGET_TRADE_SIZE_USD / 2
+def kalshi_text(km):
+    return (km.get('title', '') + " " + km.get('subtitle', '')).lower()
+
+def check_cross_platform_arb(poly_market, poly_ob, kalshi_market, k_book=None):
+    """
+    poly_ob: PolyClient.get_market_orderbooks() output.
+    k_book: normalized Kalshi BinaryBook (KalshiClient.get_book / get_orderbooks).
+    Each direction is priced by walking both venues' ask ladders together, with
+    each venue's own fee model applied per share.
+    """
+    target_usd = config.TARGET_TRADE_SIZE_USD
     
     # Dynamic Threshold based on Poly Volume
     volume = float(poly_market.get('volume24hr', 0))
@@ -106,32 +182,24 @@ def check_cross_platform_arb(poly_market, poly_ob, kalshi_market):
     if config.VOLATILITY_ADJUSTMENT_ENABLED and volume < 50000:
         min_profit += config.HIGH_VOL_PROFIT_BUFFER
 
-    p_yes_vwap = get_vwap_price(poly_ob.get('yes', []), target_leg)
-    p_no_vwap = get_vwap_price(poly_ob.get('no', []), target_leg)
-    
-    k_ob = kalshi.get_market_orderbook(kalshi_market.get('ticker'))
-    if not k_ob: return
-    
-    k_yes_vwap = get_vwap_price(k_ob.get('yes', []), target_leg, is_kalshi=True)
-    k_no_vwap = get_vwap_price(k_ob.get('no', []), target_leg, is_kalshi=True)
+    p_book = from_poly_market_books(poly_ob)
+    if p_book is None: return
+    if k_book is None:
+        k_book = kalshi.get_book(kalshi_market.get('ticker'))
+    if not k_book: return
     
-    if p_yes_vwap and k_no_vwap:
-        total = (p_yes_vwap + k_no_vwap) * fee_multiplier
-        if total < 1 - (min_profit / 100):
+    legs = [
+        ("CROSS (Poly YES + Kalshi NO)", p_book.yes, k_book.no),
+        ("CROSS (Kalshi YES + Poly NO)", k_book.yes, p_book.no),
+    ]
+    for type_name, leg_a, leg_b in legs:
+        total, _ = pair_cost(leg_a, leg_b, target_usd)
+        if total and total < 1 - (min_profit / 100):
             profit = (1 - total) * 100
             rec_size = calculate_kelly_size(profit)
-            can_add, reason = risk_manager.can_add_position(poly_market['slug'], poly_market['slug'], rec_size)
+            can_add, reason = risk_manager.can_add_position(event_key_for(poly_market), poly_market['slug'], rec_size)
             risk_msg = "" if can_add else f" [RISK WARNING: {reason}]"
-            print_alert("CROSS (Poly YES + Kalshi NO)", poly_market['question'], total, profit, poly_market['slug'], size=rec_size, risk_msg=risk_msg)
-
-    if k_yes_vwap and p_no_vwap:
-        total = (k_yes_vwap + p_no_vwap) * fee_multiplier
-        if total < 1 - (min_profit / 100):
-            profit = (1 - total) * 100
-            rec_size = calculate_kelly_size(profit)
-            can_add, reason = risk_manager.can_add_position(poly_market['slug'], poly_market['slug'], rec_size)
-            risk_msg = "" if can_add else f" [RISK WARNING: {reason}]"
-            print_alert("CROSS (Kalshi YES + Poly NO)", poly_market['question'], total, profit, poly_market['slug'], size=rec_size, risk_msg=risk_msg)
+            print_alert(type_name, poly_market['question'], total, profit, poly_market['slug'], size=rec_size, risk_msg=risk_msg)
 
 def print_alert(type_name, q, total, profit, slug, size=0, risk_msg=""):
     alert_text = f"\n[{datetime.now().strftime('%H:%M:%S')}] [CROSS] 🌐 {type_name} ARBITRAGE FOUND!{risk_msg}\n"
@@ -162,18 +230,38 @@ def main():
             p_active = poly.fetch_active_markets(config.MIN_VOLUME_24H, config.MAX_P_MARKETS)
             k_active = kalshi.fetch_active_markets(config.MAX_K_MARKETS)
             
-            k_embeddings = None
-            if model and k_active:
-                print(f"[{datetime.now().strftime('%H:%M:%S')}] Encoding {len(k_active)} markets...")
-                k_texts = [(km.get('title', '') + " " + km.get('subtitle', '')).lower() for km in k_active]
-                k_embeddings = model.encode(k_texts, convert_to_tensor=True)
-
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] Monitoring {len(p_active)} Poly vs {len(k_active)} Kalshi...")
-            for market in p_active:
+            misses_before = embedding_cache.misses
+            if k_active is None:
+                # Incomplete fetch: keep the previous index (and the decisions tied to it)
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] ⚠️ Kalshi market list incomplete, skipping index sync this cycle.")
+            else:
+                encode_fn = (lambda texts: embedding_cache.encode(model, texts)) if model else None
+                added, removed = k_index.sync(k_active, kalshi_text, encode_fn)
+                if added or removed:
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] Match index: +{added} / -{removed} Kalshi markets ({len(k_index)} live)")
+                # Only genuinely new listings (persisted across restarts) and re-titled markets
+                fresh = match_store.note_kalshi(k_index.markets) | set(k_index.retitled)
+                rematched = recheck_rejections(p_active, model, fresh)
+                if rematched: print(f"[{datetime.now().strftime('%H:%M:%S')}] {rematched} rejected markets matched new Kalshi listings")
+
+            matches = resolve_matches(p_active, model, match_store.manual_entries(mapping))
+            if embedding_cache.misses > misses_before:
+                embedding_cache.save()
+            if getattr(config, 'MATCH_STORE_EXPORT_MAPPING', False):
+                exported = match_store.export_to_mapping(mapping)
+                if exported: print(f"[{datetime.now().strftime('%H:%M:%S')}] Exported {exported} confident matches to market_mapping.json")
+            match_store.save()
+
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] Monitoring {len(p_active)} Poly vs {len(k_index)} Kalshi ({sum(1 for km in matches.values() if km)} matched)...")
+            # One concurrent round of Kalshi book fetches for every matched market
+            k_books = kalshi.get_orderbooks([km.get('ticker') for km in matches.values() if km])
+            for i, market in enumerate(p_active):
+                k_match = matches.get(i)
+                if not k_match: continue
+                k_book = k_books.get(k_match.get('ticker'))
+                if not k_book: continue
                 ob = poly.get_market_orderbooks(market)
-                if not ob: continue
-                k_match = find_kalshi_match_semantic(market, k_active, k_embeddings, mapping)
-                if k_match: check_cross_platform_arb(market, ob, k_match)
+                if ob: check_cross_platform_arb(market, ob, k_match, k_book)
             
             if args.once: break
             time.sleep(config.POLL_INTERVAL_CROSS)
@@ -0,0 +1,103 @@
+import os
+import re
+import hashlib
+from collections import OrderedDict
+import numpy as np
+import config
+import nlp_backend
+
+class EmbeddingCache:
+    """
+    Persistent LRU store of sentence embeddings, keyed by a hash of the normalized text.
+
+    Market titles barely change between cycles, so re-encoding all of them every
+    POLL_INTERVAL_CROSS is wasted CPU. Only texts we have never seen hit the model,
+    and they are encoded together in a single batch.
+    Vectors are stored L2-normalized, so cosine similarity is a plain dot product.
+    """
+    def __init__(self, path=None, max_entries=None, model_name=None):
+        self.path = path or getattr(config, 'EMBEDDING_CACHE_FILE', 'embedding_cache.npz')
+        self.max_entries = max_entries or getattr(config, 'EMBEDDING_CACHE_MAX_ENTRIES', 20000)
+        self.model_name = model_name or nlp_backend.model_version()
+        self.entries = OrderedDict()  # {text_hash: np.ndarray} (oldest first)
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+        self.load()
+
+    @staticmethod
+    def normalize_text(text):
+        return re.sub(r'\s+', ' ', (text or '').lower()).strip()
+
+    @classmethod
+    def text_key(cls, text):
+        return hashlib.sha1(cls.normalize_text(text).encode('utf-8')).hexdigest()
+
+    def load(self):
+        """Load the store from disk. A store written by a different model is discarded."""
+        if not os.path.exists(self.path): return
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                if str(data['model']) != self.model_name:
+                    print(f"Embedding cache was built with '{data['model']}', starting fresh.")
+                    return
+                for k, vec in zip(data['keys'], data['vectors']):
+                    self.entries[str(k)] = vec
+        except Exception as e:
+            print(f"Embedding cache load failed: {e}")
+
+    def set_model(self, model_name):
+        """Switch to a different model version; vectors from the old one are dropped."""
+        if model_name == self.model_name: return
+        self.model_name = model_name
+        self.entries.clear()
+        self.load()
+
+    def save(self):
+        """Atomically persist the store (only if something changed)."""
+        if not self.dirty or not self.entries: return
+        try:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, model=np.array(self.model_name),
+                         keys=np.array(list(self.entries.keys())),
+                         vectors=np.stack(list(self.entries.values())))
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+        except Exception as e:
+            print(f"Embedding cache save failed: {e}")
+
+    def _evict(self):
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def encode(self, model, texts):
+        """
+        Return an (N, dim) float32 matrix of normalized embeddings for `texts`.
+        Cache misses are encoded in one batched model call.
+        """
+        if not texts: return None
+        keys = [self.text_key(t) for t in texts]
+
+        missing = {}
+        for k, t in zip(keys, texts):
+            if k in self.entries:
+                self.entries.move_to_end(k)
+                self.hits += 1
+            elif k not in missing:
+                missing[k] = self.normalize_text(t)
+
+        if missing:
+            self.misses += len(missing)
+            vecs = model.encode(list(missing.values()), batch_size=64,
+                                convert_to_numpy=True, normalize_embeddings=True)
+            for k, vec in zip(missing.keys(), vecs):
+                self.entries[k] = np.asarray(vec, dtype=np.float32)
+            self.dirty = True
+
+        matrix = np.stack([self.entries[k] for k in keys])
+        self._evict()
+        return matrix
+
+# Singleton instance for shared usage
+embedding_cache = EmbeddingCache()
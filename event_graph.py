@@ -0,0 +1,95 @@
+import threading
+
+def market_id_of(m):
+    return m.get('id') or m.get('conditionId')
+
+def event_key_for(market):
+    """
+    Stable event identity for a Gamma market.
+    Neg-risk id first (mutually exclusive outcome set), then the Gamma event id,
+    then the market's own slug (a market with no event is its own event).
+    """
+    neg_id = market.get('negRiskMarketID')
+    if market.get('negRisk') and neg_id:
+        return f"neg:{neg_id}"
+    events = market.get('events') or []
+    if events and isinstance(events, list) and events[0].get('id'):
+        return f"evt:{events[0]['id']}"
+    if market.get('event_slug'):
+        return f"slug:{market['event_slug']}"
+    return f"mkt:{market_id_of(market) or market.get('slug', 'unknown')}"
+
+class EventGraph:
+    """
+    Market <-> event registry built from Gamma event ids and neg-risk ids.
+    update() applies only the diff against the previous market list, and
+    siblings() is a dict lookup. Shared by the correlated, multi-outcome and risk code.
+    """
+    def __init__(self):
+        self.markets = {}        # {market_id: market}
+        self.market_event = {}   # {market_id: event_key}
+        self.members = {}        # {event_key: set(market_id)}
+        self.meta = {}           # {event_key: {'title', 'slug', 'neg_risk'}}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.markets)
+
+    def _detach(self, mid):
+        key = self.market_event.pop(mid, None)
+        if key is None: return
+        members = self.members.get(key)
+        if members:
+            members.discard(mid)
+            if not members:
+                del self.members[key]
+                self.meta.pop(key, None)
+
+    def _attach(self, mid, market):
+        key = event_key_for(market)
+        self.market_event[mid] = key
+        self.members.setdefault(key, set()).add(mid)
+        if key not in self.meta:
+            events = market.get('events') or [{}]
+            self.meta[key] = {
+                "title": events[0].get('title') or market.get('question'),
+                "slug": events[0].get('slug') or market.get('slug'),
+                "neg_risk": key.startswith('neg:'),
+            }
+
+    def update(self, markets):
+        """Sync with the current market registry. Returns (added, removed, moved)."""
+        current = {market_id_of(m): m for m in markets if market_id_of(m)}
+        added = removed = moved = 0
+        with self.lock:
+            for mid in [mid for mid in self.markets if mid not in current]:
+                self._detach(mid)
+                del self.markets[mid]
+                removed += 1
+            for mid, m in current.items():
+                if mid not in self.markets:
+                    self._attach(mid, m)
+                    added += 1
+                elif self.market_event.get(mid) != event_key_for(m):
+                    self._detach(mid)
+                    self._attach(mid, m)
+                    moved += 1
+                self.markets[mid] = m
+        return added, removed, moved
+
+    def event_of(self, market_id):
+        return self.market_event.get(market_id)
+
+    def siblings(self, market_id):
+        """All markets of the same event, including this one (O(1) lookup, do not mutate)."""
+        key = self.market_event.get(market_id)
+        return self.members.get(key, frozenset()) if key else frozenset()
+
+    def groups(self, min_size=2):
+        """{event_key: [market, ...]} for events with at least `min_size` live markets."""
+        with self.lock:
+            return {key: [self.markets[mid] for mid in mids]
+                    for key, mids in self.members.items() if len(mids) >= min_size}
+
+# Singleton instance for shared usage
+event_graph = EventGraph()
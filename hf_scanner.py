@@ -51,17 +51,22 @@ def check_hf_arbitrage(market, obs):
     question = market.get('question', 'Unknown')
     slug = market.get('slug', '')
     
-    # HF Fee adjustment (usually lower or zero if maker, but using config default)
-    fee_multiplier = 1 + (config.FEE_PCT / 100)
-    
     y_price = get_vwap_price(obs.get('yes', {}).get('asks', []), HF_TARGET_TRADE_SIZE / 2)
     n_price = get_vwap_price(obs.get('no', {}).get('asks', []), HF_TARGET_TRADE_SIZE / 2)
     
-    if y_price and n_price:
-        total_cost = (y_price + n_price) * fee_multiplier
-        if total_cost < 1 - (HF_MIN_PROFIT_PCT / 100):
-            profit = (1 - total_cost) * 100
-            print_hf_alert(question, total_cost, profit, slug)
+    hit = hf_signal(y_price, n_price)
+    if hit:
+        total_cost, profit = hit
+        print_hf_alert(question, total_cost, profit, slug)
+
+def hf_signal(y_price, n_price, min_profit_pct=HF_MIN_PROFIT_PCT, fee_pct=None):
+    """Taker arb on the two VWAP ask prices. Returns (total_cost, profit_pct) or None."""
+    if not y_price or not n_price: return None
+    if fee_pct is None: fee_pct = config.FEE_PCT
+    total_cost = (y_price + n_price) * (1 + fee_pct / 100)
+    if total_cost < 1 - (min_profit_pct / 100):
+        return total_cost, (1 - total_cost) * 100
+    return None
 
 def print_hf_alert(q, total, profit, slug):
     alert_text = f"\n[{datetime.now().strftime('%H:%M:%S')}] [HF] ⚡ 15m ARBITRAGE!\n"
@@ -0,0 +1,100 @@
+import re
+
+def _contains(outer, inner):
+    """Whole-word containment: 'will x win' is in 'will x win in 2028' but not 'will x winner'."""
+    return outer != inner and f" {inner} " in f" {outer} "
+
+def normalize_question(q):
+    """Lowercase, strip punctuation, collapse whitespace: 'Will X win?' -> 'will x win'."""
+    return re.sub(r'\s+', ' ', re.sub(r'[^a-z0-9$%. ]+', ' ', (q or '').lower())).strip(' .')
+
+class ImplicationGraph:
+    """
+    Incrementally maintained "sub implies master" graph between markets.
+
+    If master's normalized question is contained in the sub's (e.g. "will bitcoin
+    hit 100k" inside "will bitcoin hit 100k in january"), the sub is the more specific
+    event, so P(sub) <= P(master) must hold.
+
+    Edges are found with a token inverted index: adding a market only touches the
+    posting lists of its own tokens instead of comparing against every question.
+    """
+    def __init__(self):
+        self.questions = {}   # {market_id: normalized question}
+        self.token_sets = {}  # {market_id: frozenset(tokens)}
+        self.postings = {}    # {token: set(market_id)}
+        self.masters = {}     # {sub_id: set(master_id)}
+        self.subs = {}        # {master_id: set(sub_id)}
+
+    def __len__(self):
+        return len(self.questions)
+
+    def edge_count(self):
+        return sum(len(s) for s in self.subs.values())
+
+    def _link(self, master_id, sub_id):
+        self.subs.setdefault(master_id, set()).add(sub_id)
+        self.masters.setdefault(sub_id, set()).add(master_id)
+
+    def add(self, market_id, question):
+        q = normalize_question(question)
+        if not q or self.questions.get(market_id) == q: return
+        if market_id in self.questions: self.remove(market_id)
+        tokens = frozenset(q.split())
+
+        # Markets containing ALL our tokens are the only possible subs of us
+        ordered = sorted(tokens, key=lambda t: len(self.postings.get(t, ())))
+        supersets = set(self.postings.get(ordered[0], ())) if ordered else set()
+        for t in ordered[1:]:
+            if not supersets: break
+            supersets &= self.postings.get(t, set())
+        for other in supersets:
+            if _contains(self.questions[other], q):
+                self._link(market_id, other)
+
+        # Markets whose tokens are ALL among ours are the only possible masters of us
+        hits = {}
+        for t in tokens:
+            for other in self.postings.get(t, ()):
+                hits[other] = hits.get(other, 0) + 1
+        for other, n in hits.items():
+            if n == len(self.token_sets[other]) and _contains(q, self.questions[other]):
+                self._link(other, market_id)
+
+        self.questions[market_id] = q
+        self.token_sets[market_id] = tokens
+        for t in tokens:
+            self.postings.setdefault(t, set()).add(market_id)
+
+    def remove(self, market_id):
+        if market_id not in self.questions: return
+        for t in self.token_sets.pop(market_id):
+            p = self.postings.get(t)
+            if p:
+                p.discard(market_id)
+                if not p: del self.postings[t]
+        del self.questions[market_id]
+        for m in self.masters.pop(market_id, ()):
+            self.subs.get(m, set()).discard(market_id)
+        for s in self.subs.pop(market_id, ()):
+            self.masters.get(s, set()).discard(market_id)
+
+    def sync(self, markets, id_fn):
+        """Add new markets, drop ones no longer listed. Returns (added, removed)."""
+        current = {id_fn(m): m for m in markets if id_fn(m)}
+        gone = [mid for mid in self.questions if mid not in current]
+        for mid in gone: self.remove(mid)
+        before = len(self.questions)
+        for mid, m in current.items():
+            self.add(mid, m.get('question', ''))
+        return len(self.questions) - before, len(gone)
+
+    def edges_for(self, market_id):
+        """All (master_id, sub_id) edges touching a market: O(degree)."""
+        for s in self.subs.get(market_id, ()):
+            yield market_id, s
+        for m in self.masters.get(market_id, ()):
+            yield m, market_id
+
+    def linked_markets(self):
+        return {m for m, s in self.subs.items() if s} | {s for s, m in self.masters.items() if m}
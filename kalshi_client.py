@@ -1,21 +1,43 @@
 import requests
 import time
+import threading
+import concurrent.futures
+from datetime import datetime
+from requests.adapters import HTTPAdapter
 import config
+from rate_limiter import get_host_limiter
+from book_model import from_kalshi_orderbook
 
 class KalshiClient:
     def __init__(self):
         # Using public elections API as it's more stable for reading data without 401s
         self.base_url = "https://api.elections.kalshi.com/trade-api/v2"
         self.session = requests.Session()
+        workers = getattr(config, 'KALSHI_BOOK_WORKERS', 8)
+        self.session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=workers))
+        self.limiter = get_host_limiter(self.base_url, getattr(config, 'KALSHI_MAX_RPS', 10))
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+        self._cooldown_until = 0
+        self._book_cache = {}  # {ticker: (fetched_at, BinaryBook)}
+        self._cache_lock = threading.Lock()
 
     def _request_with_retries(self, url, params=None, timeout=10):
+        # Silent Backoff Check (429s set a cooldown instead of blocking the caller)
+        if time.time() < self._cooldown_until:
+            return None
+
         for i in range(config.API_MAX_RETRIES):
             try:
+                self.limiter.acquire()
                 resp = self.session.get(url, params=params, timeout=timeout)
                 if resp.status_code == 200:
                     return resp
                 if resp.status_code == 429:
-                    time.sleep(30)
+                    try: backoff_sec = float(resp.headers.get('Retry-After'))
+                    except (TypeError, ValueError): backoff_sec = getattr(config, 'REST_BACKOFF_SEC', 30)
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] 🛑 Kalshi Rate Limit (429). Cooling off for {backoff_sec:.0f}s...")
+                    self._cooldown_until = time.time() + backoff_sec
+                    return None
                 else:
                     time.sleep(config.API_RETRY_DELAY)
             except:
@@ -23,19 +45,68 @@ class KalshiClient:
         return None
 
     def fetch_active_markets(self, limit=1000):
+        """
+        Fetch up to `limit` open markets, following the pagination cursor.
+        Returns None if a page failed (429 cooldown, errors): a partial list must not
+        be mistaken for the full set of open markets.
+        """
         url = f"{self.base_url}/markets"
-        params = {"limit": limit, "status": "open"}
-        resp = self._request_with_retries(url, params=params)
-        if resp:
-            try: return resp.json().get('markets', [])
-            except: pass
-        return []
+        markets = []
+        cursor = None
+        while len(markets) < limit:
+            params = {"limit": min(limit - len(markets), 1000), "status": "open"}
+            if cursor: params["cursor"] = cursor
+            resp = self._request_with_retries(url, params=params)
+            if not resp: return None
+            try: data = resp.json()
+            except: return None
+            markets.extend(data.get('markets', []))
+            cursor = data.get('cursor')
+            if not cursor or not data.get('markets'): break
+        return markets[:limit]
 
     def get_market_orderbook(self, ticker):
-        """Fetch v2 order book (depth) for a specific ticker."""
+        """Fetch raw v2 order book (depth) for a specific ticker: YES/NO bid ladders in cents."""
         url = f"{self.base_url}/markets/{ticker}/orderbook"
         resp = self._request_with_retries(url, timeout=5)
         if resp:
             try: return resp.json().get('orderbook', {})
             except: pass
         return None
+
+    def get_book(self, ticker):
+        """Normalized BinaryBook for a ticker (asks derived once at fetch time, short-TTL cached)."""
+        ttl = getattr(config, 'KALSHI_BOOK_TTL_SEC', 2)
+        with self._cache_lock:
+            cached = self._book_cache.get(ticker)
+        if cached and time.time() - cached[0] < ttl:
+            return cached[1]
+
+        raw = self.get_market_orderbook(ticker)
+        if raw is None: return None
+        book = from_kalshi_orderbook(raw)
+        with self._cache_lock:
+            self._book_cache[ticker] = (time.time(), book)
+        return book
+
+    def get_orderbooks(self, tickers):
+        """
+        Fetch many order books concurrently (bounded by the per-host rate budget).
+        Returns {ticker: BinaryBook} for the books that could be fetched.
+        """
+        tickers = [t for t in dict.fromkeys(tickers) if t]
+        books = {}
+        futures = {self.pool.submit(self.get_book, t): t for t in tickers}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                book = future.result()
+                if book is not None: books[futures[future]] = book
+            except: pass
+
+        # Drop expired entries so the cache stays bounded to live markets
+        ttl = getattr(config, 'KALSHI_BOOK_TTL_SEC', 2)
+        now = time.time()
+        with self._cache_lock:
+            for t in [t for t, (ts, _) in self._book_cache.items() if now - ts > ttl * 10]:
+                del self._book_cache[t]
+        return books
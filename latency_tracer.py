@@ -0,0 +1,143 @@
+import json
+import math
+import time
+import heapq
+import threading
+import config
+
+def now_ns():
+    """Monotonic nanosecond clock shared by every stage (WS thread included)."""
+    return time.perf_counter_ns()
+
+class LatencyHistogram:
+    """
+    Log-bucketed histogram (4 buckets per power of two, ~19% resolution).
+    O(1) record, percentiles by walking the few hundred buckets.
+    """
+    BUCKETS_PER_OCTAVE = 4
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.max_ns = 0
+
+    def record(self, ns):
+        b = int(math.log2(ns) * self.BUCKETS_PER_OCTAVE) if ns > 0 else 0
+        self.counts[b] = self.counts.get(b, 0) + 1
+        self.count += 1
+        if ns > self.max_ns: self.max_ns = ns
+
+    def percentile(self, q):
+        if not self.count: return 0.0
+        rank = q * self.count
+        seen = 0
+        for b in sorted(self.counts):
+            seen += self.counts[b]
+            if seen >= rank:
+                return min(2 ** ((b + 1) / self.BUCKETS_PER_OCTAVE), self.max_ns)  # Bucket upper bound
+        return float(self.max_ns)
+
+class Trace:
+    """One opportunity's path: ordered (stage, ns) stamps."""
+    __slots__ = ('key', 'stamps')
+
+    def __init__(self, key, stamps=None):
+        self.key = key
+        self.stamps = list(stamps or [])
+
+    def mark(self, stage, ns=None):
+        self.stamps.append((stage, ns or now_ns()))
+
+    def total_ns(self):
+        return self.stamps[-1][1] - self.stamps[0][1] if len(self.stamps) > 1 else 0
+
+    def to_dict(self):
+        t0 = self.stamps[0][1] if self.stamps else 0
+        return {"key": self.key, "total_ms": self.total_ns() / 1e6,
+                "stages": [{"stage": s, "at_ms": (ns - t0) / 1e6} for s, ns in self.stamps]}
+
+class LatencyTracer:
+    """
+    Tick-to-trade spans. A trace is started when a strategy decides to act (seeded
+    with the WS receive / book-apply stamps of the book it used) and is carried
+    through the executor on a thread-local, so risk gate, signing, send and ack
+    are marked without threading the trace through every call.
+    finish() folds each stage-to-stage delta into a per-transition histogram and
+    keeps the slowest N traces for dumping.
+    """
+    def __init__(self, keep_slowest=None, enabled=None):
+        self.enabled = enabled if enabled is not None else getattr(config, 'LATENCY_TRACE_ENABLED', True)
+        self.keep_slowest = keep_slowest or getattr(config, 'LATENCY_TRACE_SLOWEST', 20)
+        self.histograms = {}  # {"stage_a->stage_b" | "total->last_stage": LatencyHistogram}
+        self.slowest = []     # min-heap of (total_ns, seq, trace)
+        self.seq = 0
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def start(self, key, stamps=None):
+        """Begin a trace (optionally seeded with earlier stamps) and make it current on this thread."""
+        if not self.enabled: return None
+        trace = Trace(key, stamps)
+        self.local.trace = trace
+        return trace
+
+    def resume(self, trace):
+        """Make an existing trace current on this thread (e.g. when a queued opportunity is executed)."""
+        self.local.trace = trace
+
+    def current(self):
+        return getattr(self.local, 'trace', None)
+
+    def mark(self, stage):
+        trace = self.current()
+        if trace is not None: trace.mark(stage)
+
+    def discard(self):
+        self.local.trace = None
+
+    def finish(self, trace=None):
+        trace = trace or self.current()
+        self.local.trace = None
+        if trace is None or len(trace.stamps) < 2: return
+        with self.lock:
+            for (a, t_a), (b, t_b) in zip(trace.stamps, trace.stamps[1:]):
+                self._hist(f"{a}->{b}").record(t_b - t_a)
+            total = trace.total_ns()
+            # Keyed by the last stage reached: aborted paths don't skew tick-to-ack totals
+            self._hist(f"total->{trace.stamps[-1][0]}").record(total)
+            self.seq += 1
+            item = (total, self.seq, trace)
+            if len(self.slowest) < self.keep_slowest: heapq.heappush(self.slowest, item)
+            elif total > self.slowest[0][0]: heapq.heapreplace(self.slowest, item)
+
+    def _hist(self, name):
+        h = self.histograms.get(name)
+        if h is None: h = self.histograms[name] = LatencyHistogram()
+        return h
+
+    def summary(self):
+        """{transition: {'count', 'p50_ms', 'p90_ms', 'p99_ms', 'max_ms'}}"""
+        with self.lock:
+            return {name: {"count": h.count, "p50_ms": h.percentile(0.50) / 1e6, "p90_ms": h.percentile(0.90) / 1e6,
+                           "p99_ms": h.percentile(0.99) / 1e6, "max_ms": h.max_ns / 1e6}
+                    for name, h in self.histograms.items()}
+
+    def report(self):
+        rows = self.summary()
+        if not rows: return
+        print(f"{'stage':<28}{'n':>7}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}  (ms)")
+        for name, r in sorted(rows.items(), key=lambda kv: kv[0].startswith('total')):
+            print(f"{name:<28}{r['count']:>7}{r['p50_ms']:>10.3f}{r['p90_ms']:>10.3f}{r['p99_ms']:>10.3f}{r['max_ms']:>10.3f}")
+
+    def dump_slowest(self, path=None):
+        """Write the slowest traces (slowest first) as JSON lines. Returns how many."""
+        path = path or getattr(config, 'LATENCY_TRACE_FILE', 'latency_traces.jsonl')
+        with self.lock:
+            traces = [t for _, _, t in sorted(self.slowest, reverse=True)]
+        with open(path, 'w', encoding='utf-8') as f:
+            for t in traces:
+                f.write(json.dumps(t.to_dict()) + "\n")
+        return len(traces)
+
+# Singleton instance for shared usage
+tracer = LatencyTracer()
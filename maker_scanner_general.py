@@ -5,10 +5,19 @@ from datetime import datetime
 from poly_client import PolyClient
 import config
 from trade_executor import TradeExecutor
+from requote_engine import RequoteEngine
+from latency_tracer import tracer, now_ns
+from pnl_engine import pnl_ledger
+from tick_recorder import tick_recorder
+from event_graph import event_key_for
+from maker_strategy import maker_signal
+from opportunity_allocator import OpportunityAllocator, Candidate, maker_fill_probability
 
 # Global Instance
 poly = PolyClient()
 executor = TradeExecutor(poly)
+requoter = RequoteEngine(executor)
+allocator = OpportunityAllocator()
 
 # General Maker Settings (from config)
 MAKER_POLL_INTERVAL = 15.0     # Slower poll for 200 markets
@@ -17,6 +26,10 @@ MAKER_POLL_INTERVAL = 15.0     # Slower poll for 200 markets
 from ws_client import poly_ws
 if config.WS_ENABLED:
     poly_ws.start()
+    pnl_ledger.attach_ws(poly_ws)  # Marks open positions on every book update
+    if getattr(config, 'TICK_RECORDER_ENABLED', False):
+        tick_recorder.attach(poly_ws)
+        print(f"📼 Recording WS book events to {tick_recorder.directory}/")
     print("🌐 WebSocket client started for real-time orderbook updates...")
 
 def parse_p(p_str):
@@ -40,8 +53,13 @@ def get_liquidity_depth(order_list, best_p):
     depth = sum(float(o.get('size', 0)) * best_p for o in order_list if parse_p(o.get('price')) == best_p)
     return depth
 
-def check_maker_opportunity(market, obs):
+def check_maker_opportunity(market, obs, allocator=None):
+    """
+    Evaluate one market. With an allocator the opportunity is queued as a Candidate
+    (capital is assigned after the whole scan); without one it trades immediately.
+    """
     if not obs: return "no_data"
+    scan_ns = now_ns()
     question = market.get('question', 'Unknown')
     slug = market.get('slug', '')
     
@@ -52,36 +70,44 @@ def check_maker_opportunity(market, obs):
     y_bid = get_best_bid(y_orders)
     n_bid = get_best_bid(n_orders)
     
-    # Dead Market Check
-    if not config.MAKER_ALLOW_DEAD_MARKETS:
-        if y_bid == 0 or n_bid == 0: return "dead"
-
     # LIQUIDITY DEPTH CHECK
     y_depth = get_liquidity_depth(y_orders, y_bid)
     n_depth = get_liquidity_depth(n_orders, n_bid)
-    max_depth = getattr(config, 'MAKER_MAX_QUEUE_DEPTH_USD', 500)
-    
-    if y_depth > max_depth or n_depth > max_depth:
-        return "depth"
-    
     total_liquidity = y_depth + n_depth
-    min_liq = getattr(config, 'MIN_LIQUIDITY_USD', 10.0)
-    if total_liquidity < min_liq: return "liq"
 
+    status, potential_profit_pct = maker_signal(y_bid, y_depth, n_bid, n_depth)
     current_implied_cost = y_bid + n_bid
-    potential_profit_pct = (1.0 - current_implied_cost) * 100
     
-    if potential_profit_pct >= config.MAKER_MIN_PROFIT_PCT:
+    if status == "trade":
+        # Tick-to-trade trace: WS receive -> book apply -> scan -> decision -> executor stages
+        tids = market.get('clobTokenIds')
+        if isinstance(tids, str):
+            import json
+            tids = json.loads(tids)
+        trace = tracer.start(market.get('id') or slug, (poly_ws.trace_stamps(tids[0]) if tids else []) + [('scan', scan_ns)])
+        tracer.mark('decision')
         print_maker_alert(question, current_implied_cost, potential_profit_pct, y_bid, n_bid, slug, total_liquidity)
+        size = getattr(config, 'CURRENT_RUN_SIZE', config.MAKER_TRADE_SIZE_USD)
+        if allocator is not None:
+            tracer.discard()  # Resumed by the allocator when (if) this candidate is dispatched
+            allocator.add(Candidate(
+                "maker", market.get('id') or market.get('conditionId'), event_key_for(market),
+                edge_usd=size * potential_profit_pct / 100,
+                fill_prob=maker_fill_probability(y_depth, n_depth, size),
+                capital_usd=size,
+                execute=lambda: executor.place_maker_orders(market, y_bid, n_bid, size_usd=size),
+                label=question, trace=trace))
+            return "candidate"
         try:
-            size = getattr(config, 'CURRENT_RUN_SIZE', config.MAKER_TRADE_SIZE_USD)
             executor.place_maker_orders(market, y_bid, n_bid, size_usd=size)
             return "success"
         except Exception as e:
             print(f"❌ EXECUTION CRASHED: {e}")
             return "error"
+        finally:
+            tracer.finish(trace)
     
-    return "profit"
+    return status
 
 def print_maker_alert(q, cost, profit, y_bid, n_bid, slug, liquidity):
     alert_text = f"\n[{datetime.now().strftime('%H:%M:%S')}] [MAKER-GEN] 🐢 SLOW SPREAD FOUND!\n"
@@ -116,6 +142,7 @@ def main():
     MARKET_REFRESH_SEC = getattr(config, 'MARKET_REFRESH_SEC', 600)
     last_hedge_check = 0
     HEDGE_CHECK_INTERVAL = getattr(config, 'HEDGE_CHECK_INTERVAL_SEC', 30)
+    HEDGE_RECONCILE_INTERVAL = getattr(config, 'HEDGE_RECONCILE_INTERVAL_SEC', 120)
     last_heartbeat = time.time()
     
     # Trackers for the heartbeat
@@ -126,7 +153,9 @@ def main():
             now = time.time()
             
             # 0. PERIODIC HEDGE CHASER: Check status of pending hedges
-            if config.LIVE_TRADING and (now - last_hedge_check > HEDGE_CHECK_INTERVAL):
+            # (fills are pushed by the user channel; while it is healthy REST only reconciles)
+            hedge_interval = HEDGE_RECONCILE_INTERVAL if executor.fill_stream_alive() else HEDGE_CHECK_INTERVAL
+            if config.LIVE_TRADING and (now - last_hedge_check > hedge_interval):
                 executor.check_and_chase_hedges()
                 last_hedge_check = now
 
@@ -137,6 +166,7 @@ def main():
                 # PRIORITY SORT: Sort by volume descending so we check "Hot" markets first
                 cached_markets.sort(key=lambda x: float(x.get('volume24hr', 0)), reverse=True)
                 last_market_refresh = now
+                requoter.prune({m.get('id') or m.get('conditionId') for m in cached_markets})
                 
                 # Subscribe to WebSocket for all market tokens
                 if config.WS_ENABLED and cached_markets:
@@ -154,21 +184,50 @@ def main():
             # 2. FAST PATH: Check opportunities
             # With 3 CPUs, a serial loop for 200 dict lookups is actually FASTER 
             # than the overhead of a ThreadPool.
-            for market in cached_markets:
+            presign_top = getattr(config, 'PRESIGN_TOP_MARKETS', 20) if config.LIVE_TRADING else 0
+            presigned = []
+            for i, market in enumerate(cached_markets):
                 obs = poly.get_market_orderbooks(market)
                 if obs:
-                    status = check_maker_opportunity(market, obs)
+                    # Keep signed orders ready for the hottest markets (signing off the hot path)
+                    if i < presign_top:
+                        presigned.extend(executor.prepare_market(market, obs))
+                    # Queue a cancel/replace if our resting pair here fell off the touch
+                    if config.LIVE_TRADING:
+                        requoter.on_book(market, obs, now)
+                    status = check_maker_opportunity(market, obs, allocator)
                     stats["scanned"] += 1
                     if status == "depth": stats["skip_depth"] += 1
                     elif status == "profit": stats["skip_profit"] += 1
                 else:
                     stats["skip_vol"] += 1 # Or API error
+            requoter.flush(now)
+            if presign_top: executor.retain_presigned(presigned)
+
+            # 2b. ALLOCATE: best edge x fill probability per dollar first, within risk limits
+            allocator.dispatch(tracer)
             
             # 3. HEARTBEAT: Show the user we are alive
             if now - last_heartbeat > 60:
                 h_time = datetime.now().strftime('%H:%M:%S')
                 print(f"[{h_time}] ❤️ Heartbeat: Scanned {stats['scanned']} markets. "
                       f"(Depth Skip: {stats['skip_depth']}, No Profit: {stats['skip_profit']})")
+                if executor.presign:
+                    ps = executor.presign.stats()
+                    print(f"[{h_time}] ✍️ Presign: {ps['ready']} ready, {ps['hits']} hits / {ps['misses']} misses, "
+                          f"sign p50 {ps['sign_p50_ms']:.1f}ms / p99 {ps['sign_p99_ms']:.1f}ms")
+                pnl = pnl_ledger.get_status()
+                if pnl["open_tokens"] or pnl["realized"]:
+                    print(f"[{h_time}] 💰 PnL: realized ${pnl['realized']:.2f} | unrealized ${pnl['unrealized']:.2f} "
+                          f"| max drawdown ${pnl['max_drawdown']:.2f} ({pnl['open_tokens']} open tokens)")
+                if getattr(config, 'LATENCY_TRACE_ENABLED', True): tracer.report()
+                rq = requoter.stats
+                if rq["requoted_legs"] or rq["throttled"]:
+                    print(f"[{h_time}] 🔁 Requote: {rq['requoted_legs']} legs moved, {rq['throttled']} throttled")
+                if tick_recorder.running:
+                    tr = tick_recorder.get_status()
+                    print(f"[{h_time}] 📼 Ticks: {tr['recorded']} recorded, {tr['dropped']} dropped, "
+                          f"{tr['queued']} queued (peak {tr['queue_hwm']}), {tr['bytes'] / 1e6:.1f}MB")
                 # Reset stats for next minute
                 stats = {"scanned": 0, "skip_vol": 0, "skip_depth": 0, "skip_profit": 0}
                 last_heartbeat = now
@@ -179,7 +238,11 @@ def main():
             interval = getattr(config, 'POLL_INTERVAL_WS', 0.5)
             time.sleep(interval)
 
-        except KeyboardInterrupt: break
+        except KeyboardInterrupt:
+            if tick_recorder.running: tick_recorder.stop()
+            if getattr(config, 'LATENCY_TRACE_DUMP', False):
+                print(f"🧭 Dumped {tracer.dump_slowest()} slowest traces to {config.LATENCY_TRACE_FILE}")
+            break
         except Exception as e:
             print(f"[{datetime.now().strftime('%H:%M:%S')}] ⚠️ Loop error: {e}")
             time.sleep(15) # Safety sleep on crash
@@ -0,0 +1,29 @@
+import config
+
+def maker_signal(y_bid, y_depth_usd, n_bid, n_depth_usd, min_profit_pct=None, max_depth_usd=None,
+                 min_liquidity_usd=None, allow_dead=None):
+    """
+    Maker (split) entry decision from the two best bids and the USD depth resting at each.
+    Pure function shared by the live scanner, the replay simulator and parameter sweeps;
+    parameters left as None fall back to config.
+    Returns (status, profit_pct); status is 'trade', 'dead', 'depth', 'liq' or 'profit'.
+    """
+    if min_profit_pct is None: min_profit_pct = config.MAKER_MIN_PROFIT_PCT
+    if max_depth_usd is None: max_depth_usd = getattr(config, 'MAKER_MAX_QUEUE_DEPTH_USD', 500)
+    if min_liquidity_usd is None: min_liquidity_usd = getattr(config, 'MIN_LIQUIDITY_USD', 10.0)
+    if allow_dead is None: allow_dead = config.MAKER_ALLOW_DEAD_MARKETS
+
+    profit_pct = (1.0 - (y_bid + n_bid)) * 100
+    # Dead Market Check
+    if not allow_dead:
+        if y_bid == 0 or n_bid == 0: return "dead", profit_pct
+
+    # Queue depth: too much ahead of us and we never fill
+    if y_depth_usd > max_depth_usd or n_depth_usd > max_depth_usd:
+        return "depth", profit_pct
+
+    if y_depth_usd + n_depth_usd < min_liquidity_usd: return "liq", profit_pct
+
+    if profit_pct >= min_profit_pct:
+        return "trade", profit_pct
+    return "profit", profit_pct
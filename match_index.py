@@ -0,0 +1,257 @@
+import numpy as np
+import config
+
+GRAM = 3
+
+def key_grams(key):
+    """Lowercase character trigrams of a slug or ticker."""
+    key = (key or '').lower()
+    return {key[i:i + GRAM] for i in range(len(key) - GRAM + 1)}
+
+def kalshi_key(km):
+    return km.get('ticker') or km.get('event_ticker', '')
+
+class LSHVectorIndex:
+    """
+    Random-hyperplane LSH over L2-normalized vectors (cosine similarity).
+    Several hash tables with 1-bit multi-probe give good recall; candidates are
+    re-ranked exactly with a dot product. Supports incremental add/remove.
+    """
+    def __init__(self, dim, n_tables=8, n_bits=10, seed=42):
+        rng = np.random.default_rng(seed)
+        self.planes = rng.standard_normal((n_tables, n_bits, dim)).astype(np.float32)
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self.powers = 1 << np.arange(n_bits)
+        self.buckets = [{} for _ in range(n_tables)]  # per table: {code: set(slot)}
+        self.vectors = np.zeros((64, dim), dtype=np.float32)
+        self.codes = {}       # {slot: [code per table]}
+        self.free_slots = []
+        self.next_slot = 0
+
+    def _hash(self, vec):
+        bits = (np.einsum('tbd,d->tb', self.planes, vec) > 0)
+        return (bits * self.powers).sum(axis=1).tolist()
+
+    def add(self, vec):
+        if self.free_slots:
+            slot = self.free_slots.pop()
+        else:
+            slot = self.next_slot
+            self.next_slot += 1
+            if slot >= len(self.vectors):
+                grown = np.zeros((len(self.vectors) * 2, self.vectors.shape[1]), dtype=np.float32)
+                grown[:len(self.vectors)] = self.vectors
+                self.vectors = grown
+        self.vectors[slot] = vec
+        codes = self._hash(vec)
+        for t, code in enumerate(codes):
+            self.buckets[t].setdefault(code, set()).add(slot)
+        self.codes[slot] = codes
+        return slot
+
+    def remove(self, slot):
+        codes = self.codes.pop(slot, None)
+        if codes is None: return
+        for t, code in enumerate(codes):
+            bucket = self.buckets[t].get(code)
+            if bucket:
+                bucket.discard(slot)
+                if not bucket: del self.buckets[t][code]
+        self.free_slots.append(slot)
+
+    def search(self, vec, k=3):
+        """Return [(slot, score), ...] best-first among LSH candidates."""
+        candidates = set()
+        for t, code in enumerate(self._hash(vec)):
+            table = self.buckets[t]
+            candidates.update(table.get(code, ()))
+            for b in range(self.n_bits):
+                candidates.update(table.get(code ^ (1 << b), ()))
+        if not candidates: return []
+        slots = np.fromiter(candidates, dtype=np.int64)
+        scores = self.vectors[slots] @ vec
+        order = np.argsort(-scores)[:k]
+        return [(int(slots[i]), float(scores[i])) for i in order]
+
+class HNSWVectorIndex:
+    """Thin wrapper over hnswlib (optional dependency) with the same interface."""
+    def __init__(self, dim, capacity=4096):
+        import hnswlib
+        self.index = hnswlib.Index(space='ip', dim=dim)
+        self.index.init_index(max_elements=capacity, ef_construction=100, M=16, allow_replace_deleted=True)
+        self.index.set_ef(64)
+        self.free_slots = []
+        self.next_slot = 0
+        self.live = 0
+
+    def add(self, vec):
+        if self.live + 1 > self.index.get_max_elements():
+            self.index.resize_index(self.index.get_max_elements() * 2)
+        if self.free_slots:
+            slot = self.free_slots.pop()
+            self.index.add_items(vec[None, :], [slot], replace_deleted=True)
+        else:
+            slot = self.next_slot
+            self.next_slot += 1
+            self.index.add_items(vec[None, :], [slot])
+        self.live += 1
+        return slot
+
+    def remove(self, slot):
+        self.index.mark_deleted(slot)
+        self.free_slots.append(slot)
+        self.live -= 1
+
+    def search(self, vec, k=3):
+        k = min(k, self.live)
+        if k <= 0: return []
+        labels, dists = self.index.knn_query(vec[None, :], k=k)
+        # 'ip' space returns 1 - dot product
+        return [(int(l), 1.0 - float(d)) for l, d in zip(labels[0], dists[0])]
+
+def make_vector_index(dim):
+    backend = getattr(config, 'ANN_BACKEND', 'auto')
+    if backend in ('auto', 'hnsw'):
+        try:
+            return HNSWVectorIndex(dim)
+        except ImportError:
+            if backend == 'hnsw':
+                print("hnswlib not installed, falling back to LSH index.")
+    return LSHVectorIndex(dim, getattr(config, 'LSH_TABLES', 8), getattr(config, 'LSH_BITS', 10))
+
+class MarketMatchIndex:
+    """
+    Incrementally maintained Kalshi index used to match Polymarket markets.
+
+    - Character trigram postings over tickers: the slug/ticker fast path (a ticker
+      that contains, or is contained in, the slug as a raw substring) only verifies
+      tickers holding every trigram of the slug, or starting with one of its
+      trigrams, instead of every Kalshi market.
+    - ANN vector index over title embeddings for the semantic fallback.
+
+    Call sync() every cycle: only new (or re-titled) markets are embedded, and
+    markets that disappeared from the active list are dropped.
+    """
+    def __init__(self):
+        self.markets = {}        # {ticker: market dict}
+        self.texts = {}          # {ticker: text that was embedded}
+        self.order = {}          # {ticker: insertion sequence} (deterministic tie-breaks)
+        self.grams = {}          # {trigram: set(ticker)} every trigram of the ticker
+        self.heads = {}          # {trigram: set(ticker)} the ticker's first trigram
+        self.short = set()       # Tickers shorter than a trigram
+        self.slots = {}          # {ticker: vector slot}
+        self.slot_tickers = {}   # {slot: ticker}
+        self.vectors = None
+        self.seq = 0
+        self.retitled = []       # Tickers whose text changed at the last sync
+
+    def __len__(self):
+        return len(self.markets)
+
+    def _postings(self, ticker):
+        k = ticker.lower()
+        if len(k) < GRAM: return []
+        return [(self.grams, g) for g in key_grams(k)] + [(self.heads, k[:GRAM])]
+
+    def _add_grams(self, ticker):
+        if len(ticker) < GRAM: self.short.add(ticker)
+        for table, g in self._postings(ticker):
+            table.setdefault(g, set()).add(ticker)
+
+    def _remove_grams(self, ticker):
+        self.short.discard(ticker)
+        for table, g in self._postings(ticker):
+            postings = table.get(g)
+            if postings:
+                postings.discard(ticker)
+                if not postings: del table[g]
+
+    def _remove_vector(self, ticker):
+        slot = self.slots.pop(ticker, None)
+        if slot is not None:
+            self.vectors.remove(slot)
+            del self.slot_tickers[slot]
+
+    def remove(self, ticker):
+        if ticker not in self.markets: return
+        self._remove_grams(ticker)
+        self._remove_vector(ticker)
+        del self.markets[ticker]
+        self.texts.pop(ticker, None)
+        self.order.pop(ticker, None)
+
+    def sync(self, kalshi_markets, text_fn, encode_fn=None):
+        """
+        Bring the index in line with the current active market list.
+        encode_fn(texts) -> (N, dim) normalized matrix; omit to skip the vector index.
+        Returns (added, removed) counts.
+        """
+        current = {}
+        for km in kalshi_markets:
+            key = kalshi_key(km)
+            if key: current[key] = km
+
+        gone = [t for t in self.markets if t not in current]
+        for t in gone: self.remove(t)
+
+        to_embed = []
+        self.retitled = []  # Already indexed, but their text changed this sync
+        for ticker, km in current.items():
+            if ticker not in self.markets:
+                self.markets[ticker] = km
+                self.order[ticker] = self.seq
+                self.seq += 1
+                self._add_grams(ticker)
+            else:
+                self.markets[ticker] = km  # Refresh prices/metadata
+            text = text_fn(km)
+            if self.texts.get(ticker) != text:
+                if ticker in self.texts: self.retitled.append(ticker)
+                self._remove_vector(ticker)
+                self.texts[ticker] = text
+                to_embed.append(ticker)
+
+        if encode_fn and to_embed:
+            matrix = encode_fn([self.texts[t] for t in to_embed])
+            if matrix is not None:
+                if self.vectors is None:
+                    self.vectors = make_vector_index(matrix.shape[1])
+                for ticker, vec in zip(to_embed, matrix):
+                    slot = self.vectors.add(np.asarray(vec, dtype=np.float32))
+                    self.slots[ticker] = slot
+                    self.slot_tickers[slot] = ticker
+
+        return len(to_embed), len(gone)
+
+    def get(self, ticker):
+        return self.markets.get(ticker)
+
+    def match_slug(self, poly_slug):
+        """Fast path: a Kalshi ticker that contains, or is contained in, the Poly slug."""
+        poly_slug = (poly_slug or '').lower()
+        if not poly_slug: return None
+        grams = key_grams(poly_slug)
+        if not grams:
+            candidates = set(self.markets)  # Slug shorter than a trigram: just scan
+        else:
+            # Ticker contains the slug: it holds every trigram of the slug
+            postings = sorted((self.grams.get(g, set()) for g in grams), key=len)
+            candidates = set(postings[0]).intersection(*postings[1:])
+            # Slug contains the ticker: the ticker starts with one of the slug's trigrams
+            for g in grams:
+                candidates.update(self.heads.get(g, ()))
+            candidates.update(self.short)
+        best = None
+        for ticker in candidates:
+            k = ticker.lower()
+            if poly_slug in k or k in poly_slug:
+                if best is None or self.order[ticker] < self.order[best]:
+                    best = ticker
+        return self.markets[best] if best else None
+
+    def search(self, embedding, k=3):
+        """Semantic fallback: [(market, score), ...] best-first."""
+        if self.vectors is None or embedding is None: return []
+        hits = self.vectors.search(np.asarray(embedding, dtype=np.float32), k)
+        return [(self.markets[self.slot_tickers[s]], score) for s, score in hits if s in self.slot_tickers]
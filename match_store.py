@@ -0,0 +1,161 @@
+import os
+import json
+import time
+from datetime import datetime, timezone
+import config
+import nlp_backend
+from embedding_cache import EmbeddingCache
+
+def parse_close_time(value):
+    """Parse a Gamma 'endDate' / Kalshi 'close_time' ISO string to a UTC timestamp."""
+    if not value: return None
+    try:
+        dt = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        if dt.tzinfo is None: dt = dt.replace(tzinfo=timezone.utc)
+        return dt.timestamp()
+    except Exception:
+        return None
+
+class MatchDecisionStore:
+    """
+    Persists Polymarket -> Kalshi match decisions (accepted AND rejected) so the
+    matcher only runs for markets it has not seen before.
+
+    Each decision records the similarity score, how it was made (slug / semantic),
+    the model version, hashes of both market texts and both close dates.
+    A decision is reused until:
+      - either side closes (close date passed, or the Kalshi market left the index),
+      - either market's text changes,
+      - the NLP model changes,
+      - (rejections only) MATCH_REJECT_TTL_SEC expires; a newly listed Kalshi market
+        is checked against the stored rejections by the scanner (note_kalshi).
+    Also remembers which market_mapping.json entries it exported itself: those stay
+    automatic decisions (subject to invalidation), not manual overrides.
+    """
+    def __init__(self, path=None):
+        self.path = path or getattr(config, 'MATCH_STORE_FILE', 'match_decisions.json')
+        self.model_name = nlp_backend.model_version()
+        self.decisions = {}      # {poly_slug: decision dict}
+        self.kalshi_seen = set() # Kalshi keys present at the last sync (persisted: restarts aren't "new" markets)
+        self.exported = {}       # {poly_slug: kalshi_ticker} written to market_mapping.json by export_to_mapping
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            if "decisions" in data:
+                self.decisions = data["decisions"]
+                self.kalshi_seen = set(data.get("kalshi_seen", []))
+                self.exported = data.get("exported", {})
+            else:
+                self.decisions = data  # Older files: decisions only
+        except FileNotFoundError: pass
+        except Exception as e:
+            print(f"Match store load failed: {e}")
+
+    def save(self):
+        if not self.dirty: return
+        try:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({"decisions": self.decisions, "kalshi_seen": sorted(self.kalshi_seen),
+                           "exported": self.exported}, f, indent=1)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+        except Exception as e:
+            print(f"Match store save failed: {e}")
+
+    def lookup(self, poly_market, k_index, kalshi_text_fn):
+        """
+        Return (True, kalshi_market_or_None) for a still-valid cached decision,
+        or (False, None) if the market must be (re)matched.
+        """
+        slug = poly_market.get('slug', '').lower()
+        d = self.decisions.get(slug)
+        if not d: return False, None
+
+        now = time.time()
+        if (d.get('model') != self.model_name
+                or d.get('poly_hash') != EmbeddingCache.text_key(poly_market.get('question', ''))
+                or (d.get('poly_close') and d['poly_close'] < now)):
+            return self._invalidate(slug)
+
+        if not d.get('accepted'):
+            reject_ttl = getattr(config, 'MATCH_REJECT_TTL_SEC', 3600)
+            if now - d.get('decided_at', 0) > reject_ttl:
+                return self._invalidate(slug)
+            return True, None
+
+        km = k_index.get(d.get('kalshi_ticker'))
+        if (km is None
+                or d.get('kalshi_hash') != EmbeddingCache.text_key(kalshi_text_fn(km))
+                or (d.get('kalshi_close') and d['kalshi_close'] < now)):
+            return self._invalidate(slug)
+        return True, km
+
+    def _invalidate(self, slug):
+        del self.decisions[slug]
+        self.dirty = True
+        return False, None
+
+    def record(self, poly_market, kalshi_market, score, method, accepted, kalshi_text_fn):
+        slug = poly_market.get('slug', '').lower()
+        if not slug: return
+        self.decisions[slug] = {
+            "accepted": bool(accepted),
+            "kalshi_ticker": (kalshi_market.get('ticker') or kalshi_market.get('event_ticker')) if kalshi_market else None,
+            "score": round(float(score), 4) if score is not None else None,
+            "method": method,
+            "model": self.model_name,
+            "poly_hash": EmbeddingCache.text_key(poly_market.get('question', '')),
+            "kalshi_hash": EmbeddingCache.text_key(kalshi_text_fn(kalshi_market)) if kalshi_market else None,
+            "poly_close": parse_close_time(poly_market.get('endDate')),
+            "kalshi_close": parse_close_time(kalshi_market.get('close_time')) if kalshi_market else None,
+            "decided_at": time.time(),
+        }
+        self.dirty = True
+
+    def note_kalshi(self, keys):
+        """Record the current Kalshi market keys. Returns the ones not seen at the previous sync."""
+        keys = set(keys)
+        new = keys - self.kalshi_seen
+        if keys != self.kalshi_seen:
+            self.kalshi_seen = keys
+            self.dirty = True
+        return new
+
+    def is_rejected(self, poly_market):
+        d = self.decisions.get(poly_market.get('slug', '').lower())
+        return d is not None and not d.get('accepted')
+
+    def manual_entries(self, mapping):
+        """The mapping without the entries we exported ourselves (unless a human has since edited them)."""
+        return {slug: t for slug, t in mapping.items() if self.exported.get(slug) != t}
+
+    def export_to_mapping(self, mapping, path='market_mapping.json'):
+        """
+        Feed confident semantic matches back into the override file, for review.
+        Existing manual entries always win and are never overwritten. Exported
+        entries are remembered, so they keep being treated as automatic matches.
+        Returns the number of entries added.
+        """
+        min_score = getattr(config, 'MATCH_EXPORT_MIN_SCORE', 0.9)
+        added = 0
+        for slug, d in self.decisions.items():
+            ours = slug not in mapping or self.exported.get(slug) == mapping[slug]
+            if (d.get('accepted') and d.get('method') == 'semantic' and ours
+                    and mapping.get(slug) != d['kalshi_ticker'] and (d.get('score') or 0) >= min_score):
+                mapping[slug] = self.exported[slug] = d['kalshi_ticker']
+                added += 1
+        if added:
+            self.dirty = True
+            try:
+                tmp_path = path + '.tmp'
+                with open(tmp_path, 'w') as f:
+                    json.dump(mapping, f, indent=2)
+                os.replace(tmp_path, path)
+            except Exception as e:
+                print(f"Mapping export failed: {e}")
+        return added
@@ -0,0 +1,172 @@
+"""
+Sentence-embedding backends for the cross-platform matcher.
+
+torch : sentence-transformers + torch (original behaviour, heavy import, ~500MB RSS)
+onnx  : the same all-MiniLM-L6-v2 exported to ONNX (optionally int8-quantized) and run
+        with onnxruntime + tokenizers on CPU. No torch import at runtime.
+auto  : onnx if the exported model, onnxruntime and tokenizers are available, else torch
+        (also torch if the ONNX encoder then fails to load).
+
+One-time export (on a machine with torch installed):
+    python3 nlp_backend.py --export            # writes NLP_ONNX_DIR/model.onnx + tokenizer.json
+    python3 nlp_backend.py --quantize          # writes NLP_ONNX_DIR/model_int8.onnx
+    python3 nlp_backend.py --check             # embedding parity vs the torch model
+"""
+import os
+import config
+
+MODEL_FILES = {"fp32": "model.onnx", "int8": "model_int8.onnx"}
+
+def onnx_model_path():
+    precision = getattr(config, 'NLP_ONNX_PRECISION', 'int8')
+    return os.path.join(getattr(config, 'NLP_ONNX_DIR', 'onnx_model'), MODEL_FILES.get(precision, MODEL_FILES['fp32']))
+
+_resolved_backend = None  # Resolved once per process; load_encoder may downgrade 'auto' to torch
+
+def _onnx_available():
+    try:
+        import importlib.util
+        model_path = onnx_model_path()
+        return bool(importlib.util.find_spec('onnxruntime') and importlib.util.find_spec('tokenizers')
+                    and os.path.exists(model_path)
+                    and os.path.exists(os.path.join(os.path.dirname(model_path), 'tokenizer.json')))
+    except Exception:
+        return False
+
+def resolve_backend():
+    global _resolved_backend
+    if _resolved_backend is None:
+        backend = getattr(config, 'NLP_BACKEND', 'auto')
+        if backend == 'auto':
+            backend = 'onnx' if _onnx_available() else 'torch'
+        _resolved_backend = backend
+    return _resolved_backend
+
+def model_version():
+    """Identifier stored alongside cached embeddings / match decisions."""
+    name = getattr(config, 'NLP_MODEL_NAME', 'all-MiniLM-L6-v2')
+    if resolve_backend() == 'onnx':
+        return f"{name}:onnx-{getattr(config, 'NLP_ONNX_PRECISION', 'int8')}"
+    return name
+
+class OnnxSentenceEncoder:
+    """
+    Minimal drop-in for SentenceTransformer.encode(): tokenize, run the transformer,
+    mean-pool over the attention mask, L2-normalize.
+    """
+    def __init__(self, model_path=None, num_threads=None):
+        import numpy as np
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+        self.np = np
+        model_path = model_path or onnx_model_path()
+        num_threads = num_threads or getattr(config, 'NLP_NUM_THREADS', 1)
+
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = num_threads
+        opts.inter_op_num_threads = 1
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, opts, providers=['CPUExecutionProvider'])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(os.path.dirname(model_path), 'tokenizer.json'))
+        self.tokenizer.enable_truncation(max_length=getattr(config, 'NLP_MAX_SEQ_LEN', 128))
+        self.tokenizer.enable_padding()
+
+    def encode(self, texts, batch_size=64, convert_to_numpy=True, normalize_embeddings=True, **kwargs):
+        np = self.np
+        single = isinstance(texts, str)
+        if single: texts = [texts]
+        out = []
+        for start in range(0, len(texts), batch_size):
+            encs = self.tokenizer.encode_batch(texts[start:start + batch_size])
+            ids = np.array([e.ids for e in encs], dtype=np.int64)
+            mask = np.array([e.attention_mask for e in encs], dtype=np.int64)
+            feeds = {"input_ids": ids, "attention_mask": mask}
+            if "token_type_ids" in self.input_names:
+                feeds["token_type_ids"] = np.zeros_like(ids)
+            hidden = self.session.run(None, feeds)[0]
+            m = mask[..., None].astype(np.float32)
+            pooled = (hidden * m).sum(axis=1) / np.clip(m.sum(axis=1), 1e-9, None)
+            if normalize_embeddings:
+                pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            out.append(pooled.astype(np.float32))
+        embs = np.concatenate(out) if out else np.zeros((0, 0), dtype=np.float32)
+        return embs[0] if single else embs
+
+def load_torch_encoder():
+    from sentence_transformers import SentenceTransformer
+    import torch
+    torch.set_num_threads(getattr(config, 'NLP_NUM_THREADS', 1))
+    return SentenceTransformer(getattr(config, 'NLP_MODEL_NAME', 'all-MiniLM-L6-v2'))
+
+def load_encoder():
+    """Lazily import and load the configured backend. Heavy imports happen only here."""
+    global _resolved_backend
+    if resolve_backend() == 'onnx':
+        try:
+            return OnnxSentenceEncoder()
+        except Exception as e:
+            if getattr(config, 'NLP_BACKEND', 'auto') != 'auto': raise
+            print(f"⚠️ ONNX encoder failed to load ({e}), falling back to torch.")
+            _resolved_backend = 'torch'
+    return load_torch_encoder()
+
+def export_onnx():
+    import torch
+    from sentence_transformers import SentenceTransformer
+    out_dir = getattr(config, 'NLP_ONNX_DIR', 'onnx_model')
+    os.makedirs(out_dir, exist_ok=True)
+    st = SentenceTransformer(getattr(config, 'NLP_MODEL_NAME', 'all-MiniLM-L6-v2'), device='cpu')
+    transformer = st[0].auto_model.eval()
+    st.tokenizer.save_pretrained(out_dir)  # Writes tokenizer.json (fast tokenizer)
+
+    sample = st.tokenizer(["export sample"], return_tensors='pt')
+    inputs = (sample['input_ids'], sample['attention_mask'], sample['token_type_ids'])
+    names = ['input_ids', 'attention_mask', 'token_type_ids']
+    dyn = {n: {0: 'batch', 1: 'seq'} for n in names}
+    dyn['last_hidden_state'] = {0: 'batch', 1: 'seq'}
+    path = os.path.join(out_dir, MODEL_FILES['fp32'])
+    with torch.no_grad():
+        torch.onnx.export(transformer, inputs, path, input_names=names,
+                          output_names=['last_hidden_state'], dynamic_axes=dyn, opset_version=14)
+    print(f"Exported ONNX model to {path}")
+
+def quantize_onnx():
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    out_dir = getattr(config, 'NLP_ONNX_DIR', 'onnx_model')
+    src = os.path.join(out_dir, MODEL_FILES['fp32'])
+    dst = os.path.join(out_dir, MODEL_FILES['int8'])
+    quantize_dynamic(src, dst, weight_type=QuantType.QInt8)
+    print(f"Quantized model written to {dst}")
+
+def check_parity(texts=None):
+    """Compare ONNX embeddings against the torch model. Returns True if within tolerance."""
+    import numpy as np
+    texts = texts or [
+        "Will the Fed cut interest rates in December?",
+        "Bitcoin above $100,000 on December 31?",
+        "Who will win the 2028 presidential election?",
+        "Will it rain in New York tomorrow?",
+    ]
+    ref = load_torch_encoder().encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+    got = OnnxSentenceEncoder().encode(texts)
+    cos = (ref * got).sum(axis=1)
+    tol = getattr(config, 'NLP_PARITY_TOLERANCE', 0.01)
+    ok = bool((1 - cos).max() <= tol)
+    print(f"Parity ({getattr(config, 'NLP_ONNX_PRECISION', 'int8')}): min cosine {cos.min():.5f} "
+          f"(tolerance {tol}) -> {'OK' if ok else 'FAIL'}")
+    return ok
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="NLP matcher backend tools")
+    parser.add_argument("--export", action="store_true", help="Export the torch model to ONNX")
+    parser.add_argument("--quantize", action="store_true", help="Quantize the exported model to int8")
+    parser.add_argument("--check", action="store_true", help="Check ONNX vs torch embedding parity")
+    args = parser.parse_args()
+
+    if args.export: export_onnx()
+    if args.quantize: quantize_onnx()
+    if args.check: check_parity()
+    if not (args.export or args.quantize or args.check): parser.print_help()
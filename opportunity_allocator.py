@@ -0,0 +1,96 @@
+import config
+from risk_manager import risk_manager
+
+def maker_fill_probability(y_depth_usd, n_depth_usd, size_usd):
+    """
+    Rough chance that BOTH maker legs fill: per leg, our size against the queue
+    already resting ahead of us at the best bid (less queue = likelier fill).
+    """
+    leg_usd = size_usd / 2
+    p_yes = leg_usd / (leg_usd + y_depth_usd) if leg_usd > 0 else 0.0
+    p_no = leg_usd / (leg_usd + n_depth_usd) if leg_usd > 0 else 0.0
+    return p_yes * p_no
+
+class Candidate:
+    """One actionable opportunity from any strategy, waiting for capital."""
+    __slots__ = ('strategy', 'market_id', 'event_id', 'edge_usd', 'fill_prob', 'capital_usd', 'execute', 'label', 'trace')
+
+    def __init__(self, strategy, market_id, event_id, edge_usd, fill_prob, capital_usd, execute, label="", trace=None):
+        self.strategy = strategy
+        self.market_id = market_id
+        self.event_id = event_id
+        self.edge_usd = edge_usd        # Expected profit if fully filled
+        self.fill_prob = fill_prob
+        self.capital_usd = capital_usd  # Capital the orders lock up
+        self.execute = execute          # Zero-arg callable that places the orders
+        self.label = label
+        self.trace = trace              # Latency trace carried from the decision
+
+    def score(self):
+        """Expected profit per dollar of capital."""
+        return self.edge_usd * self.fill_prob / self.capital_usd if self.capital_usd > 0 else 0.0
+
+class OpportunityAllocator:
+    """
+    Per-cycle capital allocation across strategies and markets.
+
+    Strategies add() candidates during the scan instead of trading on the first hit.
+    allocate() ranks them by edge x fill probability / capital and greedily picks
+    the best that still fit the RiskManager limits (open-trade slots, bankroll,
+    per-market and per-event caps), tracked on a scratch copy of the exposures.
+    With the near-uniform sizes used here, the greedy ratio order matches the
+    knapsack optimum. dispatch() then executes them best first.
+    """
+    def __init__(self, risk=None):
+        self.risk = risk or risk_manager
+        self.candidates = []
+        self.stats = {"candidates": 0, "selected": 0, "dispatched": 0}
+
+    def add(self, candidate):
+        self.candidates.append(candidate)
+        self.stats["candidates"] += 1
+
+    def allocate(self):
+        """Choose this cycle's trades. Returns them in dispatch order (best first)."""
+        status = self.risk.get_status()
+        slots = config.MAX_TOTAL_OPEN_TRADES - status["open_trades"]
+        capital = status["remaining_capital"]
+        market_exp = dict(self.risk.market_exposure)
+        event_exp = dict(self.risk.event_exposure)
+
+        # Best candidate per market only (strategies may report the same market twice)
+        best = {}
+        for c in self.candidates:
+            if c.market_id not in best or c.score() > best[c.market_id].score():
+                best[c.market_id] = c
+
+        chosen = []
+        for c in sorted(best.values(), key=lambda c: c.score(), reverse=True):
+            if slots <= 0: break
+            if c.score() <= 0 or c.capital_usd > capital: continue
+            if market_exp.get(c.market_id, 0) + c.capital_usd > config.MAX_EXPOSURE_PER_MARKET_USD: continue
+            if event_exp.get(c.event_id, 0) + c.capital_usd > config.MAX_EVENT_EXPOSURE_USD: continue
+            chosen.append(c)
+            slots -= 1
+            capital -= c.capital_usd
+            market_exp[c.market_id] = market_exp.get(c.market_id, 0) + c.capital_usd
+            event_exp[c.event_id] = event_exp.get(c.event_id, 0) + c.capital_usd
+        self.stats["selected"] += len(chosen)
+        return chosen
+
+    def dispatch(self, tracer=None):
+        """Allocate and execute in priority order. Clears the cycle's candidates."""
+        chosen = self.allocate()
+        self.candidates = []
+        for c in chosen:
+            if tracer and c.trace:
+                tracer.resume(c.trace)
+                tracer.mark('allocate')
+            try:
+                c.execute()
+                self.stats["dispatched"] += 1
+            except Exception as e:
+                print(f"❌ EXECUTION CRASHED ({c.strategy}): {e}")
+            finally:
+                if tracer and c.trace: tracer.finish(c.trace)
+        return chosen
@@ -0,0 +1,113 @@
+import json
+import time
+import sqlite3
+import threading
+from datetime import datetime
+import config
+
+DATETIME_FIELDS = ('timestamp', 'fill_event_at')
+
+def pair_to_record(pair):
+    """Hedge pair -> JSON-safe dict (datetimes as ISO strings, runtime flags dropped)."""
+    rec = {k: v for k, v in pair.items() if k not in ('busy', 'closed')}
+    for f in DATETIME_FIELDS:
+        if isinstance(rec.get(f), datetime): rec[f] = rec[f].isoformat()
+    return rec
+
+def pair_from_record(rec):
+    pair = dict(rec)
+    for f in DATETIME_FIELDS:
+        if isinstance(pair.get(f), str): pair[f] = datetime.fromisoformat(pair[f])
+    return pair
+
+def empty_state():
+    return {"intents": {}, "pairs": {}, "fills": {}}
+
+def apply_event(state, kind, key, data):
+    """
+    Fold one journal event into the recovery state:
+    intents {market_id: intent}, pairs {market_id: pair record}, fills {order_id: fill state}.
+    """
+    if kind == 'intent':
+        state["intents"][key] = data
+    elif kind == 'ack':
+        state["intents"].pop(key, None)
+        state["pairs"][key] = data
+    elif kind == 'abort':
+        state["intents"].pop(key, None)
+    elif kind == 'fill':
+        state["fills"][key] = data
+    elif kind == 'replace':
+        pair = state["pairs"].get(key)
+        if pair:
+            leg = data['leg']
+            state["fills"].pop(pair.get(f'{leg}_id'), None)
+            pair[f'{leg}_id'] = data['order_id']
+            pair[f'price_{leg}'] = data['price']
+    elif kind == 'close':
+        pair = state["pairs"].pop(key, None)
+        if pair:
+            for leg in ('yes', 'no'):
+                state["fills"].pop(pair.get(f'{leg}_id'), None)
+
+class OrderJournal:
+    """
+    Append-only journal of order intents, acks, fills, replaces and closes in a
+    SQLite WAL file. The folded state is kept in memory; every
+    JOURNAL_COMPACT_EVERY events it is written as a snapshot and the events it
+    covers are deleted, so replay at startup reads one snapshot plus a short tail.
+    """
+    def __init__(self, path=None, compact_every=None):
+        self.path = path or getattr(config, 'JOURNAL_FILE', 'order_journal.db')
+        self.compact_every = compact_every or getattr(config, 'JOURNAL_COMPACT_EVERY', 5000)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")  # WAL + NORMAL: durable across process crashes
+        self.db.execute("CREATE TABLE IF NOT EXISTS events (seq INTEGER PRIMARY KEY AUTOINCREMENT, ts REAL, kind TEXT, key TEXT, data TEXT)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS snapshot (id INTEGER PRIMARY KEY CHECK (id = 1), seq INTEGER, data TEXT)")
+        self.state = empty_state()
+        self.since_compact = 0
+
+    def append(self, kind, key, data=None):
+        data = data or {}
+        with self.lock:
+            self.db.execute("INSERT INTO events (ts, kind, key, data) VALUES (?, ?, ?, ?)",
+                            (time.time(), kind, key, json.dumps(data)))
+            apply_event(self.state, kind, key, data)
+            self.since_compact += 1
+            if self.since_compact >= self.compact_every:
+                self._compact()
+
+    def replay(self):
+        """Rebuild the state from the snapshot plus every later event. Returns the state."""
+        with self.lock:
+            row = self.db.execute("SELECT seq, data FROM snapshot WHERE id = 1").fetchone()
+            base_seq, state = (row[0], json.loads(row[1])) if row else (0, empty_state())
+            tail = self.db.execute("SELECT kind, key, data FROM events WHERE seq > ? ORDER BY seq", (base_seq,)).fetchall()
+            for kind, key, data in tail:
+                apply_event(state, kind, key, json.loads(data))
+            self.state = state
+            self.since_compact = len(tail)
+            return state
+
+    def _compact(self):
+        last = self.db.execute("SELECT MAX(seq) FROM events").fetchone()[0]
+        if last is None: return
+        self.db.execute("BEGIN")
+        try:
+            self.db.execute("INSERT OR REPLACE INTO snapshot (id, seq, data) VALUES (1, ?, ?)", (last, json.dumps(self.state)))
+            self.db.execute("DELETE FROM events WHERE seq <= ?", (last,))
+            self.db.execute("COMMIT")
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+        self.since_compact = 0
+
+    def compact(self):
+        with self.lock:
+            self._compact()
+
+    def close(self):
+        with self.lock:
+            self.db.close()
@@ -0,0 +1,129 @@
+import os
+import csv
+import time
+import itertools
+import concurrent.futures
+import numpy as np
+from columnar_archive import read_snapshots
+from backtest import MarketFeatures, market_features, maker_hit, hf_hit, strategy_params
+
+FEATURE_CACHE_VERSION = 1
+SWEEP_PARAMS = ("MAKER_MIN_PROFIT_PCT", "MAKER_MAX_QUEUE_DEPTH_USD", "MIN_LIQUIDITY_USD", "HF_MIN_PROFIT_PCT")
+METRICS = ("maker_gen", "maker_hf", "maker_markets", "maker_snapshots", "maker_avg_profit_pct", "hf", "poly_internal")
+
+def cache_path(archive_path):
+    return archive_path + ".features.npz"
+
+def build_features(archive_path):
+    """Decode the archive once: one row of MarketFeatures columns per (snapshot, market)."""
+    cols = {name: [] for name in MarketFeatures.FIELDS}
+    snap_idx, market_ids = [], []
+    for s, snap in enumerate(read_snapshots(archive_path)):
+        for row in snap.get('poly_markets', []):
+            m = row.get('market') or {}
+            f = market_features(m, row.get('orderbook') or {})
+            for name in MarketFeatures.FIELDS:
+                cols[name].append(getattr(f, name))
+            snap_idx.append(s)
+            market_ids.append(str(m.get('id') or m.get('conditionId') or ''))
+    arrays = {name: np.array(vals, dtype=bool if name in ('internal', 'is_hf') else np.float64)
+              for name, vals in cols.items()}
+    arrays["snap"] = np.array(snap_idx, dtype=np.int32)
+    arrays["market_id"] = np.array(market_ids, dtype=str)
+    return arrays
+
+def load_features(archive_path, refresh=False):
+    """Cached features for this archive; rebuilt when the archive changed (size / mtime) or the format did."""
+    path = cache_path(archive_path)
+    st = os.stat(archive_path)
+    key = np.array([FEATURE_CACHE_VERSION, st.st_size, st.st_mtime_ns], dtype=np.int64)
+    if not refresh and os.path.exists(path):
+        cached = np.load(path)
+        if np.array_equal(cached["key"], key):
+            return path, {k: cached[k] for k in cached.files if k != "key"}
+    arrays = build_features(archive_path)
+    with open(path, 'wb') as f:
+        np.savez(f, key=key, **arrays)
+    return path, arrays
+
+def _rows(arrays):
+    columns = [arrays[name].tolist() for name in MarketFeatures.FIELDS]
+    rows = [MarketFeatures(*vals) for vals in zip(*columns)]
+    return rows, arrays["snap"].tolist(), arrays["market_id"].tolist()
+
+_worker_data = None
+
+def _init_worker(path):
+    global _worker_data
+    with np.load(path) as cached:
+        _worker_data = _rows({k: cached[k] for k in cached.files})
+
+def evaluate(params, data=None):
+    """Run the parameterised strategies over the cached rows. Returns the metrics for one grid point."""
+    rows, snaps, market_ids = data or _worker_data
+    out = {"maker_gen": 0, "maker_hf": 0, "hf": 0, "poly_internal": 0}
+    markets, snapshots, profit_sum = set(), set(), 0.0
+    for f, s, mid in zip(rows, snaps, market_ids):
+        if f.internal: out["poly_internal"] += 1
+        if hf_hit(f, params) is not None: out["hf"] += 1
+        profit = maker_hit(f, params)
+        if profit is None: continue
+        if f.is_hf:
+            out["maker_hf"] += 1
+        else:
+            out["maker_gen"] += 1
+        markets.add(mid)
+        snapshots.add(s)
+        profit_sum += profit
+    hits = out["maker_gen"] + out["maker_hf"]
+    out["maker_markets"] = len(markets)
+    out["maker_snapshots"] = len(snapshots)
+    out["maker_avg_profit_pct"] = profit_sum / hits if hits else 0.0
+    return out
+
+def expand_grid(grid):
+    """{name: [values]} -> full parameter dicts (unswept names keep their current config value)."""
+    names = list(grid)
+    return [strategy_params(**dict(zip(names, values))) for values in itertools.product(*(grid[n] for n in names))]
+
+def parse_grid(specs):
+    """["MAKER_MIN_PROFIT_PCT=0.5,1,2", ...] -> {name: [floats]}"""
+    grid = {}
+    for spec in specs or []:
+        name, _, values = spec.partition("=")
+        name = name.strip().upper()
+        if name not in SWEEP_PARAMS: raise ValueError(f"Unknown sweep parameter {name} (one of {', '.join(SWEEP_PARAMS)})")
+        grid[name] = [float(v) for v in values.split(",") if v.strip()]
+    return grid
+
+def run_sweep(archive_path, grid, workers=None, refresh=False):
+    """Evaluate every grid point over the archive. Returns [(params, metrics)] in grid order."""
+    t0 = time.time()
+    path, arrays = load_features(archive_path, refresh)
+    print(f"Features: {len(arrays['snap'])} rows from {archive_path} ({time.time() - t0:.1f}s)")
+    points = expand_grid(grid)
+    workers = workers or min(len(points), os.cpu_count() or 1)
+    t0 = time.time()
+    if workers <= 1:
+        data = _rows(arrays)
+        results = [evaluate(p, data) for p in points]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(path,)) as pool:
+            results = list(pool.map(evaluate, points, chunksize=max(1, len(points) // (workers * 4))))
+    print(f"Evaluated {len(points)} grid points on {workers} workers in {time.time() - t0:.1f}s")
+    return list(zip(points, results))
+
+def print_table(results, names):
+    cols = list(names) + list(METRICS)
+    widths = [max(len(c), 10) for c in cols]
+    print("  ".join(c.rjust(w) for c, w in zip(cols, widths)))
+    for params, metrics in results:
+        vals = [params[n] for n in names] + [metrics[m] for m in METRICS]
+        print("  ".join((f"{v:.2f}" if isinstance(v, float) else str(v)).rjust(w) for v, w in zip(vals, widths)))
+
+def write_csv(results, path):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(list(SWEEP_PARAMS) + list(METRICS))
+        for params, metrics in results:
+            writer.writerow([params[n] for n in SWEEP_PARAMS] + [metrics[m] for m in METRICS])
@@ -0,0 +1,123 @@
+import threading
+from book_model import from_poly_book
+from risk_manager import risk_manager
+
+class Position:
+    __slots__ = ('shares', 'cost')
+
+    def __init__(self):
+        self.shares = 0.0
+        self.cost = 0.0   # Total cost basis of the shares held (USD)
+
+    def avg_price(self):
+        return self.cost / self.shares if self.shares > 1e-12 else 0.0
+
+class PnLLedger:
+    """
+    Position ledger fed by fills, marked to market incrementally.
+
+    Each book update revalues only the market that token belongs to and adds the
+    difference to the running unrealized total, so session PnL is available at
+    tick frequency without walking every position.
+    Open tokens are marked at their best bid (what we could sell for). A matched
+    YES + NO share pair of one market is a complete set worth exactly $1, so it
+    is realized as soon as both legs are held.
+    """
+    def __init__(self, risk=None):
+        self.risk = risk
+        self.positions = {}     # {token_id: Position}
+        self.marks = {}         # {token_id: best bid}
+        self.token_market = {}  # {token_id: market_id}
+        self.market_tokens = {} # {market_id: (yes_token, no_token)}
+        self.market_upnl = {}   # {market_id or token_id: unrealized PnL last computed}
+        self.realized = 0.0
+        self.unrealized = 0.0
+        self.peak_equity = 0.0
+        self.max_drawdown = 0.0
+        self.ws = None
+        self.lock = threading.Lock()
+
+    def attach_ws(self, ws):
+        """Mark from every book update on this PolyWebSocket (listener runs on the WS thread)."""
+        self.ws = ws
+        ws.add_listener(self.on_book)
+
+    def register_market(self, market_id, yes_token, no_token):
+        with self.lock:
+            self.market_tokens[market_id] = (yes_token, no_token)
+            self.token_market[yes_token] = market_id
+            self.token_market[no_token] = market_id
+
+    def on_fill(self, token_id, side, shares, price, fee_usd=0.0):
+        """Apply one fill (BUY adds to the position, SELL realizes against the average cost)."""
+        if shares <= 0: return
+        with self.lock:
+            pos = self.positions.get(token_id)
+            if pos is None:
+                pos = self.positions[token_id] = Position()
+                if token_id not in self.marks: self._seed_mark(token_id, price)
+            if side == "BUY":
+                pos.shares += shares
+                pos.cost += shares * price + fee_usd
+            else:
+                qty = min(shares, pos.shares)
+                avg = pos.avg_price()
+                self.realized += qty * (price - avg) - fee_usd
+                pos.shares -= qty
+                pos.cost -= qty * avg
+            self._settle_sets(token_id)
+            self._revalue(token_id)
+
+    def on_book(self, asset_id, book):
+        if asset_id not in self.positions: return
+        bid = from_poly_book(book).best_bid()
+        with self.lock:
+            if self.marks.get(asset_id) == bid: return
+            self.marks[asset_id] = bid
+            self._revalue(asset_id)
+
+    def _seed_mark(self, token_id, fallback):
+        book = self.ws.orderbooks.get(token_id) if self.ws else None
+        bid = from_poly_book(book).best_bid() if book else 0.0
+        self.marks[token_id] = bid if bid > 0 else fallback
+
+    def _settle_sets(self, token_id):
+        """Realize min(YES, NO) complete sets of the token's market at $1 each."""
+        market_id = self.token_market.get(token_id)
+        if not market_id: return
+        yes, no = (self.positions.get(t) for t in self.market_tokens[market_id])
+        if not yes or not no: return
+        sets = min(yes.shares, no.shares)
+        if sets <= 1e-9: return
+        cost = sets * yes.avg_price() + sets * no.avg_price()
+        self.realized += sets * 1.0 - cost
+        for pos in (yes, no):
+            pos.cost -= sets * pos.avg_price()
+            pos.shares -= sets
+
+    def _revalue(self, token_id):
+        """Recompute unrealized PnL for this token's market only and update the totals."""
+        market_id = self.token_market.get(token_id)
+        tokens = self.market_tokens[market_id] if market_id else (token_id,)
+        key = market_id or token_id
+        upnl = 0.0
+        for t in tokens:
+            pos = self.positions.get(t)
+            if pos and pos.shares > 1e-9:
+                upnl += pos.shares * self.marks.get(t, 0.0) - pos.cost
+        self.unrealized += upnl - self.market_upnl.get(key, 0.0)
+        self.market_upnl[key] = upnl
+
+        equity = self.realized + self.unrealized
+        if equity > self.peak_equity: self.peak_equity = equity
+        self.max_drawdown = max(self.max_drawdown, self.peak_equity - equity)
+        if self.risk: self.risk.update_pnl(self.realized, self.unrealized)
+
+    def get_status(self):
+        with self.lock:
+            return {"realized": self.realized, "unrealized": self.unrealized,
+                    "equity": self.realized + self.unrealized, "max_drawdown": self.max_drawdown,
+                    "open_tokens": sum(1 for p in self.positions.values() if p.shares > 1e-9)}
+
+# Singleton instance for shared usage
+pnl_ledger = PnLLedger(risk_manager)
@@ -5,6 +5,7 @@ from poly_client import PolyClient
 import config
 from risk_manager import risk_manager
 from ws_client import poly_ws
+from event_graph import event_key_for
 
 # Global Instance
 poly = PolyClient()
@@ -89,7 +90,7 @@ def check_internal_arbitrage(market, ob):
                     rec_size = calculate_kelly_size(profit)
                     
                     # Risk Check
-                    can_add, reason = risk_manager.can_add_position(slug, slug, rec_size)
+                    can_add, reason = risk_manager.can_add_position(event_key_for(market), slug, rec_size)
                     risk_msg = "" if can_add else f" [RISK WARNING: {reason}]"
                     
                     print_alert("BINARY (NET)", question, total_cost, profit, slug, volume=volume, size=rec_size, risk_msg=risk_msg)
@@ -0,0 +1,100 @@
+import time
+import threading
+import concurrent.futures
+from collections import deque
+from py_clob_client.clob_types import OrderArgs
+import config
+
+def price_key(price):
+    return round(float(price), 3)
+
+def leg_shares(size_usd, price):
+    """Same sizing rule as TradeExecutor.place_maker_orders (half the size per leg)."""
+    return int((size_usd / 2) / price)
+
+class PresignCache:
+    """
+    Pre-built, pre-signed BUY orders for the top candidate markets.
+
+    EIP-712 signing is moved off the trigger path: for each tracked token we keep
+    an order signed at the current best bid (the price place_maker_orders joins),
+    at the configured size, and re-sign on a worker pool whenever the book moves.
+    Tokens that leave the candidate set are dropped (drop / TradeExecutor.retain_presigned). When an
+    opportunity fires, take() hands back a ready order and only network I/O is left.
+    Signed orders are single-use (each carries its own salt), so take() removes them.
+    """
+    def __init__(self, clob, workers=None):
+        self.clob = clob
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers or getattr(config, 'PRESIGN_WORKERS', 2))
+        self.entries = {}       # {(token_id, price, shares): signed order}
+        self.pending = {}       # {(token_id, price, shares): future}
+        self.token_keys = {}    # {token_id: set(keys)} currently wanted
+        self.sign_ms = deque(maxlen=1000)  # Recent signing durations (pool AND inline)
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def sign(self, token_id, price, shares):
+        """Create + sign one order, recording how long the signature took."""
+        t0 = time.perf_counter()
+        signed = self.clob.create_order(OrderArgs(price=price, size=shares, side="BUY", token_id=token_id))
+        self.sign_ms.append((time.perf_counter() - t0) * 1000)
+        return signed
+
+    def _sign_job(self, key):
+        try:
+            signed = self.sign(*key)
+        except Exception as e:
+            print(f"Presign failed for {key[0][:10]}...: {e}")
+            signed = None
+        with self.lock:
+            self.pending.pop(key, None)
+            if signed is not None and key in self.token_keys.get(key[0], ()):
+                self.entries[key] = signed
+
+    def refresh(self, token_id, best_bid, size_usd):
+        """
+        Keep an order signed at best_bid for this token.
+        Cheap when nothing moved: only a missing price is queued for signing.
+        """
+        wanted = set()
+        p = price_key(best_bid)
+        if 0 < p < 1:
+            shares = leg_shares(size_usd, p)
+            if shares > 0: wanted.add((token_id, p, shares))
+
+        with self.lock:
+            for key in self.token_keys.get(token_id, set()) - wanted:
+                self.entries.pop(key, None)
+            self.token_keys[token_id] = wanted
+            to_sign = [k for k in wanted if k not in self.entries and k not in self.pending]
+            for key in to_sign:
+                self.pending[key] = self.pool.submit(self._sign_job, key)
+
+    def drop(self, token_ids):
+        """Stop maintaining orders for tokens that left the candidate set."""
+        with self.lock:
+            for t in token_ids:
+                for key in self.token_keys.pop(t, ()):
+                    self.entries.pop(key, None)
+
+    def take(self, token_id, price, shares):
+        """Pop a ready signed order, or sign inline on a miss."""
+        key = (token_id, price_key(price), int(shares))
+        with self.lock:
+            signed = self.entries.pop(key, None)
+        if signed is not None:
+            self.hits += 1
+            # Sign a replacement in the background so the level stays covered
+            with self.lock:
+                if key in self.token_keys.get(token_id, ()) and key not in self.pending:
+                    self.pending[key] = self.pool.submit(self._sign_job, key)
+            return signed
+        self.misses += 1
+        return self.sign(token_id, price_key(price), int(shares))
+
+    def stats(self):
+        times = sorted(self.sign_ms)
+        pct = lambda q: times[min(len(times) - 1, int(q * len(times)))] if times else 0.0
+        return {"ready": len(self.entries), "hits": self.hits, "misses": self.misses,
+                "sign_p50_ms": pct(0.50), "sign_p99_ms": pct(0.99)}
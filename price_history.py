@@ -0,0 +1,126 @@
+import numpy as np
+
+class RingBuffer:
+    """Fixed-capacity float buffer. append() returns the evicted value once full."""
+    def __init__(self, capacity):
+        self.data = np.zeros(capacity, dtype=np.float64)
+        self.capacity = capacity
+        self.idx = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, x):
+        evicted = self.data[self.idx] if self.count == self.capacity else None
+        self.data[self.idx] = x
+        self.idx = (self.idx + 1) % self.capacity
+        if self.count < self.capacity: self.count += 1
+        return evicted
+
+    def last(self):
+        return self.data[(self.idx - 1) % self.capacity] if self.count else None
+
+    def values(self):
+        """Chronological copy (oldest first)."""
+        if self.count < self.capacity: return self.data[:self.count].copy()
+        return np.concatenate((self.data[self.idx:], self.data[:self.idx]))
+
+class RollingStats:
+    """
+    Windowed Welford mean/variance over the last `capacity` samples.
+    Each add() is O(1): the evicted sample is swapped out of the running moments.
+    Moments are re-derived from the buffer once per window to stop float drift.
+    """
+    def __init__(self, capacity):
+        self.buf = RingBuffer(capacity)
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.adds_since_resync = 0
+
+    def __len__(self):
+        return len(self.buf)
+
+    def add(self, x):
+        old = self.buf.append(x)
+        n = len(self.buf)
+        if old is None:
+            delta = x - self.mean
+            self.mean += delta / n
+            self.m2 += delta * (x - self.mean)
+        else:
+            old_mean = self.mean
+            self.mean += (x - old) / n
+            self.m2 += (x - old) * (x - self.mean + old - old_mean)
+
+        self.adds_since_resync += 1
+        if self.adds_since_resync >= self.buf.capacity:
+            vals = self.buf.values()
+            self.mean = float(vals.mean())
+            self.m2 = float(((vals - self.mean) ** 2).sum())
+            self.adds_since_resync = 0
+
+    def variance(self):
+        n = len(self.buf)
+        return max(self.m2, 0.0) / (n - 1) if n > 1 else 0.0
+
+    def zscore(self, x):
+        std = self.variance() ** 0.5
+        return (x - self.mean) / std if std > 1e-9 else 0.0
+
+class PairSpreadTracker:
+    """
+    Per-token mid-price ring buffers plus rolling spread stats for every pair of
+    tokens in the same group. Memory is bounded at `capacity` samples per token/pair.
+    """
+    def __init__(self, capacity=500):
+        self.capacity = capacity
+        self.history = {}     # {token_id: RingBuffer of mids}
+        self.pairs = {}       # {(token_a, token_b): RollingStats of (mid_a - mid_b)}
+        self.token_pairs = {} # {token_id: [pair_key, ...]}
+
+    def set_groups(self, groups):
+        """
+        groups: iterable of token-id lists. Existing pair stats are kept; pairs and
+        histories for tokens that left every group are dropped.
+        """
+        wanted = set()
+        for tokens in groups:
+            tokens = sorted(set(tokens))
+            for i in range(len(tokens)):
+                for j in range(i + 1, len(tokens)):
+                    wanted.add((tokens[i], tokens[j]))
+
+        for key in [k for k in self.pairs if k not in wanted]:
+            del self.pairs[key]
+        for key in wanted:
+            if key not in self.pairs: self.pairs[key] = RollingStats(self.capacity)
+
+        self.token_pairs = {}
+        for a, b in self.pairs:
+            self.token_pairs.setdefault(a, []).append((a, b))
+            self.token_pairs.setdefault(b, []).append((a, b))
+        for t in [t for t in self.history if t not in self.token_pairs]:
+            del self.history[t]
+
+    def update_mid(self, token_id, mid):
+        """
+        Record a new mid for one token and roll every pair it belongs to.
+        Returns [(pair_key, spread, zscore, n_samples), ...] for the touched pairs.
+        """
+        if token_id not in self.token_pairs: return []
+        buf = self.history.get(token_id)
+        if buf is None:
+            buf = self.history[token_id] = RingBuffer(self.capacity)
+        buf.append(mid)
+
+        results = []
+        for key in self.token_pairs[token_id]:
+            a, b = key
+            if a not in self.history or b not in self.history: continue
+            spread = self.history[a].last() - self.history[b].last()
+            stats = self.pairs[key]
+            z = stats.zscore(spread)  # Scored against history BEFORE this sample
+            stats.add(spread)
+            results.append((key, spread, z, len(stats)))
+        return results
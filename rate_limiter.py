@@ -0,0 +1,38 @@
+import time
+import threading
+from urllib.parse import urlparse
+
+class RateLimiter:
+    """
+    Thread-safe token bucket. acquire() blocks just long enough to keep the
+    request rate under `rate_per_sec` (with bursts of up to `burst`).
+    """
+    def __init__(self, rate_per_sec, burst=None):
+        self.rate = float(rate_per_sec)
+        self.capacity = float(burst or rate_per_sec)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+_host_limiters = {}
+_registry_lock = threading.Lock()
+
+def get_host_limiter(url, rate_per_sec, burst=None):
+    """One shared budget per host, no matter how many clients/threads hit it."""
+    host = urlparse(url).netloc
+    with _registry_lock:
+        if host not in _host_limiters:
+            _host_limiters[host] = RateLimiter(rate_per_sec, burst)
+        return _host_limiters[host]
@@ -0,0 +1,89 @@
+import time
+import config
+from book_model import from_poly_book, to_ticks, TICKS_PER_DOLLAR
+
+def desired_bid(book, our_tick, our_shares, tick_size):
+    """
+    Where one resting bid should sit, in ticks.
+    Behind the touch -> join the best bid. Alone at the top with a gap below ->
+    step down to one tick above the next level (still first in queue, cheaper).
+    Otherwise stay put and keep queue priority.
+    """
+    if not book.bids: return our_tick
+    best_tick, best_size = book.bids[0]
+    if best_tick > our_tick:
+        return best_tick
+    if best_tick == our_tick and best_size <= our_shares + 1e-9:
+        below = book.bids[1][0] if len(book.bids) > 1 else 0
+        if below + tick_size < our_tick:
+            return max(below + tick_size, tick_size)
+    return our_tick
+
+class RequoteEngine:
+    """
+    Keeps resting maker pairs at the touch.
+
+    On every book refresh on_book() compares the desired bids (live book + edge
+    target) with the pair's resting orders and queues only the legs whose price has
+    to change. flush() sends all queued legs as one bulk cancel plus one batch post.
+    Each market is requoted at most once per REQUOTE_MIN_INTERVAL_SEC.
+
+    Only legs with nothing matched are moved, and only while the user fill stream
+    is live: without it a partial fill could go unseen and be re-bought.
+    """
+    def __init__(self, executor, min_interval_sec=None):
+        self.executor = executor
+        self.min_interval = min_interval_sec if min_interval_sec is not None else getattr(config, 'REQUOTE_MIN_INTERVAL_SEC', 5)
+        self.last_requote = {}  # {market_id: time of last replace}
+        self.queued = {}        # {market_id: (pair, {leg: new_price})}
+        self.stats = {"checked": 0, "requoted_legs": 0, "throttled": 0}
+
+    def on_book(self, market, obs, now=None):
+        """Queue the cancel/replace needed for this market's resting pair (if any)."""
+        if not getattr(config, 'REQUOTE_ENABLED', True) or not obs: return
+        if not self.executor.fill_stream_alive(): return
+        market_id = market.get('id') or market.get('conditionId')
+        pair = self.executor.pair_for_market(market_id)
+        if not pair or 'price_yes' not in pair: return
+        now = now or time.time()
+        self.stats["checked"] += 1
+
+        tick_size = to_ticks(float(market.get('orderPriceMinTickSize') or 0.01))
+        desired = {}
+        for leg in ('yes', 'no'):
+            state = self.executor.order_fills.get(pair[f'{leg}_id']) or {}
+            if state.get('size_matched') or state.get('cancelled'): return  # Leg already trading: leave the pair alone
+            desired[leg] = desired_bid(from_poly_book(obs.get(leg)), to_ticks(pair[f'price_{leg}']),
+                                       pair[f'size_{leg}'], tick_size)
+
+        # Edge target: never quote a pair that costs more than 1 - MAKER_MIN_PROFIT_PCT
+        max_cost = to_ticks(1.0 - config.MAKER_MIN_PROFIT_PCT / 100)
+        if desired['yes'] + desired['no'] > max_cost:
+            current = {leg: to_ticks(pair[f'price_{leg}']) for leg in ('yes', 'no')}
+            # Move only the legs that still fit next to the other leg's resting price
+            for leg, other in (('yes', 'no'), ('no', 'yes')):
+                if desired[leg] + current[other] > max_cost: desired[leg] = current[leg]
+            if desired['yes'] + desired['no'] > max_cost: desired = current
+
+        changes = {leg: t / TICKS_PER_DOLLAR for leg, t in desired.items() if t != to_ticks(pair[f'price_{leg}'])}
+        if not changes: return
+        if now - self.last_requote.get(market_id, 0) < self.min_interval:
+            self.stats["throttled"] += 1
+            return
+        self.queued[market_id] = (pair, changes)
+
+    def flush(self, now=None):
+        """Send every queued requote together. Returns the number of legs replaced."""
+        if not self.queued: return 0
+        batch = list(self.queued.values())
+        self.queued = {}
+        now = now or time.time()
+        replaced = self.executor.replace_legs(batch)
+        for pair, _ in batch:
+            self.last_requote[pair['market_id']] = now
+        self.stats["requoted_legs"] += replaced
+        return replaced
+
+    def prune(self, live_market_ids):
+        for mid in [m for m in self.last_requote if m not in live_market_ids]:
+            del self.last_requote[mid]
@@ -1,6 +1,28 @@
+import os
+import json
 import time
+import uuid
+import threading
+import contextlib
 import config
 
+try:
+    import fcntl  # POSIX file locks for the cross-process state file
+except ImportError:
+    fcntl = None
+
+SHARED_FIELDS = ('market_exposure', 'event_exposure', 'total_trades', 'total_capital_locked', 'positions',
+                 'reservations', 'pnl', 'is_halted')
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+
 class RiskManager:
     """
     Tracks exposure across markets and events to prevent over-concentration.
@@ -13,18 +35,148 @@ class RiskManager:
     3. Lose track of open positions, leading to "runaway" betting.
     
     This class acts as a GATEKEEPER before any order is placed.
+
+    Capital is claimed with reserve() -> token BEFORE orders go out, then the token
+    is commit()ed once the orders are live or release()d if they fail, so two
+    strategies can never both pass the check for the last slot. Every check+update
+    runs under one short lock (O(1) dict arithmetic, never held across network I/O).
+    With RISK_STATE_FILE set, the same state is shared by every bot process through
+    an flock()ed JSON file; positions of processes that died are dropped on startup.
+    The halt flag and each process's P&L are shared too, so the drawdown brake sees
+    the whole session and stops every process. The file is only re-parsed when another
+    process changed it and only rewritten when this one did.
     """
-    def __init__(self, starting_bankroll_usd=None):
+    def __init__(self, starting_bankroll_usd=None, state_file=None):
         self.market_exposure = {}  # {market_id: usd_amount}
         self.event_exposure = {}   # {event_ticker/slug: usd_amount}
         self.total_trades = 0
         self.total_capital_locked = 0.0
         self.starting_bankroll = starting_bankroll_usd or getattr(config, 'STARTING_BANKROLL_USD', 50.0)
-        self.realized_pnl = 0.0     # Tracks actual wins/losses
+        self.realized_pnl = 0.0     # Tracks actual wins/losses (fed by the PnL ledger)
+        self.unrealized_pnl = 0.0   # Open positions marked to the live books
         self.is_halted = False     # Emergency stop flag
+        self.positions = {}        # {token: {"event", "market", "amount", "committed", "pid", "ts"}}
+        self.reservations = {}     # {token: ts} uncommitted positions, oldest first
+        self.pnl = {}              # {pid: [realized, unrealized]} of every process sharing the state
+        self.lock = threading.RLock()
+        self.dirty = False
+        self.last_raw = None       # State file contents as of our last read/write
+        self.state_file = state_file if state_file is not None else getattr(config, 'RISK_STATE_FILE', None)
+        if self.state_file and fcntl is None:
+            print("⚠️ RiskManager: file locks unavailable on this platform, risk state is per-process.")
+            self.state_file = None
+        if self.state_file:
+            with self._txn(): self._drop_dead_processes()
+
+    @contextlib.contextmanager
+    def _txn(self):
+        """Thread lock + (if shared) exclusive file lock, with state reloaded before and saved after."""
+        with self.lock:
+            if not self.state_file:
+                yield
+                return
+            with open(self.state_file, 'a+', encoding='utf-8') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.seek(0)
+                    raw = f.read()
+                    if raw and raw != self.last_raw:
+                        state = json.loads(raw)
+                        for k in SHARED_FIELDS:
+                            if k in state: setattr(self, k, state[k])
+                        if "reservations" not in state:  # Older state files
+                            self.reservations = {t: p["ts"] for t, p in sorted(self.positions.items(), key=lambda i: i[1]["ts"])
+                                                 if not p["committed"]}
+                        self.last_raw = raw
+                    self.dirty = False
+                    yield
+                    if self.dirty:
+                        self.last_raw = json.dumps({k: getattr(self, k) for k in SHARED_FIELDS})
+                        f.seek(0)
+                        f.truncate()
+                        f.write(self.last_raw)
+                        f.flush()
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _apply(self, event_id, market_id, amount_usd, sign):
+        if sign > 0:
+            self.market_exposure[market_id] = self.market_exposure.get(market_id, 0) + amount_usd
+            self.event_exposure[event_id] = self.event_exposure.get(event_id, 0) + amount_usd
+            self.total_trades += 1
+            self.total_capital_locked += amount_usd
+        else:
+            self.market_exposure[market_id] = max(0, self.market_exposure.get(market_id, 0) - amount_usd)
+            self.event_exposure[event_id] = max(0, self.event_exposure.get(event_id, 0) - amount_usd)
+            self.total_trades = max(0, self.total_trades - 1)
+            self.total_capital_locked = max(0, self.total_capital_locked - amount_usd)
+        self.dirty = True
+
+    def _add_position(self, event_id, market_id, amount_usd, committed):
+        token = uuid.uuid4().hex
+        self.positions[token] = {"event": event_id, "market": market_id, "amount": amount_usd,
+                                 "committed": committed, "pid": os.getpid(), "ts": time.time()}
+        if not committed: self.reservations[token] = self.positions[token]["ts"]
+        self._apply(event_id, market_id, amount_usd, +1)
+        return token
+
+    def _drop_position(self, token):
+        p = self.positions.pop(token, None)
+        self.reservations.pop(token, None)
+        if p: self._apply(p["event"], p["market"], p["amount"], -1)
+        return p
+
+    def _expire_reservations(self):
+        """Reservations never committed or released (e.g. the caller crashed) time out. Oldest first, stops at the first live one."""
+        cutoff = time.time() - getattr(config, 'RISK_RESERVATION_TTL_SEC', 120)
+        while self.reservations:
+            token, ts = next(iter(self.reservations.items()))
+            if ts >= cutoff: break
+            self._drop_position(token)
+
+    def _drop_dead_processes(self):
+        for token in [t for t, p in self.positions.items() if not _pid_alive(p["pid"])]:
+            self._drop_position(token)
+        for pid in [pid for pid in self.pnl if not _pid_alive(int(pid))]:
+            del self.pnl[pid]
+            self.dirty = True
+        if self.is_halted and not self.pnl and not self.positions:
+            self.is_halted = False  # Nobody left from the halted session: a restart starts a new one
+            self.dirty = True
+
+    def reserve(self, event_id, market_id, amount_usd):
+        """
+        Atomically check the limits and claim the capital.
+        Returns (token, "OK") or (None, reason). Follow with commit() or release().
+        """
+        with self._txn():
+            self._expire_reservations()
+            ok, reason = self._check(event_id, market_id, amount_usd)
+            if not ok: return None, reason
+            return self._add_position(event_id, market_id, amount_usd, committed=False), "OK"
+
+    def commit(self, token):
+        """Turn a reservation into an open position. False if it already expired."""
+        with self._txn():
+            p = self.positions.get(token)
+            if not p: return False
+            p["committed"] = True
+            self.reservations.pop(token, None)
+            self.dirty = True
+            return True
+
+    def release(self, token):
+        """Give back a reservation (orders failed / never sent)."""
+        with self._txn():
+            return self._drop_position(token) is not None
         
     def can_add_position(self, event_id, market_id, amount_usd):
-        """Check if adding this position exceeds any risk limits."""
+        """Check if adding this position exceeds any risk limits (advisory: use reserve() to claim)."""
+        with self._txn():
+            self._expire_reservations()
+            return self._check(event_id, market_id, amount_usd)
+
+    def _check(self, event_id, market_id, amount_usd):
         if self.is_halted:
             return False, "Strategy HALTED due to risk/drawdown limits."
 
@@ -37,11 +189,10 @@ class RiskManager:
             return False, f"Insufficient capital (${self.total_capital_locked + amount_usd:.2f} > ${self.starting_bankroll:.2f} bankroll)."
 
         # 3. Drawdown Check (New!)
-        # Pause if realized P&L drops below a certain threshold
-        max_drawdown = getattr(config, 'MAX_SESSION_DRAWDOWN_USD', 10.0)
-        if self.realized_pnl < -max_drawdown:
-            self.is_halted = True
-            return False, f"Max drawdown reached (-${abs(self.realized_pnl):.2f}). Stopping for safety."
+        # Pause if marked-to-market session P&L drops below a certain threshold
+        if self._drawdown_hit():
+            self.is_halted = self.dirty = True
+            return False, f"Max drawdown reached (-${abs(sum(self._session_pnl())):.2f}). Stopping for safety."
             
         # 4. Per-market exposure limit
         current_m_exp = self.market_exposure.get(market_id, 0)
@@ -55,27 +206,62 @@ class RiskManager:
             
         return True, "OK"
 
+    def _session_pnl(self):
+        """(realized, unrealized) summed over every process sharing the state."""
+        if not self.pnl: return self.realized_pnl, self.unrealized_pnl
+        return sum(r for r, _ in self.pnl.values()), sum(u for _, u in self.pnl.values())
+
+    def _drawdown_hit(self):
+        max_drawdown = getattr(config, 'MAX_SESSION_DRAWDOWN_USD', 10.0)
+        return sum(self._session_pnl()) < -max_drawdown
+
+    def update_pnl(self, realized, unrealized):
+        """Called by the PnL ledger on every revaluation: the drawdown brake trips in real time."""
+        with self._txn():
+            self.realized_pnl = realized
+            self.unrealized_pnl = unrealized
+            entry = [round(realized, 2), round(unrealized, 2)]  # Cent resolution: no rewrite per tick of noise
+            pid = str(os.getpid())
+            if self.pnl.get(pid) != entry:
+                self.pnl[pid] = entry
+                self.dirty = True
+            if not self.is_halted and self._drawdown_hit():
+                self.is_halted = self.dirty = True
+                r, u = self._session_pnl()
+                print(f"🚨 DRAWDOWN BRAKE: session P&L ${r + u:.2f} "
+                      f"(realized ${r:.2f}, unrealized ${u:.2f}). Trading halted.")
+
+    def halt(self):
+        """Emergency stop for every process sharing the state."""
+        with self._txn():
+            self.is_halted = self.dirty = True
+
     def record_trade(self, event_id, market_id, amount_usd):
         """Record a successful trade in the tracker."""
-        self.market_exposure[market_id] = self.market_exposure.get(market_id, 0) + amount_usd
-        self.event_exposure[event_id] = self.event_exposure.get(event_id, 0) + amount_usd
-        self.total_trades += 1
-        self.total_capital_locked += amount_usd
+        with self._txn():
+            self._add_position(event_id, market_id, amount_usd, committed=True)
 
     def release_trade(self, event_id, market_id, amount_usd):
-        """Release capital when a trade is closed or cancelled (for future use)."""
-        self.market_exposure[market_id] = max(0, self.market_exposure.get(market_id, 0) - amount_usd)
-        self.event_exposure[event_id] = max(0, self.event_exposure.get(event_id, 0) - amount_usd)
-        self.total_trades = max(0, self.total_trades - 1)
-        self.total_capital_locked = max(0, self.total_capital_locked - amount_usd)
+        """Release capital when a trade is closed or cancelled."""
+        with self._txn():
+            pid = os.getpid()
+            token = next((t for t, p in self.positions.items() if p["committed"] and p["pid"] == pid
+                          and p["market"] == market_id and abs(p["amount"] - amount_usd) < 1e-9), None)
+            if token: self._drop_position(token)
+            else: self._apply(event_id, market_id, amount_usd, -1)
 
     def get_status(self):
         """Return a summary of current risk state."""
-        return {
-            "open_trades": self.total_trades,
-            "capital_locked": self.total_capital_locked,
-            "remaining_capital": self.starting_bankroll - self.total_capital_locked,
-        }
+        with self._txn():
+            return {
+                "open_trades": self.total_trades,
+                "capital_locked": self.total_capital_locked,
+                "remaining_capital": self.starting_bankroll - self.total_capital_locked,
+                "reserved": sum(self.positions[t]["amount"] for t in self.reservations if t in self.positions),
+                "realized_pnl": self._session_pnl()[0],
+                "unrealized_pnl": self._session_pnl()[1],
+                "halted": self.is_halted,
+            }
 
 # Singleton instance for shared usage
 risk_manager = RiskManager()
@@ -0,0 +1,23 @@
+from arb_solver import date_ladder_implications, enumerate_states
+
+def q(text):
+    return {"question": text}
+
+def test_by_deadlines_form_a_ladder():
+    markets = [q("Will the Fed cut rates by June?"), q("Will the Fed cut rates by March?")]
+    assert date_ladder_implications(markets) == [(1, 0)]
+
+def test_in_month_windows_are_not_a_ladder():
+    markets = [q("Will the Fed cut rates in March?"), q("Will the Fed cut rates in June?")]
+    assert date_ladder_implications(markets) == []
+    # "March=YES, June=NO" must stay a feasible state
+    states = enumerate_states(2, implications=date_ladder_implications(markets))
+    assert [1.0, 0.0] in states.tolist()
+
+def test_mixed_dated_and_undated_rungs_are_skipped():
+    markets = [q("Will X happen by June?"), q("Will X happen by March 2027?")]
+    assert date_ladder_implications(markets) == []
+
+def test_dated_rungs_order_by_year():
+    markets = [q("Will X happen by March 2027?"), q("Will X happen by June 2026?")]
+    assert date_ladder_implications(markets) == [(1, 0)]
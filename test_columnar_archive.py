@@ -0,0 +1,51 @@
+import os
+from columnar_archive import ArchiveWriter, ArchiveReader, read_snapshots
+
+def snapshot(i):
+    market = {"id": str(i % 3), "question": f"Q{i % 3}?", "clobTokenIds": '["y", "n"]', "volume24hr": 100.0 + i}
+    book = {"yes": {"bids": [{"price": "0.45", "size": "10"}], "asks": [{"price": "0.47", "size": "5"}]},
+            "no": {"bids": [{"price": "0.52", "size": "8"}], "asks": []}}
+    return {"timestamp": f"2026-01-01T00:{i:02d}:00", "poly_markets": [{"market": market, "orderbook": book}],
+            "kalshi_markets": [{"ticker": f"K{i % 2}"}]}
+
+def write(path, snaps, chunk=2):
+    w = ArchiveWriter(path, chunk)
+    for s in snaps: w.append(s)
+    w.close()
+
+def timestamps(path):
+    return [s["timestamp"] for s in read_snapshots(path)]
+
+def test_round_trip_and_reopen(tmp_path):
+    path = str(tmp_path / "a.pmca")
+    write(path, [snapshot(i) for i in range(3)])
+    write(path, [snapshot(i) for i in range(3, 5)])
+    snaps = list(read_snapshots(path))
+    assert [s["timestamp"] for s in snaps] == [snapshot(i)["timestamp"] for i in range(5)]
+    row = snaps[4]["poly_markets"][0]
+    assert row["market"]["volume24hr"] == 104.0
+    assert row["orderbook"]["yes"]["asks"] == [{"price": "0.47", "size": "5.0"}]
+    assert snaps[4]["kalshi_markets"] == [{"ticker": "K0"}]
+
+def test_truncated_mid_write_recovers(tmp_path):
+    path = str(tmp_path / "a.pmca")
+    write(path, [snapshot(i) for i in range(4)])
+    # Next writer appends a chunk, then dies while writing the footer
+    w = ArchiveWriter(path, 2)
+    for i in range(4, 6): w.append(snapshot(i))
+    size, third = os.path.getsize(path), w.chunks[2]["offset"]
+    w.f.close()
+    with open(path, 'r+b') as f: f.truncate(size - 7)
+    assert timestamps(path) == [snapshot(i)["timestamp"] for i in range(6)]
+
+    # Dies mid-chunk: the torn chunk is dropped, the file still reads and re-opens
+    with open(path, 'r+b') as f: f.truncate(third + 20)
+    reader = ArchiveReader(path)
+    assert reader.recovered and len(reader) == 4
+    assert reader.markets and reader.kalshi
+    reader.close()
+    write(path, [snapshot(i) for i in range(6, 8)])
+    assert timestamps(path) == [snapshot(i)["timestamp"] for i in (0, 1, 2, 3, 6, 7)]
+    reader = ArchiveReader(path)
+    assert not reader.recovered
+    reader.close()
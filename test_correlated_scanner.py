@@ -0,0 +1,40 @@
+import correlated_scanner
+from correlated_scanner import CorrelatedScanner
+
+def book(bid, ask):
+    return {'bids': [{'price': str(bid), 'size': '10'}], 'asks': [{'price': str(ask), 'size': '10'}]}
+
+class FakeWS:
+    def __init__(self):
+        self.orderbooks = {}
+        self.listeners = []
+
+    def add_listener(self, fn):
+        self.listeners.append(fn)
+
+def test_ws_tick_recorded_once_and_not_again_by_poll(monkeypatch):
+    s = CorrelatedScanner()
+    ws = FakeWS()
+    s.attach_ws(ws)
+    s.spreads.set_groups([["YA", "YB"]])
+    s.token_sides = {"YA": ("a", "yes"), "YB": ("b", "yes")}
+    ws.orderbooks["YA"] = book(0.40, 0.42)
+    s.on_book_update("YA", ws.orderbooks["YA"])
+    assert len(s.market_history["YA"]) == 1
+
+    # Poll cycle serving the same cached WS book: not re-recorded
+    m = {'id': 'a', 'clobTokenIds': '["YA", "NA"]', 'volume24hr': 1}
+    mb = {'id': 'b', 'clobTokenIds': '["YB", "NB"]', 'volume24hr': 1}
+    obs = {'yes': ws.orderbooks["YA"], 'no': book(0.58, 0.60)}
+    monkeypatch.setattr(correlated_scanner.poly, 'get_market_orderbooks', lambda market: obs if market is m else None)
+    monkeypatch.setattr(correlated_scanner.poly, 'fetch_active_markets', lambda *a: [])
+    monkeypatch.setattr(correlated_scanner.event_graph, 'groups', lambda min_size=2: {"ev": [m, mb]})
+    monkeypatch.setattr(correlated_scanner.event_graph, 'update', lambda markets: (0, 0, 0))
+    monkeypatch.setattr(correlated_scanner.config, 'WS_ENABLED', False)
+    s.check_correlations()
+    assert len(s.market_history["YA"]) == 1
+
+    # A REST book (not the WS cache object) is recorded
+    obs['yes'] = book(0.41, 0.43)
+    s.check_correlations()
+    assert len(s.market_history["YA"]) == 2
@@ -0,0 +1,31 @@
+from kalshi_client import KalshiClient
+
+class FakeResp:
+    def __init__(self, status, payload=None, headers=None):
+        self.status_code = status
+        self.payload = payload or {}
+        self.headers = headers or {}
+
+    def json(self):
+        return self.payload
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+
+    def get(self, url, params=None, timeout=None):
+        return self.responses.pop(0)
+
+def test_full_pagination():
+    k = KalshiClient()
+    k.session = FakeSession([FakeResp(200, {"markets": [{"ticker": "A"}], "cursor": "c1"}),
+                             FakeResp(200, {"markets": [{"ticker": "B"}], "cursor": ""})])
+    assert [m["ticker"] for m in k.fetch_active_markets()] == ["A", "B"]
+
+def test_rate_limited_page_returns_none():
+    k = KalshiClient()
+    k.session = FakeSession([FakeResp(200, {"markets": [{"ticker": "A"}], "cursor": "c1"}),
+                             FakeResp(429, headers={"Retry-After": "30"})])
+    assert k.fetch_active_markets() is None
+    # Still cooling down: no partial list either
+    assert k.fetch_active_markets() is None
@@ -0,0 +1,37 @@
+import random
+from match_index import MarketMatchIndex
+
+def index(*tickers):
+    idx = MarketMatchIndex()
+    idx.sync([{'ticker': t, 'title': t} for t in tickers], lambda km: km['title'])
+    return idx
+
+def ticker(idx, slug):
+    km = idx.match_slug(slug)
+    return km['ticker'] if km else None
+
+def test_raw_substring_semantics():
+    idx = index("KXFEDDECISION-25DEC", "FED", "KXBTC-25DEC31", "AB")
+    assert ticker(idx, "feddecision") == "KXFEDDECISION-25DEC"      # Slug inside the ticker, across no separator
+    assert ticker(idx, "kxfedcut-dec") == "FED"                     # Ticker inside the slug, mid-token
+    assert ticker(idx, "will-kxbtc-25dec31-close-high") == "KXBTC-25DEC31"
+    assert ticker(idx, "xab") == "AB"                               # Ticker shorter than a trigram
+    assert ticker(idx, "fed-decision") == "FED"                     # Not KXFEDDECISION-25DEC: no raw substring either way
+    assert ticker(idx, "nothing-here") is None
+
+def test_first_listed_ticker_wins_and_removal():
+    idx = index("KXFED-25DEC", "KXFED")
+    assert ticker(idx, "kxfed-25dec-cut") == "KXFED-25DEC"
+    idx.sync([{'ticker': 'KXFED', 'title': 'x'}], lambda km: km['title'])
+    assert ticker(idx, "kxfed-25dec-cut") == "KXFED"
+    assert ticker(idx, "kxfed-25dec") == "KXFED"
+
+def test_matches_linear_scan():
+    rng = random.Random(7)
+    alphabet = "abcdef-"
+    tickers = list(dict.fromkeys("".join(rng.choice(alphabet) for _ in range(rng.randint(1, 8))) for _ in range(300)))
+    idx = index(*tickers)
+    for _ in range(500):
+        slug = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 12)))
+        expected = next((t for t in tickers if slug in t or t in slug), None)
+        assert ticker(idx, slug) == expected
@@ -0,0 +1,35 @@
+import json
+from match_store import MatchDecisionStore
+
+def kalshi_text(km):
+    return km.get('title', '')
+
+def test_rejection_survives_restart_with_same_listings(tmp_path):
+    path = str(tmp_path / "decisions.json")
+    store = MatchDecisionStore(path)
+    assert store.note_kalshi(["A", "B"]) == {"A", "B"}
+    store.record({'slug': 'poly-x', 'question': 'X?'}, None, 0.5, "semantic", False, kalshi_text)
+    store.save()
+
+    restarted = MatchDecisionStore(path)
+    assert restarted.is_rejected({'slug': 'poly-x'})
+    assert restarted.note_kalshi(["A", "B"]) == set()
+    assert restarted.note_kalshi(["A", "B", "C"]) == {"C"}
+
+def test_exported_entries_stay_automatic(tmp_path):
+    store = MatchDecisionStore(str(tmp_path / "decisions.json"))
+    store.record({'slug': 'poly-y', 'question': 'Y?'}, {'ticker': 'KY', 'title': 'Y'}, 0.95, "semantic", True, kalshi_text)
+    mapping = {'poly-manual': 'KM'}
+    assert store.export_to_mapping(mapping, str(tmp_path / "mapping.json")) == 1
+    assert mapping == {'poly-manual': 'KM', 'poly-y': 'KY'}
+    assert store.manual_entries(mapping) == {'poly-manual': 'KM'}
+    # A human edit turns the entry into a manual override
+    mapping['poly-y'] = 'KY2'
+    assert store.manual_entries(mapping) == {'poly-manual': 'KM', 'poly-y': 'KY2'}
+
+def test_loads_decisions_only_file(tmp_path):
+    path = tmp_path / "decisions.json"
+    path.write_text(json.dumps({'poly-z': {'accepted': False}}))
+    store = MatchDecisionStore(str(path))
+    assert store.is_rejected({'slug': 'poly-z'})
+    assert store.kalshi_seen == set() and store.exported == {}
@@ -0,0 +1,33 @@
+import pytest
+import config
+import nlp_backend
+
+def _force_onnx(monkeypatch, backend):
+    monkeypatch.setattr(config, 'NLP_BACKEND', backend, raising=False)
+    monkeypatch.setattr(nlp_backend, '_resolved_backend', None)
+    monkeypatch.setattr(nlp_backend, '_onnx_available', lambda: True)
+    def broken(*args, **kwargs): raise ImportError("No module named 'tokenizers'")
+    monkeypatch.setattr(nlp_backend, 'OnnxSentenceEncoder', broken)
+    monkeypatch.setattr(nlp_backend, 'load_torch_encoder', lambda: 'torch-model')
+
+def test_auto_falls_back_to_torch_when_onnx_init_fails(monkeypatch):
+    _force_onnx(monkeypatch, 'auto')
+    assert nlp_backend.model_version().endswith(':onnx-' + getattr(config, 'NLP_ONNX_PRECISION', 'int8'))
+    assert nlp_backend.load_encoder() == 'torch-model'
+    assert nlp_backend.resolve_backend() == 'torch'
+    assert nlp_backend.model_version() == getattr(config, 'NLP_MODEL_NAME', 'all-MiniLM-L6-v2')
+
+def test_explicit_onnx_does_not_fall_back(monkeypatch):
+    _force_onnx(monkeypatch, 'onnx')
+    with pytest.raises(ImportError):
+        nlp_backend.load_encoder()
+    assert nlp_backend.resolve_backend() == 'onnx'
+
+def test_resolution_is_cached(monkeypatch):
+    monkeypatch.setattr(config, 'NLP_BACKEND', 'auto', raising=False)
+    monkeypatch.setattr(nlp_backend, '_resolved_backend', None)
+    calls = []
+    monkeypatch.setattr(nlp_backend, '_onnx_available', lambda: calls.append(1) or False)
+    assert nlp_backend.resolve_backend() == 'torch'
+    assert nlp_backend.model_version() == nlp_backend.model_version()
+    assert len(calls) == 1
@@ -0,0 +1,42 @@
+from datetime import datetime
+from order_journal import OrderJournal, pair_to_record, pair_from_record
+
+def run_events(j):
+    j.append('intent', 'm1', {'yes_token': 'Y1'})
+    j.append('intent', 'm2', {'yes_token': 'Y2'})
+    j.append('abort', 'm2')
+    j.append('ack', 'm1', {'yes_id': 'o1', 'no_id': 'o2', 'price_yes': 0.4})
+    j.append('fill', 'o1', {'size_matched': 5})
+    j.append('fill', 'o2', {'size_matched': 3})
+    j.append('replace', 'm1', {'leg': 'yes', 'order_id': 'o3', 'price': 0.41})
+    j.append('intent', 'm3', {'yes_token': 'Y3'})
+    j.append('ack', 'm3', {'yes_id': 'o4', 'no_id': 'o5'})
+    j.append('close', 'm3')
+
+EXPECTED = {
+    "intents": {},
+    "pairs": {"m1": {'yes_id': 'o3', 'no_id': 'o2', 'price_yes': 0.41}},
+    "fills": {"o2": {'size_matched': 3}},
+}
+
+def test_replay_after_crash(tmp_path):
+    path = str(tmp_path / "j.db")
+    j = OrderJournal(path, compact_every=1000)
+    run_events(j)
+    assert j.state == EXPECTED
+    # No close(): a fresh process replays the WAL
+    assert OrderJournal(path).replay() == EXPECTED
+
+def test_replay_across_compactions(tmp_path):
+    path = str(tmp_path / "j.db")
+    j = OrderJournal(path, compact_every=3)
+    run_events(j)
+    assert j.db.execute("SELECT COUNT(*) FROM events").fetchone()[0] == 1
+    j2 = OrderJournal(path, compact_every=3)
+    assert j2.replay() == EXPECTED and j2.since_compact == 1
+
+def test_pair_record_round_trip():
+    pair = {'market_id': 'm1', 'timestamp': datetime(2026, 1, 2, 3, 4, 5), 'busy': True, 'size_yes': 10}
+    rec = pair_to_record(pair)
+    assert rec == {'market_id': 'm1', 'timestamp': '2026-01-02T03:04:05', 'size_yes': 10}
+    assert pair_from_record(rec) == {'market_id': 'm1', 'timestamp': datetime(2026, 1, 2, 3, 4, 5), 'size_yes': 10}
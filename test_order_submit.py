@@ -0,0 +1,127 @@
+import itertools
+import threading
+import concurrent.futures
+import config
+import trade_executor
+from trade_executor import TradeExecutor
+from risk_manager import RiskManager
+from pnl_engine import PnLLedger
+from py_order_utils.model.order import Order, SignedOrder
+
+ADDR = '0x' + '1' * 40
+
+class FakeExchange:
+    """CLOB stand-in: signed orders are keyed by salt, so a re-sent order is a duplicate."""
+    def __init__(self):
+        self.salts = itertools.count(1)
+        self.orders = {}          # {salt: open order dict}
+        self.seen = set()
+        self.drop_batch_response = 0  # Next N batch posts land, then raise
+        self.fill_on_post = False     # Taker orders: matched at once, never resting
+        self.single_posts = 0
+
+    def create_order(self, args):
+        shares = int(args.size)
+        order = Order(salt=next(self.salts), maker=ADDR, signer=ADDR, taker='0x' + '0' * 40, tokenId=int(args.token_id),
+                      makerAmount=int(round(args.price * shares * 1e6)), takerAmount=shares * 1_000_000,
+                      expiration=0, nonce=0, feeRateBps=0, side=0, signatureType=0)
+        return SignedOrder(order=order, signature='0x')
+
+    def _post(self, signed):
+        salt = signed.order['salt']
+        if salt in self.seen:
+            return {"success": False, "errorMsg": "order is invalid. Duplicated."}
+        self.seen.add(salt)
+        oid = f"0xorder{salt}"
+        token, side, price, size = trade_executor.signed_terms(signed)
+        if not self.fill_on_post:
+            self.orders[salt] = {"id": oid, "asset_id": token, "side": side, "price": f"{price:g}", "original_size": f"{size:g}"}
+        return {"success": True, "orderID": oid, "takingAmount": str(size) if self.fill_on_post else "0"}
+
+    def post_orders(self, args):
+        resps = [self._post(a.order) for a in args]
+        if self.drop_batch_response:
+            self.drop_batch_response -= 1
+            raise TimeoutError("read timed out")
+        return resps
+
+    def post_order(self, signed, order_type):
+        self.single_posts += 1
+        return self._post(signed)
+
+    def get_order(self, order_id):
+        return {"id": order_id, "size_matched": "0", "original_size": "10"}  # Cancelled unfilled
+
+    def get_orders(self):
+        return list(self.orders.values())
+
+    def cancel_orders(self, ids):
+        gone = [i for i in ids if i not in {o["id"] for o in self.orders.values()}]
+        self.orders = {s: o for s, o in self.orders.items() if o["id"] not in ids}
+        return {"canceled": [i for i in ids if i not in gone], "not_canceled": {i: "gone" for i in gone}}
+
+def make_executor(monkeypatch, exchange):
+    monkeypatch.setattr(trade_executor, 'pnl_ledger', PnLLedger())
+    monkeypatch.setattr(trade_executor, 'risk_manager', RiskManager(100.0, state_file=""))
+    monkeypatch.setattr(config, 'LIVE_TRADING', True)
+    monkeypatch.setattr(config, 'BATCH_ORDERS_ENABLED', True)
+    ex = TradeExecutor.__new__(TradeExecutor)
+    ex.clob = exchange
+    ex.presign = None
+    ex.journal = None
+    ex.pool = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+    ex.submit_stats = {"pairs": 0, "gap_ms_total": 0.0, "gap_ms_max": 0.0, "rtt_ms_total": 0.0}
+    ex.hedge_lock = threading.RLock()
+    ex.hedge_pairs, ex.pair_by_order, ex.order_fills = [], {}, {}
+    ex.closed_orders, ex.order_meta, ex.filled_qty, ex.chase_orders = {}, {}, {}, {}
+    return ex
+
+MARKET = {"id": "m1", "question": "Will it happen?", "clobTokenIds": '["111", "222"]'}
+
+def test_batch_that_lands_then_raises_is_tracked(monkeypatch):
+    exchange = FakeExchange()
+    exchange.drop_batch_response = 1
+    ex = make_executor(monkeypatch, exchange)
+    ex.place_maker_orders(MARKET, 0.45, 0.50, size_usd=10)
+
+    (pair,) = ex.hedge_pairs
+    assert {pair['yes_id'], pair['no_id']} == {o["id"] for o in exchange.orders.values()}
+    assert exchange.single_posts == 0  # Found on the book: nothing re-posted
+    assert trade_executor.risk_manager.total_trades == 1
+
+def test_repost_duplicate_is_resolved_to_the_live_order(monkeypatch):
+    exchange = FakeExchange()
+    exchange.drop_batch_response = 1
+    ex = make_executor(monkeypatch, exchange)
+    real_get_orders = exchange.get_orders
+    calls = []
+    def flaky_get_orders():
+        calls.append(1)
+        if len(calls) == 1: raise ConnectionError("lookup failed")
+        return real_get_orders()
+    exchange.get_orders = flaky_get_orders
+
+    ex.place_maker_orders(MARKET, 0.45, 0.50, size_usd=10)
+    # Lookup failed, so both legs were re-posted, came back duplicated and were looked up again
+    assert exchange.single_posts == 2
+    (pair,) = ex.hedge_pairs
+    assert {pair['yes_id'], pair['no_id']} == {o["id"] for o in exchange.orders.values()}
+
+def test_chase_resent_after_lost_response_buys_once(monkeypatch):
+    exchange = FakeExchange()
+    ex = make_executor(monkeypatch, exchange)
+    monkeypatch.setattr(trade_executor.time, 'sleep', lambda sec: None)
+    no_leg = exchange.create_order(trade_executor.OrderArgs(price=0.5, size=10, side="BUY", token_id="222"))
+    exchange._post(no_leg)
+    pair = {"yes_id": "0xfilled", "no_id": "0xorder1", "market_question": "Will it happen?",
+            "event_id": "e", "market_id": "m1", "size_usd": 10}
+    leg = {"id": "0xorder1", "token": "222", "size": 10, "side": "NO", "waited": "1s"}
+
+    # Every attempt lands (the taker chase matches at once) but no response comes back
+    exchange.fill_on_post = True
+    exchange.drop_batch_response = 3
+    assert ex._apply_actions([(pair, ('chase', dict(leg)))]) == []
+    # Next cycle re-sends the same signed chase: a duplicate, i.e. already bought
+    assert ex._apply_actions([(pair, ('chase', dict(leg)))]) == [pair]
+    assert len(exchange.seen) == 2  # The original NO bid and ONE chase order
+    assert not ex.chase_orders
@@ -0,0 +1,70 @@
+import threading
+import trade_executor
+from trade_executor import TradeExecutor
+from pnl_engine import PnLLedger
+
+def make_executor(monkeypatch):
+    ledger = PnLLedger()
+    monkeypatch.setattr(trade_executor, 'pnl_ledger', ledger)
+    ex = TradeExecutor.__new__(TradeExecutor)  # No CLOB client / journal
+    ex.hedge_lock = threading.RLock()
+    ex.order_meta = {}
+    ex.filled_qty = {}
+    ex.pair_by_order = {}
+    return ex, ledger
+
+def test_fill_delivered_twice_is_booked_once(monkeypatch):
+    ex, ledger = make_executor(monkeypatch)
+    ex.order_meta["o1"] = ("tok", 0.40, 10.0)
+    ex.pair_by_order["o1"] = {}
+    ex._note_fill("o1", 6.0)   # User WS event
+    ex._note_fill("o1", 6.0)   # Same state again from the REST poll
+    assert ledger.positions["tok"].shares == 6.0
+    ex._note_fill("o1", 10.0)
+    assert ledger.positions["tok"].shares == 10.0
+    assert abs(ledger.positions["tok"].cost - 4.0) < 1e-9
+
+def test_concurrent_duplicate_fills(monkeypatch):
+    ex, ledger = make_executor(monkeypatch)
+    for i in range(200):
+        ex.order_meta[f"o{i}"] = (f"t{i}", 0.5, 10.0)
+        ex.pair_by_order[f"o{i}"] = {}
+    barrier = threading.Barrier(4)
+
+    def deliver():
+        barrier.wait()
+        for i in range(200):
+            ex._note_fill(f"o{i}", 10.0)
+    threads = [threading.Thread(target=deliver) for _ in range(4)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert all(ledger.positions[f"t{i}"].shares == 10.0 for i in range(200))
+
+def test_completed_set_realizes_once(monkeypatch):
+    ex, ledger = make_executor(monkeypatch)
+    ledger.register_market("m", "y", "n")
+    ex.order_meta.update({"a": ("y", 0.45, 10.0), "b": ("n", 0.50, 10.0)})
+    ex.pair_by_order.update({"a": {}, "b": {}})
+    for oid in ("a", "b", "a", "b"):
+        ex._note_fill(oid, 10.0)
+    assert abs(ledger.realized - 0.5) < 1e-9
+
+def test_fill_event_racing_pair_close_is_journalled(monkeypatch):
+    ex, ledger = make_executor(monkeypatch)
+    journalled = []
+    pair = {"yes_id": "o1", "no_id": "o2"}
+    ex.order_fills = {}
+    ex.pair_by_order["o1"] = pair
+
+    class Pool:
+        def submit(self, fn, *args): pass
+    ex.pool = Pool()
+    # The pair closes (entry popped) between the lock release and the journal write
+    real_note = ex._note_fill
+    def note_then_close(order_id, size):
+        real_note(order_id, size)
+        ex.order_fills.pop(order_id, None)
+    ex._note_fill = note_then_close
+    ex._journal = lambda kind, key, data: journalled.append((kind, key, data))
+    ex.on_order_update("o1", 4.0, 10.0, "UPDATE")
+    assert journalled == [('fill', 'o1', {"size_matched": 4.0, "original_size": 10.0, "cancelled": False})]
@@ -0,0 +1,22 @@
+from presign_cache import PresignCache
+from trade_executor import TradeExecutor
+
+class FakeClob:
+    def create_order(self, args):
+        return ("signed", args.token_id, args.price, args.size)
+
+def settle(cache):
+    for f in list(cache.pending.values()): f.result()
+
+def test_one_order_per_token_and_dropped_when_out_of_top_set():
+    cache = PresignCache(FakeClob(), workers=1)
+    executor = TradeExecutor.__new__(TradeExecutor)
+    executor.presign = cache
+    cache.refresh("A", 0.40, 10)
+    cache.refresh("B", 0.50, 10)
+    settle(cache)
+    assert set(cache.entries) == {("A", 0.4, 12), ("B", 0.5, 10)}
+
+    executor.retain_presigned(["B"])
+    assert set(cache.entries) == {("B", 0.5, 10)} and "A" not in cache.token_keys
+    assert cache.take("B", 0.5, 10) == ("signed", "B", 0.5, 10) and cache.hits == 1
@@ -0,0 +1,52 @@
+import os
+import config
+from risk_manager import RiskManager
+
+def limits(monkeypatch, trades=10, market=100, event=100):
+    monkeypatch.setattr(config, 'MAX_TOTAL_OPEN_TRADES', trades)
+    monkeypatch.setattr(config, 'MAX_EXPOSURE_PER_MARKET_USD', market)
+    monkeypatch.setattr(config, 'MAX_EVENT_EXPOSURE_USD', event)
+    monkeypatch.setattr(config, 'MAX_SESSION_DRAWDOWN_USD', 10.0)
+
+def test_reserve_commit_release(monkeypatch):
+    limits(monkeypatch, market=15)
+    rm = RiskManager(50.0, state_file="")
+    token, reason = rm.reserve("ev", "m1", 10)
+    assert token and reason == "OK"
+    # The reservation already counts against the market limit
+    assert rm.reserve("ev", "m1", 10) == (None, "Market exposure limit exceeded.")
+    assert rm.get_status()["reserved"] == 10
+    assert rm.commit(token)
+    assert rm.get_status()["reserved"] == 0 and rm.total_capital_locked == 10
+    other, _ = rm.reserve("ev", "m2", 5)
+    assert rm.release(other) and not rm.release(other)
+    assert rm.total_capital_locked == 10 and rm.total_trades == 1
+
+def test_stale_reservations_expire(monkeypatch):
+    limits(monkeypatch, trades=1)
+    monkeypatch.setattr(config, 'RISK_RESERVATION_TTL_SEC', 60)
+    rm = RiskManager(50.0, state_file="")
+    token, _ = rm.reserve("ev", "m1", 10)
+    rm.positions[token]["ts"] -= 120
+    rm.reservations[token] -= 120
+    token2, _ = rm.reserve("ev", "m2", 10)
+    assert token2 and not rm.commit(token)
+    assert rm.total_trades == 1
+
+def test_shared_state_and_halt(monkeypatch, tmp_path):
+    limits(monkeypatch)
+    path = str(tmp_path / "risk.json")
+    a, b = RiskManager(50.0, state_file=path), RiskManager(50.0, state_file=path)
+    token, _ = a.reserve("ev", "m1", 30)
+    assert b.reserve("ev", "m2", 30) == (None, "Insufficient capital ($60.00 > $50.00 bankroll).")
+    a.commit(token)
+
+    # Checks that change nothing leave the file alone
+    before = os.stat(path).st_mtime_ns
+    assert b.can_add_position("ev", "m2", 5) == (True, "OK")
+    assert os.stat(path).st_mtime_ns == before
+
+    a.update_pnl(-4.0, -7.0)
+    ok, reason = b.can_add_position("ev", "m2", 5)
+    assert not ok and reason.startswith("Strategy HALTED")
+    assert b.get_status()["realized_pnl"] == -4.0
@@ -0,0 +1,35 @@
+import os
+from tick_recorder import TickRecorder, iter_segment, iter_ticks, last_seq, segment_paths
+
+def book(bid, ask):
+    return {'bids': [{'price': str(bid), 'size': '10'}], 'asks': [{'price': str(ask), 'size': '4.5'}], 'timestamp': '1700'}
+
+def record(directory, batches):
+    rec = TickRecorder(directory=directory, segment_sec=1e9)
+    os.makedirs(directory, exist_ok=True)
+    for first, batch in batches:
+        rec._rotate(first)
+        rec._write_batch(batch)
+    rec.f.close()
+
+def test_segments_round_trip_and_resume(tmp_path):
+    d = str(tmp_path)
+    record(d, [(1, [(1, 10, 20, 'A', book(0.45, 0.47)), (2, 11, 21, 'B', book(0.5, 0.52))]),
+               (3, [(3, 12, 22, 'A', book(0.46, 0.47))])])
+    assert len(segment_paths(d)) == 2
+    events = list(iter_ticks(d))
+    assert [(e.seq, e.asset_id) for e in events] == [(1, 'A'), (2, 'B'), (3, 'A')]
+    e = events[0]
+    assert (e.wall_ns, e.recv_ns, e.exchange_ms) == (10, 20, 1700)
+    assert e.bids == [(450, 10.0)] and e.asks == [(470, 4.5)]
+    assert [e.seq for e in iter_ticks(d, start_seq=3)] == [3]
+    assert last_seq(d) == 3
+
+def test_torn_tail_ends_segment(tmp_path):
+    d = str(tmp_path)
+    record(d, [(1, [(1, 10, 20, 'A', book(0.45, 0.47)), (2, 11, 21, 'A', book(0.44, 0.47))])])
+    (path,) = segment_paths(d)
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 3)
+    assert [e.seq for e in iter_segment(path)] == [1]
+    assert last_seq(d) == 1
@@ -0,0 +1,77 @@
+import pytest
+import config
+from tick_recorder import TickEvent
+from tick_replay import ReplaySimulator
+
+MARKETS = {"m": {"yes": "Y", "no": "N", "question": "Q?"}}
+
+class Feed:
+    def __init__(self, sim):
+        self.sim, self.seq = sim, 0
+
+    def __call__(self, t, asset, bids, asks):
+        self.seq += 1
+        self.sim.on_event(TickEvent(self.seq, int(t * 1e9), 0, 0, asset, bids, asks))
+
+@pytest.fixture
+def sim(monkeypatch):
+    monkeypatch.setattr(config, 'HEDGE_TIMEOUT_SEC', 10)
+    monkeypatch.setattr(config, 'MAKER_ORDER_STALE_SEC', 1000)
+    monkeypatch.setattr(config, 'MAKER_MIN_PROFIT_PCT', 1.0)
+    monkeypatch.setattr(config, 'MAKER_MAX_QUEUE_DEPTH_USD', 500)
+    monkeypatch.setattr(config, 'MIN_LIQUIDITY_USD', 0)
+    return ReplaySimulator(MARKETS, size_usd=10, fill_stream=False)
+
+def open_pair(feed):
+    feed(0, "Y", [(450, 100)], [(500, 100)])
+    feed(0, "N", [(500, 100)], [(550, 100)])
+    pair = feed.sim.open["m"]
+    assert (pair.yes.shares, pair.no.shares) == (11, 10)
+    assert pair.yes.ahead == 100
+    return pair
+
+def test_proportional_queue(sim):
+    feed = Feed(sim)
+    pair = open_pair(feed)
+    feed(1, "Y", [(450, 60)], [(500, 100)])
+    assert pair.yes.ahead == pytest.approx(60)
+    # Size joining behind us doesn't move us; later depletion is shared pro rata
+    feed(2, "Y", [(450, 160)], [(500, 100)])
+    feed(3, "Y", [(450, 80)], [(500, 100)])
+    assert pair.yes.ahead == pytest.approx(30) and pair.yes.filled == 0
+    # Ask crossing our price fills the whole leg
+    feed(4, "Y", [(440, 80)], [(450, 5)])
+    assert pair.yes.done()
+
+def test_conservative_queue_only_moves_below_level(monkeypatch):
+    monkeypatch.setattr(config, 'MAKER_MIN_PROFIT_PCT', 1.0)
+    monkeypatch.setattr(config, 'MIN_LIQUIDITY_USD', 0)
+    sim = ReplaySimulator(MARKETS, size_usd=10, queue_model="conservative", fill_stream=False)
+    feed = Feed(sim)
+    pair = open_pair(feed)
+    feed(1, "Y", [(450, 160)], [(500, 100)])
+    feed(2, "Y", [(450, 120)], [(500, 100)])
+    assert pair.yes.ahead == 100
+    feed(3, "Y", [(450, 40)], [(500, 100)])
+    assert pair.yes.ahead == 40 and pair.yes.filled == 0
+
+def test_both_legs_partial_squares_up_at_timeout(sim):
+    feed = Feed(sim)
+    pair = open_pair(feed)
+    # Our level empties under a better bid (nothing ahead), then 4 YES / 2 NO trade against us
+    feed(1, "Y", [(460, 50)], [(500, 100)])
+    feed(1, "N", [(510, 50)], [(550, 100)])
+    feed(2, "Y", [(460, 50), (450, 10)], [(500, 100)])
+    feed(2, "N", [(510, 50), (500, 10)], [(550, 100)])
+    feed(3, "Y", [(460, 50), (450, 6)], [(500, 100)])
+    feed(3, "N", [(510, 50), (500, 8)], [(550, 100)])
+    assert (pair.yes.filled, pair.no.filled) == (4, 2)
+    assert not sim.results
+
+    feed(12, "N", [(510, 50), (500, 8)], [(550, 100)])
+    (r,) = sim.results
+    assert r["outcome"] == "chased"
+    cost = 4 * 0.45 + 2 * 0.50 + 2 * 0.55 * (1 + config.FEE_PCT / 100)
+    assert r["pnl"] == pytest.approx(4 - cost)
+    assert r["chase_slippage"] == pytest.approx(0.05)
+    assert "m" not in sim.open
@@ -0,0 +1,222 @@
+import os
+import glob
+import time
+import queue
+import struct
+import itertools
+import threading
+import config
+from book_model import parse_poly_price, to_ticks
+from latency_tracer import now_ns
+
+MAGIC = b"PMTICK01"
+SEGMENT_HEADER = struct.Struct("<8sQ")    # magic, first seq in segment
+RECORD_HEADER = struct.Struct("<BI")      # record type, payload length
+BOOK_HEADER = struct.Struct("<QqqqIHH")   # seq, wall ns, recv ns (monotonic), exchange ms, asset idx, n_bids, n_asks
+ASSET_HEADER = struct.Struct("<I")        # asset idx (followed by the utf-8 asset id)
+REC_ASSET = 1
+REC_BOOK = 2
+
+_level_formats = {}
+
+def _levels_format(n):
+    fmt = _level_formats.get(n)
+    if fmt is None: fmt = _level_formats[n] = struct.Struct(f"<{n}H{n}d")
+    return fmt
+
+def _poly_side(orders):
+    """WS book side -> ([ticks], [sizes]) in feed order (unparseable levels skipped)."""
+    ticks, sizes = [], []
+    for o in orders or []:
+        p = parse_poly_price(o.get('price'))
+        if p is None: continue
+        ticks.append(to_ticks(p))
+        sizes.append(float(o.get('size', 0) or 0))
+    return ticks, sizes
+
+class TickEvent:
+    """One recorded book event. bids/asks: [(tick, size)] in feed order."""
+    __slots__ = ('seq', 'wall_ns', 'recv_ns', 'exchange_ms', 'asset_id', 'bids', 'asks')
+
+    def __init__(self, seq, wall_ns, recv_ns, exchange_ms, asset_id, bids, asks):
+        self.seq = seq
+        self.wall_ns = wall_ns
+        self.recv_ns = recv_ns
+        self.exchange_ms = exchange_ms
+        self.asset_id = asset_id
+        self.bids = bids
+        self.asks = asks
+
+class TickRecorder:
+    """
+    Records every PolyWebSocket book event to rotating, append-only segment files.
+
+    The listener runs on the WS thread and only stamps a sequence number and
+    enqueues the book (bounded queue: when the writer falls behind, events are
+    dropped and counted, never block the feed; the skipped seq numbers show the
+    gap on replay). A background writer drains the queue in batches, encodes
+    them and issues one write + flush per batch.
+
+    Segment: header (magic, first seq) then records [u8 type][u32 len][payload].
+    Asset ids are interned per segment (REC_ASSET), so every segment decodes on
+    its own; book levels are stored as uint16 ticks + float64 sizes.
+    """
+    def __init__(self, directory=None, segment_mb=None, segment_sec=None, queue_max=None, batch_max=2000):
+        self.directory = directory or getattr(config, 'TICK_RECORD_DIR', 'ticks')
+        self.segment_bytes = int((segment_mb or getattr(config, 'TICK_SEGMENT_MB', 64)) * 1024 * 1024)
+        self.segment_sec = segment_sec or getattr(config, 'TICK_SEGMENT_SEC', 3600)
+        self.queue = queue.Queue(maxsize=queue_max or getattr(config, 'TICK_QUEUE_MAX', 50000))
+        self.batch_max = batch_max
+        self.seq = None
+        self.f = None
+        self.segment_path = None
+        self.segment_opened = 0
+        self.segment_size = 0
+        self.assets = {}  # {asset_id: idx} for the open segment
+        self.running = False
+        self.thread = None
+        self.stats = {"recorded": 0, "dropped": 0, "batches": 0, "bytes": 0, "segments": 0,
+                      "queue_hwm": 0, "max_batch": 0, "max_write_ms": 0.0}
+
+    def attach(self, ws):
+        """Start the writer and record every book update of this PolyWebSocket."""
+        self.start()
+        ws.add_listener(self.on_book)
+
+    def on_book(self, asset_id, book):
+        item = (next(self.seq), time.time_ns(), now_ns(), asset_id, book)
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self.stats["dropped"] += 1
+
+    def start(self):
+        if self.running: return
+        os.makedirs(self.directory, exist_ok=True)
+        self.seq = itertools.count(last_seq(self.directory) + 1)
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Drain the queue, then close the open segment."""
+        self.running = False
+        if self.thread: self.thread.join()
+        if self.f:
+            self.f.close()
+            self.f = None
+
+    def _run(self):
+        while self.running or not self.queue.empty():
+            try:
+                batch = [self.queue.get(timeout=0.2)]
+            except queue.Empty:
+                continue
+            depth = self.queue.qsize() + 1
+            while len(batch) < self.batch_max:
+                try: batch.append(self.queue.get_nowait())
+                except queue.Empty: break
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                print(f"⚠️ Tick recorder write error: {e}")
+            self.stats["queue_hwm"] = max(self.stats["queue_hwm"], depth)
+
+    def _write_batch(self, batch):
+        t0 = time.perf_counter()
+        if self.f is None or self.segment_size >= self.segment_bytes or time.time() - self.segment_opened >= self.segment_sec:
+            self._rotate(batch[0][0])
+        buf = bytearray()
+        for seq, wall_ns, recv_ns, asset_id, book in batch:
+            idx = self.assets.get(asset_id)
+            if idx is None:
+                idx = self.assets[asset_id] = len(self.assets)
+                raw_id = asset_id.encode()
+                buf += RECORD_HEADER.pack(REC_ASSET, ASSET_HEADER.size + len(raw_id))
+                buf += ASSET_HEADER.pack(idx) + raw_id
+            bid_ticks, bid_sizes = _poly_side(book.get('bids'))
+            ask_ticks, ask_sizes = _poly_side(book.get('asks'))
+            try: exchange_ms = int(book.get('timestamp') or 0)
+            except (TypeError, ValueError): exchange_ms = 0
+            nb, na = len(bid_ticks), len(ask_ticks)
+            levels = _levels_format(nb + na)
+            buf += RECORD_HEADER.pack(REC_BOOK, BOOK_HEADER.size + levels.size)
+            buf += BOOK_HEADER.pack(seq, wall_ns, recv_ns, exchange_ms, idx, nb, na)
+            buf += levels.pack(*bid_ticks, *ask_ticks, *bid_sizes, *ask_sizes)
+        self.f.write(buf)
+        self.f.flush()
+        self.segment_size += len(buf)
+        s = self.stats
+        s["recorded"] += len(batch)
+        s["batches"] += 1
+        s["bytes"] += len(buf)
+        s["max_batch"] = max(s["max_batch"], len(batch))
+        s["max_write_ms"] = max(s["max_write_ms"], (time.perf_counter() - t0) * 1000)
+
+    def _rotate(self, first_seq):
+        if self.f:
+            os.fsync(self.f.fileno())
+            self.f.close()
+        self.segment_path = os.path.join(self.directory, f"ticks-{first_seq:012d}.pmt")
+        self.f = open(self.segment_path, 'ab')
+        self.f.write(SEGMENT_HEADER.pack(MAGIC, first_seq))
+        self.segment_opened = time.time()
+        self.segment_size = SEGMENT_HEADER.size
+        self.assets = {}
+        self.stats["segments"] += 1
+
+    def get_status(self):
+        s = dict(self.stats)
+        s["queued"] = self.queue.qsize()
+        s["segment"] = self.segment_path
+        return s
+
+def segment_paths(directory):
+    """Segments in sequence order (the zero-padded first seq sorts lexically)."""
+    return sorted(glob.glob(os.path.join(directory, "ticks-*.pmt")))
+
+def iter_segment(path):
+    """Yield TickEvents from one segment. A torn record at the tail (crash mid-write) ends the segment."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < SEGMENT_HEADER.size: return
+    magic, _ = SEGMENT_HEADER.unpack_from(data, 0)
+    if magic != MAGIC: raise ValueError(f"{path} is not a tick segment")
+    assets = []
+    pos, end = SEGMENT_HEADER.size, len(data)
+    while pos + RECORD_HEADER.size <= end:
+        rtype, length = RECORD_HEADER.unpack_from(data, pos)
+        body = pos + RECORD_HEADER.size
+        if body + length > end: break
+        if rtype == REC_BOOK:
+            seq, wall_ns, recv_ns, exchange_ms, idx, nb, na = BOOK_HEADER.unpack_from(data, body)
+            vals = _levels_format(nb + na).unpack_from(data, body + BOOK_HEADER.size)
+            n = nb + na
+            yield TickEvent(seq, wall_ns, recv_ns, exchange_ms, assets[idx],
+                            list(zip(vals[:nb], vals[n:n + nb])), list(zip(vals[nb:n], vals[n + nb:])))
+        elif rtype == REC_ASSET:
+            (idx,) = ASSET_HEADER.unpack_from(data, body)
+            assets.append(data[body + ASSET_HEADER.size:body + length].decode())
+        pos = body + length
+
+def iter_ticks(directory, start_seq=0):
+    """All recorded events from start_seq on, across segments, in sequence order."""
+    paths = segment_paths(directory)
+    firsts = [int(os.path.basename(p)[6:-4]) for p in paths]
+    for i, path in enumerate(paths):
+        if i + 1 < len(paths) and firsts[i + 1] <= start_seq: continue
+        for ev in iter_segment(path):
+            if ev.seq >= start_seq: yield ev
+
+def last_seq(directory):
+    """Highest seq already on disk (0 if none), so a restarted recorder keeps numbering."""
+    paths = segment_paths(directory)
+    for path in reversed(paths):
+        seq = None
+        for ev in iter_segment(path):
+            seq = ev.seq
+        if seq is not None: return seq
+    return 0
+
+# Singleton instance for shared usage
+tick_recorder = TickRecorder()
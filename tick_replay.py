@@ -0,0 +1,318 @@
+import json
+import time
+import argparse
+from datetime import datetime
+import config
+from book_model import TICKS_PER_DOLLAR, to_ticks, parse_poly_price
+from maker_strategy import maker_signal
+from tick_recorder import TickEvent, iter_ticks
+from columnar_archive import ArchiveReader, is_columnar, read_snapshots
+
+EPS = 1e-9
+
+class SimLeg:
+    """One simulated resting maker bid and its estimated place in the queue."""
+    __slots__ = ('token', 'tick', 'shares', 'ahead', 'level', 'filled', 'filled_at')
+
+    def __init__(self, token, tick, shares, level):
+        self.token = token
+        self.tick = tick
+        self.shares = shares
+        self.ahead = level   # Shares resting before us at our price (we join the back)
+        self.level = level   # Level size (excluding us) at the last book event
+        self.filled = 0.0
+        self.filled_at = None
+
+    def remaining(self):
+        return self.shares - self.filled
+
+    def done(self):
+        return self.filled >= self.shares - EPS
+
+class SimPair:
+    __slots__ = ('market_id', 'opened', 'yes', 'no', 'first_fill_at', 'profit_pct')
+
+    def __init__(self, market_id, opened, yes, no, profit_pct):
+        self.market_id = market_id
+        self.opened = opened
+        self.yes = yes
+        self.no = no
+        self.first_fill_at = None
+        self.profit_pct = profit_pct
+
+def _best_bid(bids):
+    return max(bids) if bids else (0, 0.0)
+
+def _best_ask_tick(asks):
+    return min(asks)[0] if asks else None
+
+def _level_size(levels, tick):
+    return sum(s for t, s in levels if t == tick)
+
+class ReplaySimulator:
+    """
+    Event-driven replay of the maker (split) strategy over recorded book events.
+
+    Events are streamed in sequence (= receive time) order. After each event the
+    market's two books are run through maker_signal(), the same entry function the
+    live scanner uses; a hit places both bids at the touch, behind the size already
+    resting there.
+
+    Queue model, per resting leg, from the depletion of its price level:
+      'proportional' - a level decrease is split between the shares ahead of and
+                       behind us by their share of the level; once nothing is ahead,
+                       further depletion is taken as trades filling us.
+      'conservative' - we only move up when the level shrinks below our place, and
+                       fill only when the price trades through us.
+    Either way the leg fills completely when the ask crosses our price or the level
+    is consumed and the best bid drops below it.
+
+    Hanging pairs follow the executor's rules: after HEDGE_TIMEOUT_SEC (or
+    HEDGE_FILL_GRACE_SEC after the first fill, with fill_stream=True) the missing
+    leg is chased at the ask ladder up to MAX_CHASE_PRICE; untouched pairs rotate
+    after MAKER_ORDER_STALE_SEC. A pair with partial fills and neither leg done is
+    squared up instead: both bids cancelled and the lagging leg bought up to the
+    shares the other leg got.
+    """
+    def __init__(self, markets, size_usd=None, queue_model="proportional", fill_stream=True, cooldown_sec=None):
+        self.markets = markets  # {market_id: {'yes': token, 'no': token, 'question': str}}
+        self.leg_of = {}        # {token: (market_id, 'yes' | 'no')}
+        for mid, m in markets.items():
+            self.leg_of[m['yes']] = (mid, 'yes')
+            self.leg_of[m['no']] = (mid, 'no')
+        self.size_usd = size_usd or getattr(config, 'MAKER_TRADE_SIZE_USD', config.TARGET_TRADE_SIZE_USD)
+        self.queue_model = queue_model
+        self.fill_stream = fill_stream
+        self.timeout = getattr(config, 'HEDGE_TIMEOUT_SEC', 300)
+        self.grace = getattr(config, 'HEDGE_FILL_GRACE_SEC', 0)
+        self.stale = getattr(config, 'MAKER_ORDER_STALE_SEC', 1200)
+        self.chase_cap = to_ticks(getattr(config, 'MAX_CHASE_PRICE', 0.99))
+        self.taker_fee = config.FEE_PCT / 100
+        self.cooldown = cooldown_sec if cooldown_sec is not None else getattr(config, 'REQUOTE_MIN_INTERVAL_SEC', 5)
+        self.books = {}         # {token: (bids, asks)} as [(tick, size)]
+        self.open = {}          # {market_id: SimPair}
+        self.resting = {}       # {token: SimLeg}
+        self.closed_at = {}     # {market_id: time the last pair closed}
+        self.now = 0.0
+        self.last_sweep = 0.0
+        self.results = []       # One dict per closed pair
+        self.stats = {"events": 0, "gaps": 0, "signals": 0, "placed": 0}
+        self.last_seq = None
+
+    def run(self, events):
+        t0 = time.perf_counter()
+        for ev in events:
+            self.on_event(ev)
+        self.finish()
+        self.stats["wall_sec"] = time.perf_counter() - t0
+        return self.summary()
+
+    def on_event(self, ev):
+        self.stats["events"] += 1
+        if self.last_seq is not None and ev.seq > self.last_seq + 1: self.stats["gaps"] += 1
+        self.last_seq = ev.seq
+        self.now = ev.wall_ns / 1e9
+        self.books[ev.asset_id] = (ev.bids, ev.asks)
+
+        leg = self.resting.get(ev.asset_id)
+        if leg is not None: self._update_leg(leg, ev.bids, ev.asks)
+
+        if self.now - self.last_sweep >= 1.0:
+            self._sweep()
+            self.last_sweep = self.now
+
+        info = self.leg_of.get(ev.asset_id)
+        if info is None: return
+        market_id = info[0]
+        if market_id in self.open:
+            self._check_pair(self.open[market_id])
+        elif self.now - self.closed_at.get(market_id, -1e18) >= self.cooldown:
+            self._evaluate(market_id)
+
+    def _evaluate(self, market_id):
+        m = self.markets[market_id]
+        yb, nb = self.books.get(m['yes']), self.books.get(m['no'])
+        if yb is None or nb is None: return
+        y_tick, y_size = _best_bid(yb[0])
+        n_tick, n_size = _best_bid(nb[0])
+        y_bid, n_bid = y_tick / TICKS_PER_DOLLAR, n_tick / TICKS_PER_DOLLAR
+        status, profit_pct = maker_signal(y_bid, y_size * y_bid, n_bid, n_size * n_bid)
+        if status != "trade": return
+        self.stats["signals"] += 1
+        shares_yes = int((self.size_usd / 2) / y_bid) if y_bid > 0 else 0
+        shares_no = int((self.size_usd / 2) / n_bid) if n_bid > 0 else 0
+        if shares_yes <= 0 or shares_no <= 0: return
+        pair = SimPair(market_id, self.now, SimLeg(m['yes'], y_tick, shares_yes, y_size),
+                       SimLeg(m['no'], n_tick, shares_no, n_size), profit_pct)
+        self.open[market_id] = pair
+        self.resting[m['yes']] = pair.yes
+        self.resting[m['no']] = pair.no
+        self.stats["placed"] += 1
+
+    def _update_leg(self, leg, bids, asks):
+        if leg.done(): return
+        best_ask = _best_ask_tick(asks)
+        level = _level_size(bids, leg.tick)
+        if (best_ask is not None and best_ask <= leg.tick) or (level <= EPS and _best_bid(bids)[0] < leg.tick):
+            self._fill(leg, leg.remaining())  # Traded through our price
+            leg.level = level
+            return
+        dec = leg.level - level
+        if dec > EPS:
+            if self.queue_model == "conservative":
+                leg.ahead = min(leg.ahead, level)
+            elif leg.ahead > EPS:
+                leg.ahead = max(0.0, leg.ahead - dec * leg.ahead / leg.level)
+            else:
+                self._fill(leg, min(dec, leg.remaining()))
+        leg.level = level
+
+    def _fill(self, leg, qty):
+        if qty <= EPS: return
+        leg.filled += qty
+        if leg.filled_at is None: leg.filled_at = self.now
+        market_id, _ = self.leg_of[leg.token]
+        pair = self.open.get(market_id)
+        if pair and pair.first_fill_at is None: pair.first_fill_at = self.now
+
+    def _sweep(self):
+        """Timers fire even when a market goes quiet."""
+        for pair in list(self.open.values()):
+            self._check_pair(pair)
+
+    def _check_pair(self, pair):
+        yes, no = pair.yes, pair.no
+        if yes.done() and no.done():
+            return self._close(pair, "filled")
+        age = self.now - pair.opened
+        hang_age = self.now - pair.first_fill_at if (self.fill_stream and pair.first_fill_at is not None) else None
+        if age > self.timeout or (hang_age is not None and hang_age >= self.grace):
+            if yes.done() != no.done():
+                leg = no if yes.done() else yes
+                return self._chase(pair, leg, leg.remaining())
+            # Neither done but something filled: cancel both and buy the lagging leg up to the other's fills
+            lag, lead = (yes, no) if yes.filled < no.filled else (no, yes)
+            if lead.filled > EPS:
+                if lead.filled - lag.filled <= EPS: return self._close(pair, "filled")
+                return self._chase(pair, lag, lead.filled - lag.filled)
+        if age > self.stale and yes.filled <= EPS and no.filled <= EPS:
+            return self._close(pair, "rotated")
+
+    def _chase(self, pair, leg, want):
+        """Cancel the hanging bids and buy `want` shares of the lagging leg up the ask ladder (capped)."""
+        asks = sorted(self.books.get(leg.token, ((), ()))[1])
+        got = cost = 0.0
+        for tick, size in asks:
+            if tick > self.chase_cap or got >= want - EPS: break
+            take = min(size, want - got)
+            got += take
+            cost += take * tick / TICKS_PER_DOLLAR
+        self._close(pair, "chased" if got >= want - EPS else "unhedged", chase=(leg, got, cost))
+
+    def _close(self, pair, outcome, chase=(None, 0.0, 0.0)):
+        yes, no = pair.yes, pair.no
+        chased, chase_shares, chase_cost = chase
+        fee = chase_cost * self.taker_fee
+        held = {'yes': yes.filled, 'no': no.filled}
+        cost = yes.filled * yes.tick / TICKS_PER_DOLLAR + no.filled * no.tick / TICKS_PER_DOLLAR + chase_cost + fee
+        if chase_shares:
+            held['yes' if chased is yes else 'no'] += chase_shares
+        sets = min(held['yes'], held['no'])
+        # Leftover one-sided shares are marked at their best bid
+        m = self.markets[pair.market_id]
+        mark = sum((held[leg] - sets) * _best_bid(self.books.get(m[leg], ((), ()))[0])[0] / TICKS_PER_DOLLAR
+                   for leg in ('yes', 'no'))
+        fills = [l.filled_at for l in (yes, no) if l.filled_at is not None]
+        self.results.append({
+            "market_id": pair.market_id, "outcome": outcome, "opened": pair.opened, "closed": self.now,
+            "signal_profit_pct": pair.profit_pct, "pnl": sets + mark - cost, "capital": cost,
+            "first_fill_sec": min(fills) - pair.opened if fills else None,
+            "chase_slippage": (chase_cost / chase_shares - chased.tick / TICKS_PER_DOLLAR) if chase_shares else 0.0,
+        })
+        del self.open[pair.market_id]
+        self.resting.pop(yes.token, None)
+        self.resting.pop(no.token, None)
+        self.closed_at[pair.market_id] = self.now
+
+    def finish(self):
+        """Mark still-open pairs to market at the end of the data."""
+        for pair in list(self.open.values()):
+            self._close(pair, "open")
+
+    def summary(self):
+        out = {k: 0 for k in ("filled", "chased", "unhedged", "rotated", "open")}
+        for r in self.results: out[r["outcome"]] += 1
+        pnl = sum(r["pnl"] for r in self.results)
+        waits = sorted(r["first_fill_sec"] for r in self.results if r["first_fill_sec"] is not None)
+        chases = [r["chase_slippage"] for r in self.results if r["outcome"] == "chased"]
+        out.update(self.stats)
+        out.update({
+            "pairs": len(self.results), "pnl": pnl,
+            "pnl_per_pair": pnl / len(self.results) if self.results else 0.0,
+            "median_first_fill_sec": waits[len(waits) // 2] if waits else None,
+            "avg_chase_slippage": sum(chases) / len(chases) if chases else 0.0,
+            "events_per_sec": self.stats["events"] / self.stats["wall_sec"] if self.stats.get("wall_sec") else 0.0,
+        })
+        return out
+
+    def report(self):
+        s = self.summary()
+        print("\n" + "=" * 50)
+        print(f"   🎞️ TICK REPLAY: MAKER ({self.queue_model} queue)   ")
+        print("=" * 50)
+        print(f"Events: {s['events']} ({s['gaps']} seq gaps) in {s.get('wall_sec', 0):.1f}s ({s['events_per_sec']:,.0f}/s)")
+        print(f"Signals: {s['signals']} | Pairs placed: {s['placed']}")
+        print(f"Both filled: {s['filled']} | Chased: {s['chased']} | Unhedged: {s['unhedged']} | "
+              f"Rotated: {s['rotated']} | Still open: {s['open']}")
+        if s['median_first_fill_sec'] is not None:
+            print(f"Median time to first fill: {s['median_first_fill_sec']:.1f}s")
+        print(f"Avg chase slippage: {s['avg_chase_slippage'] * 100:.2f}c/share")
+        print(f"PnL: ${s['pnl']:.2f} (${s['pnl_per_pair']:.3f} per pair)")
+        print("=" * 50)
+
+def _levels(orders):
+    levels = []
+    for o in orders or []:
+        p = parse_poly_price(o.get('price'))
+        if p is not None: levels.append((to_ticks(p), float(o.get('size', 0) or 0)))
+    return levels
+
+def market_map(path):
+    """{market_id: {'yes', 'no', 'question'}} for the binary markets of a snapshot archive."""
+    markets = {}
+    if is_columnar(path):
+        reader = ArchiveReader(path)
+        rows = reader.markets
+        reader.close()
+    else:
+        rows = [row['market'] for snap in read_snapshots(path) for row in snap.get('poly_markets', [])]
+    for m in rows:
+        tids = m.get('clobTokenIds')
+        if isinstance(tids, str): tids = json.loads(tids)
+        if tids and len(tids) == 2:
+            markets[m.get('id') or m.get('conditionId')] = {'yes': tids[0], 'no': tids[1], 'question': m.get('question', '')}
+    return markets
+
+def events_from_archive(path):
+    """Snapshot archive -> TickEvents (one per token per snapshot), for replaying the coarse archives too."""
+    seq = 0
+    for snap in read_snapshots(path):
+        wall_ns = int(datetime.fromisoformat(snap['timestamp']).timestamp() * 1e9)
+        for row in snap.get('poly_markets', []):
+            for asset_id, book in ((row.get('orderbook') or {}).get('tokens') or {}).items():
+                seq += 1
+                yield TickEvent(seq, wall_ns, 0, 0, asset_id, _levels(book.get('bids')), _levels(book.get('asks')))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Event-driven maker replay over recorded ticks")
+    parser.add_argument("--markets", required=True, help="Snapshot archive (columnar or JSONL) with the market metadata")
+    parser.add_argument("--ticks", help="Tick segment directory (default: replay the snapshot archive itself)")
+    parser.add_argument("--queue", choices=("proportional", "conservative"), default="proportional")
+    parser.add_argument("--size", type=float, default=None, help="USD per pair (default MAKER_TRADE_SIZE_USD)")
+    parser.add_argument("--no-stream", action="store_true", help="Hedge on HEDGE_TIMEOUT_SEC only (no fill events)")
+    args = parser.parse_args()
+
+    sim = ReplaySimulator(market_map(args.markets), size_usd=args.size, queue_model=args.queue,
+                          fill_stream=not args.no_stream)
+    sim.run(iter_ticks(args.ticks) if args.ticks else events_from_archive(args.markets))
+    sim.report()
@@ -1,13 +1,23 @@
 import logging
 import os
+import time
+import threading
+import concurrent.futures
 import config
 from datetime import datetime
 from dotenv import load_dotenv
 from eth_account import Account
 from py_clob_client.client import ClobClient, ApiCreds
 from py_clob_client.constants import POLYGON
-from py_clob_client.clob_types import OrderArgs, OrderType
+from py_clob_client.clob_types import OrderArgs, OrderType, PostOrdersArgs
 from risk_manager import risk_manager
+from event_graph import event_key_for
+from presign_cache import PresignCache
+from book_model import from_poly_book
+from ws_client import PolyUserWebSocket, poly_ws
+from order_journal import OrderJournal, pair_to_record, pair_from_record
+from latency_tracer import tracer
+from pnl_engine import pnl_ledger
 
 # Setup specific logger for trades
 logger = logging.getLogger('executor')
@@ -19,13 +29,34 @@ logger.setLevel(logging.INFO)
 
 load_dotenv()
 
+def signed_terms(signed):
+    """(token_id, side, price, size) of a signed CLOB order, as the open-orders endpoint reports them."""
+    o = signed.order
+    maker, taker = int(o['makerAmount']), int(o['takerAmount'])
+    if int(o['side']) == 0:  # BUY: pays USDC (maker amount) for shares (taker amount)
+        return str(o['tokenId']), "BUY", maker / taker if taker else 0.0, taker / 1e6
+    return str(o['tokenId']), "SELL", taker / maker if maker else 0.0, maker / 1e6
+
 class TradeExecutor:
     def __init__(self, poly_client=None):
         self.poly = poly_client  # Standard HTTP/Gamma Client
         self.clob = None         # Authenticated L2 Client
         self.active_orders = {}  # Format: {order_id: {"market": m, "side": s, ...}}
         self.hedge_pairs = []    # Format: [{"yes_id": id1, "no_id": id2, "market": m, "time": t, "size": s}]
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=4)  # Parallel leg submission
+        self.presign = None      # Pre-signed order cache (created once the CLOB client is up)
+        self.submit_stats = {"pairs": 0, "gap_ms_total": 0.0, "gap_ms_max": 0.0, "rtt_ms_total": 0.0}
+        self.hedge_lock = threading.RLock()  # hedge_pairs is touched by the poller AND the fill stream
+        self.pair_by_order = {}  # {order_id: hedge pair}
+        self.order_fills = {}    # {order_id: latest fill state pushed by the user channel}
+        self.closed_orders = {}  # {order_id: final status of orders no longer open}
+        self.order_meta = {}     # {order_id: (token_id, price, size)} for every BUY we own (PnL ledger)
+        self.filled_qty = {}     # {order_id: shares already booked into the PnL ledger}
+        self.chase_orders = {}   # {hanging leg order_id: signed chase order} (re-sent as-is until it lands)
+        self.fill_stream = None  # Authenticated user WebSocket (live trading only)
+        self.journal = OrderJournal() if getattr(config, 'JOURNAL_ENABLED', True) and getattr(config, 'LIVE_TRADING', False) else None
         self._init_clob()
+        if self.journal: self.recover()
 
     def _init_clob(self):
         """Initialize the Authenticated CLOB Client using L2 Keys."""
@@ -58,6 +89,10 @@ class TradeExecutor:
             }
             
             self.clob = ClobClient(**client_args)
+            self.presign = PresignCache(self.clob)
+            if getattr(config, 'LIVE_TRADING', False) and getattr(config, 'USER_WS_ENABLED', True):
+                self.fill_stream = PolyUserWebSocket(api_key, secret, passphrase, on_order=self.on_order_update)
+                self.fill_stream.start()
             logger.info("✅ TradeExecutor: CLOB Client Authenticated Successfully.")
             
         except Exception as e:
@@ -93,17 +128,8 @@ class TradeExecutor:
             print(f"[{timestamp}] 🛑 ACTUAL TRADING DISABLED (Config.LIVE_TRADING = False)\n")
             return
 
-        # RISK MANAGER GATE: Check if we have capital and are within limits
         market_id = market.get('id') or market.get('conditionId')
-        event_id = market.get('event_slug') or market.get('slug') or 'unknown'
-        
-        can_trade, reason = risk_manager.can_add_position(event_id, market_id, size_usd)
-        if not can_trade:
-            # Enhanced logging for the user
-            current_m_exp = risk_manager.market_exposure.get(market_id, 0)
-            print(f"[{timestamp}] 🛡️ RISK GATE: Trade blocked - {reason} "
-                  f"(Market Exposure: ${current_m_exp:.2f}, New Size: ${size_usd:.2f}, Limit: ${config.MAX_EXPOSURE_PER_MARKET_USD:.2f})")
-            return
+        event_id = event_key_for(market)
 
         # MARKET DE-DUPLICATION: Don't open a second hedge on the same market
         if any(p['market_id'] == market_id for p in self.hedge_pairs):
@@ -115,6 +141,17 @@ class TradeExecutor:
             print(f"[{timestamp}] ❌ Error: CLOB Client not initialized.")
             return
 
+        # RISK MANAGER GATE: Atomically check limits AND reserve the capital
+        reservation, reason = risk_manager.reserve(event_id, market_id, size_usd)
+        tracer.mark('risk_gate')
+        if not reservation:
+            # Enhanced logging for the user
+            current_m_exp = risk_manager.market_exposure.get(market_id, 0)
+            print(f"[{timestamp}] 🛡️ RISK GATE: Trade blocked - {reason} "
+                  f"(Market Exposure: ${current_m_exp:.2f}, New Size: ${size_usd:.2f}, Limit: ${config.MAX_EXPOSURE_PER_MARKET_USD:.2f})")
+            return
+
+        committed = False
         try:
             # Fast Token Parsing
             import json
@@ -126,47 +163,51 @@ class TradeExecutor:
 
             yes_token, no_token = tids[0], tids[1]
 
-            # Immediate Order Placement (Prioritize Speed)
-            order_yes = OrderArgs(price=float(f"{y_bid:.3f}"), size=int(shares_yes), side="BUY", token_id=yes_token)
-            # Immediate Order Placement (Prioritize Speed)
-            # STEP 1: Create and Sign locally
-            signed_yes = self.clob.create_order(order_yes)
-            # STEP 2: Post to exchange
-            resp_a = self.clob.post_order(signed_yes, OrderType.GTC)
-            
-            if not resp_a.get('success'):
-                err = resp_a.get('errorMsg') or resp_a.get('error')
-                logger.error(f"[{timestamp}] ❌ Order A Fail: {err}")
-                return
+            # Journal the intent first: a crash between post and ack leaves a trace to reconcile
+            self._journal('intent', market_id, {"yes_token": yes_token, "no_token": no_token})
 
-            order_id_a = resp_a.get('orderID')
-            order_no = OrderArgs(price=float(f"{n_bid:.3f}"), size=int(shares_no), side="BUY", token_id=no_token)
-            
-            # STEP 1: Create and Sign locally
-            signed_no = self.clob.create_order(order_no)
-            # STEP 2: Post to exchange
-            resp_b = self.clob.post_order(signed_no, OrderType.GTC)
+            # STEP 1: Take (or create) signed orders for BOTH legs before anything hits the network
+            signed_yes = self._get_signed(yes_token, y_bid, shares_yes)
+            signed_no = self._get_signed(no_token, n_bid, shares_no)
+            tracer.mark('signed')
+
+            # STEP 2: Submit both legs together (batch endpoint or parallel posts)
+            resp_a, resp_b, gap_ms, rtt_ms = self._submit_pair(signed_yes, signed_no)
+            order_id_a, order_id_b = resp_a.get('orderID'), resp_b.get('orderID')
+            # A leg without an id can't be tracked (e.g. a duplicate that already left the book)
+            ok_a, ok_b = bool(resp_a.get('success') and order_id_a), bool(resp_b.get('success') and order_id_b)
 
             # LOGGING (Done AFTER orders are sent to reduce latency)
             print(f"\n[{timestamp}] 🚀 [LIVE EXECUTION] {market.get('question')[:50]}...")
-            print(f"[{timestamp}] ✅ YES Submitted: {order_id_a}")
-            
-            if not resp_b.get('success'):
-                err_b = resp_b.get('errorMsg') or resp_b.get('error')
-                print(f"[{timestamp}] ❌ NO Failed: {err_b}. 🔄 INITIATING ROLLBACK...")
-                try:
-                    self.clob.cancel(order_id_a)
-                    print(f"[{timestamp}] 🛡️ ROLLBACK SUCCESSFUL.")
-                except Exception: print(f"[{timestamp}] 🚨 ROLLBACK FAILED!")
+            print(f"[{timestamp}] ⏱️ Legs posted {gap_ms:.1f}ms apart (submit RTT {rtt_ms:.0f}ms)")
+            if ok_a: print(f"[{timestamp}] ✅ YES Submitted: {order_id_a}")
+            if ok_b: print(f"[{timestamp}] ✅ NO Submitted: {order_id_b}")
+
+            if not ok_a or not ok_b:
+                err_a = resp_a.get('errorMsg') or resp_a.get('error') or 'no order id'
+                err_b = resp_b.get('errorMsg') or resp_b.get('error') or 'no order id'
+                if not ok_a: logger.error(f"[{timestamp}] ❌ YES Failed: {err_a}")
+                if not ok_b: logger.error(f"[{timestamp}] ❌ NO Failed: {err_b}")
+                # Roll back whichever leg made it onto the book
+                survivor = order_id_a if ok_a else (order_id_b if ok_b else None)
+                if survivor:
+                    print(f"[{timestamp}] 🔄 INITIATING ROLLBACK of {'YES' if ok_a else 'NO'} leg...")
+                    _, _, failed = self._cancel_orders([survivor])
+                    if failed: print(f"[{timestamp}] 🚨 ROLLBACK FAILED!")
+                    else: print(f"[{timestamp}] 🛡️ ROLLBACK SUCCESSFUL.")
+                if not survivor or not failed:
+                    self._journal('abort', market_id)
             else:
-                # Record for Hedge Chaser
-                self.hedge_pairs.append({
+                # Record for Hedge Chaser (and the fill stream)
+                self._track_pair({
                     "yes_id": order_id_a,
-                    "no_id": resp_b.get('orderID'),
+                    "no_id": order_id_b,
                     "yes_token": yes_token,
                     "no_token": no_token,
                     "size_yes": shares_yes,
                     "size_no": shares_no,
+                    "price_yes": float(f"{y_bid:.3f}"),
+                    "price_no": float(f"{n_bid:.3f}"),
                     "timestamp": datetime.now(),
                     "market_question": market.get('question'),
                     "chased": False,
@@ -175,101 +216,584 @@ class TradeExecutor:
                     "size_usd": size_usd
                 })
 
-                # Record successful trade in RiskManager for capital tracking
-                risk_manager.record_trade(event_id, market_id, size_usd)
+                # Both legs are live: the reservation becomes an open position
+                if not risk_manager.commit(reservation):
+                    risk_manager.record_trade(event_id, market_id, size_usd)
+                committed = True
 
         except Exception as e:
             err_str = str(e)
             print(f"[{timestamp}] ❌ Execution Error: {err_str}")
             if "403" in err_str or "blocked" in err_str.lower():
                 print(f"[{timestamp}] 🚨 CRITICAL: CLOUDFLARE BLOCK DETECTED. HALTING STRATEGY.")
-                risk_manager.is_halted = True
+                risk_manager.halt()
+        finally:
+            if not committed: risk_manager.release(reservation)
+
+    def _get_signed(self, token_id, price, shares):
+        """Pre-signed order from the cache when available, else sign now."""
+        if self.presign and self.presign.clob is self.clob:
+            return self.presign.take(token_id, price, shares)
+        order = OrderArgs(price=float(f"{price:.3f}"), size=int(shares), side="BUY", token_id=token_id)
+        return self.clob.create_order(order)
+
+    def prepare_market(self, market, obs, size_usd=None):
+        """
+        Keep orders pre-signed at the current best bid for a top candidate market.
+        Call on every book refresh; unchanged books cost nothing.
+        Returns the token ids now being kept signed.
+        """
+        if not self.presign or not obs or not obs.get('yes') or not obs.get('no'): return []
+        if size_usd is None:
+            size_usd = getattr(config, 'CURRENT_RUN_SIZE', getattr(config, 'MAKER_TRADE_SIZE_USD', config.TARGET_TRADE_SIZE_USD))
+        tids = market.get('clobTokenIds')
+        if isinstance(tids, str):
+            import json
+            tids = json.loads(tids)
+        if not tids or len(tids) < 2: return []
+        prepared = []
+        for token_id, raw in ((tids[0], obs['yes']), (tids[1], obs['no'])):
+            best_bid = from_poly_book(raw).best_bid()
+            if best_bid > 0:
+                self.presign.refresh(token_id, best_bid, size_usd)
+                prepared.append(token_id)
+        return prepared
+
+    def retain_presigned(self, token_ids):
+        """Drop the pre-signed orders of every token not in token_ids (markets that left the top set)."""
+        if not self.presign: return
+        self.presign.drop(set(self.presign.token_keys) - set(token_ids))
+
+    def _submit_pair(self, signed_yes, signed_no):
+        """
+        Post two pre-signed legs as close together as possible.
+        Uses the CLOB batch endpoint (one request, zero gap) when BATCH_ORDERS_ENABLED,
+        otherwise two posts in parallel threads.
+        A batch that fails without a usable answer may still have reached the exchange:
+        the open orders are checked first and only the legs not found are re-posted
+        (a re-post that comes back as a duplicate is looked up the same way).
+        Returns (resp_yes, resp_no, post_to_post_gap_ms, round_trip_ms).
+        """
+        tracer.mark('send')
+        t0 = time.perf_counter()
+        signed = [signed_yes, signed_no]
+        resps = [None, None]
+        if getattr(config, 'BATCH_ORDERS_ENABLED', True):
+            try:
+                batch = self.clob.post_orders([PostOrdersArgs(order=signed_yes, orderType=OrderType.GTC),
+                                               PostOrdersArgs(order=signed_no, orderType=OrderType.GTC)])
+                rtt_ms = (time.perf_counter() - t0) * 1000
+                if isinstance(batch, list) and len(batch) == 2:
+                    tracer.mark('ack')
+                    self._record_submit(0.0, rtt_ms)
+                    batch = self._resolve_duplicates(signed, batch)
+                    return batch[0], batch[1], 0.0, rtt_ms
+                logger.warning(f"⚠️ Unexpected batch response, reconciling before re-posting: {batch}")
+            except Exception as e:
+                logger.warning(f"⚠️ Batch post failed ({e}), reconciling before re-posting.")
+            resps = [{"success": True, "orderID": oid} if oid else None for oid in self._landed_ids(signed)]
+            t0 = time.perf_counter()
+
+        sent_at = {}
+        def post(leg, order):
+            sent_at[leg] = time.perf_counter()
+            try: return self.clob.post_order(order, OrderType.GTC)
+            except Exception as e: return {"success": False, "errorMsg": str(e)}
+
+        futs = {i: self.pool.submit(post, leg, signed[i]) for i, leg in enumerate(('yes', 'no')) if resps[i] is None}
+        for i, fut in futs.items():
+            resps[i] = fut.result() or {}
+        if futs: resps = self._resolve_duplicates(signed, resps)
+        tracer.mark('ack')
+        rtt_ms = (time.perf_counter() - t0) * 1000
+        gap_ms = abs(sent_at['yes'] - sent_at['no']) * 1000 if len(sent_at) == 2 else 0.0
+        self._record_submit(gap_ms, rtt_ms)
+        return resps[0], resps[1], gap_ms, rtt_ms
+
+    def _landed_ids(self, signed_orders):
+        """
+        Ids of still-resting open orders matching these signed orders (token, side,
+        price, size), by position (None = not resting, or the lookup failed).
+        Orders already tracked in a pair are never matched.
+        """
+        try:
+            open_orders = self.clob.get_orders() or []
+        except Exception as e:
+            logger.warning(f"⚠️ Open-orders lookup failed: {e}")
+            return [None] * len(signed_orders)
+        taken = set(self.pair_by_order)
+        found = []
+        for signed in signed_orders:
+            token, side, price, size = signed_terms(signed)
+            oid = next((o.get('id') for o in open_orders
+                        if o.get('id') not in taken and str(o.get('asset_id')) == token and o.get('side') == side
+                        and abs(float(o.get('price') or 0) - price) < 1e-4
+                        and abs(float(o.get('original_size') or 0) - size) < 1e-6), None)
+            if oid: taken.add(oid)
+            found.append(oid)
+        return found
+
+    @staticmethod
+    def _is_duplicate(resp):
+        msg = str(resp.get('errorMsg') or resp.get('error') or '').lower()
+        return not resp.get('success') and ('duplicat' in msg or 'already exists' in msg)
+
+    def _resolve_duplicates(self, signed_orders, resps):
+        """
+        A re-sent signed order that the exchange already has is rejected as a duplicate:
+        report it as posted, with its id when it is still resting (None when it already
+        matched or was cancelled).
+        """
+        dup = [i for i, r in enumerate(resps) if self._is_duplicate(r or {})]
+        if not dup: return resps
+        resps = list(resps)
+        for i, oid in zip(dup, self._landed_ids([signed_orders[i] for i in dup])):
+            logger.warning(f"⚠️ Order already on the exchange (duplicate post): {oid or 'no longer resting'}")
+            resps[i] = {"success": True, "orderID": oid, "duplicate": True}
+        return resps
+
+    def _record_submit(self, gap_ms, rtt_ms):
+        s = self.submit_stats
+        s["pairs"] += 1
+        s["gap_ms_total"] += gap_ms
+        s["gap_ms_max"] = max(s["gap_ms_max"], gap_ms)
+        s["rtt_ms_total"] += rtt_ms
+
+    def get_submit_stats(self):
+        """Average/max post-to-post gap and submit round trip over all pairs."""
+        s = self.submit_stats
+        n = s["pairs"] or 1
+        return {"pairs": s["pairs"], "avg_gap_ms": s["gap_ms_total"] / n,
+                "max_gap_ms": s["gap_ms_max"], "avg_rtt_ms": s["rtt_ms_total"] / n}
+
+    def on_order_update(self, order_id, size_matched, original_size=None, event_type=None):
+        """
+        Fill-stream callback (user WS thread). Records the order's fill state and, if it
+        belongs to an open hedge pair, evaluates that pair right away instead of
+        waiting for the next REST poll.
+        """
+        state = {"size_matched": size_matched, "original_size": original_size,
+                 "cancelled": event_type == 'CANCELLATION'}
+        with self.hedge_lock:
+            self.order_fills[order_id] = state
+            pair = self.pair_by_order.get(order_id)
+            record = dict(state)  # Journalled outside the lock: the shared entry may be popped (pair closed) meanwhile
+        self._note_fill(order_id, size_matched)
+        if pair:
+            self._journal('fill', order_id, record)
+            # REST calls (cancel / chase) must not block the WS thread
+            self.pool.submit(self._evaluate_from_stream, pair)
+
+    def _stream_status(self, pair, leg):
+        """Order status dict for one leg built from fill-stream state (unseen = nothing matched)."""
+        state = self.order_fills.get(pair[f'{leg}_id']) or {}
+        return {"size_matched": state.get("size_matched") or 0,
+                "original_size": state.get("original_size") or pair[f'size_{leg}']}
+
+    def _evaluate_from_stream(self, pair):
+        with self.hedge_lock:
+            if pair.get('busy') or not any(p is pair for p in self.hedge_pairs): return
+            pair['busy'] = True
+            status_a, status_b = self._stream_status(pair, 'yes'), self._stream_status(pair, 'no')
+        closed = []
+        try:
+            fill_a, fill_b = self._is_filled(status_a), self._is_filled(status_b)
+            if (fill_a != fill_b) and not pair.get('fill_event_at'):
+                pair['fill_event_at'] = datetime.now()
+                grace = getattr(config, 'HEDGE_FILL_GRACE_SEC', 0)
+                if grace > 0:
+                    # Give the other leg a moment to fill naturally, then decide again
+                    t = threading.Timer(grace, self._evaluate_from_stream, args=(pair,))
+                    t.daemon = True
+                    t.start()
+            action = self._decide_pair(pair, status_a, status_b, datetime.now())
+            if action: closed = self._apply_actions([(pair, action)])
+        except Exception as e:
+            logger.error(f"❌ Error handling fill event: {e}")
+        finally:
+            with self.hedge_lock:
+                pair['busy'] = False
+                if closed: self._forget_pair(pair)
+
+    def _track_pair(self, pair, journal=True):
+        if journal: self._journal('ack', pair['market_id'], pair_to_record(pair))
+        pnl_ledger.register_market(pair['market_id'], pair['yes_token'], pair['no_token'])
+        with self.hedge_lock:
+            self.hedge_pairs.append(pair)
+            self.pair_by_order[pair['yes_id']] = pair
+            self.pair_by_order[pair['no_id']] = pair
+            for leg in ('yes', 'no'):
+                self.order_meta[pair[f'{leg}_id']] = (pair[f'{leg}_token'], pair.get(f'price_{leg}', 0.0), pair[f'size_{leg}'])
+            seen = pair['yes_id'] in self.order_fills or pair['no_id'] in self.order_fills
+        if seen:
+            # Fill arrived on the stream before the pair was registered
+            self.pool.submit(self._evaluate_from_stream, pair)
+
+    def _forget_pair(self, pair):
+        self._journal('close', pair['market_id'])
+        with self.hedge_lock:
+            self.hedge_pairs = [p for p in self.hedge_pairs if p is not pair]
+            for oid in (pair['yes_id'], pair['no_id']):
+                self.pair_by_order.pop(oid, None)
+                self.order_fills.pop(oid, None)
+                self.closed_orders.pop(oid, None)
+                self.order_meta.pop(oid, None)
+                self.filled_qty.pop(oid, None)
+                self.chase_orders.pop(oid, None)
+
+    def _journal(self, kind, key, data=None):
+        if not self.journal: return
+        try: self.journal.append(kind, key, data)
+        except Exception as e: logger.error(f"❌ Journal write failed ({kind}): {e}")
+
+    def recover(self):
+        """
+        Rebuild hedge pairs, fill state and risk exposure from the journal, then
+        reconcile once against the exchange with a single open-orders call.
+        Orders posted for an intent that never got acked are cancelled in one batch.
+        """
+        t0 = time.perf_counter()
+        state = self.journal.replay()
+        for rec in state["pairs"].values():
+            pair = pair_from_record(rec)
+            self._track_pair(pair, journal=False)
+            risk_manager.record_trade(pair['event_id'], pair['market_id'], pair['size_usd'])
+        self.order_fills.update(state["fills"])
+        replay_ms = (time.perf_counter() - t0) * 1000
+
+        orphans, moved = [], 0
+        if self.clob and (state["pairs"] or state["intents"]):
+            try:
+                open_orders = self.clob.get_orders() or []
+                known = set(self.pair_by_order)
+                intent_tokens = {t for i in state["intents"].values() for t in (i.get('yes_token'), i.get('no_token'))}
+                orphans = [o['id'] for o in open_orders if o.get('id') not in known and o.get('asset_id') in intent_tokens]
+                if orphans:
+                    self._cancel_orders(orphans)
+                # Legs that left the book while we were down (filled / cancelled) are
+                # resolved by the first hedge check, which runs right after startup
+                open_ids = {o.get('id') for o in open_orders}
+                moved = sum(1 for p in self.hedge_pairs if p['yes_id'] not in open_ids or p['no_id'] not in open_ids)
+            except Exception as e:
+                logger.error(f"❌ Startup reconcile failed: {e}")
+        for market_id in list(state["intents"]):
+            self._journal('abort', market_id)
+        self.journal.compact()
+
+        if self.hedge_pairs or orphans:
+            logger.info(f"♻️ RECOVERED {len(self.hedge_pairs)} hedge pairs from journal in {replay_ms:.1f}ms "
+                        f"({moved} changed while offline, {len(orphans)} orphan orders cancelled)")
+
+    def pair_for_market(self, market_id):
+        with self.hedge_lock:
+            return next((p for p in self.hedge_pairs if p['market_id'] == market_id), None)
+
+    def replace_legs(self, batch):
+        """
+        Move resting legs to new prices: batch is [(pair, {'yes'|'no': new_price})].
+        One bulk cancel, then one batch post for the legs whose cancel was confirmed.
+        A leg that is gone (matched meanwhile) is left to the hedge chaser.
+        Returns the number of legs replaced.
+        """
+        with self.hedge_lock:
+            jobs = []
+            for pair, changes in batch:
+                if pair.get('busy') or not any(p is pair for p in self.hedge_pairs): continue
+                pair['busy'] = True
+                jobs.append((pair, changes))
+        if not jobs: return 0
+
+        replaced, pulled = 0, []
+        try:
+            cancelled, _, _ = self._cancel_orders([pair[f'{leg}_id'] for pair, changes in jobs for leg in changes])
+            posts = [(pair, leg, price) for pair, changes in jobs for leg, price in changes.items()
+                     if pair[f'{leg}_id'] in cancelled]
+            if not posts: return 0
+            signed = [self._get_signed(pair[f'{leg}_token'], price, pair[f'size_{leg}']) for pair, leg, price in posts]
+            for (pair, leg, price), resp in zip(posts, self._post_orders(signed)):
+                old_id = pair[f'{leg}_id']
+                if resp.get('success') and resp.get('orderID'):
+                    with self.hedge_lock:
+                        pair[f'{leg}_id'] = resp['orderID']
+                        pair[f'price_{leg}'] = float(f"{price:.3f}")
+                        self.pair_by_order.pop(old_id, None)
+                        self.order_fills.pop(old_id, None)
+                        self.pair_by_order[resp['orderID']] = pair
+                        self.order_meta.pop(old_id, None)
+                        self.order_meta[resp['orderID']] = (pair[f'{leg}_token'], pair[f'price_{leg}'], pair[f'size_{leg}'])
+                    self._journal('replace', pair['market_id'], {"leg": leg, "order_id": resp['orderID'], "price": pair[f'price_{leg}']})
+                    replaced += 1
+                    logger.info(f"🔁 REQUOTE: {leg.upper()} -> {price:.3f} for '{pair['market_question'][:30]}'")
+                else:
+                    logger.error(f"🚨 REQUOTE FAILED ({leg.upper()}): {resp.get('errorMsg')}")
+                    if not any(p is pair for p in pulled): pulled.append(pair)
+
+            # A leg that could not be re-posted is off the book: pull the whole pair
+            # (nothing has matched on either leg, requotes only touch untouched pairs)
+            if pulled:
+                _, _, failed = self._cancel_orders([pair[f'{leg}_id'] for pair in pulled for leg in ('yes', 'no')])
+                for pair in pulled:
+                    if pair['yes_id'] in failed or pair['no_id'] in failed: continue  # Chaser / rotation picks it up later
+                    risk_manager.release_trade(pair['event_id'], pair['market_id'], pair['size_usd'])
+                    pair['closed'] = True
+        except Exception as e:
+            logger.error(f"❌ Requote Error: {e}")
+        finally:
+            with self.hedge_lock:
+                for pair, _ in jobs:
+                    pair['busy'] = False
+                    if pair.pop('closed', False): self._forget_pair(pair)
+        return replaced
+
+    def fill_stream_alive(self):
+        return bool(self.fill_stream and self.fill_stream.is_alive())
+
+    @staticmethod
+    def _is_filled(status):
+        return float(status.get('size_matched', 0)) >= float(status.get('original_size', 0))
+
+    def _decide_pair(self, pair, status_a, status_b, now):
+        """
+        Decide what to do with one hedge pair given both legs' order status.
+        Returns None (keep waiting), ('filled', None), ('chase', leg) or ('rotate', None).
+        """
+        timeout = getattr(config, 'HEDGE_TIMEOUT_SEC', 300)
+
+        # Check if both are completely filled
+        fill_a = self._is_filled(status_a)
+        fill_b = self._is_filled(status_b)
+
+        if fill_a and fill_b:
+            return ('filled', None)
+
+        # 2. Check for "Hanging" state (One filled, one not): after the timeout when
+        # polling, or once the fill-event grace period is over when streaming
+        pair_age = (now - pair['timestamp']).total_seconds()
+        fill_event_at = pair.get('fill_event_at')
+        hang_age = (now - fill_event_at).total_seconds() if fill_event_at else None
+        grace = getattr(config, 'HEDGE_FILL_GRACE_SEC', 0)
+
+        if pair_age > timeout or (hang_age is not None and hang_age >= grace):
+            leg = None
+            if fill_a and not fill_b:
+                leg = {"id": pair['no_id'], "token": pair['no_token'], "size": pair['size_no'], "side": "NO"}
+            elif fill_b and not fill_a:
+                leg = {"id": pair['yes_id'], "token": pair['yes_token'], "size": pair['size_yes'], "side": "YES"}
+            if leg:
+                leg["waited"] = f"{hang_age:.2f}s after fill" if hang_age is not None else f"{int(pair_age)}s"
+                return ('chase', leg)
+
+        # 3. New STALE ORDER ROTATION (Capital Recycling)
+        # If BOTH sides are unfilled (0 shares matched) after 20 mins, cancel both.
+        stale_timeout = getattr(config, 'MAKER_ORDER_STALE_SEC', 1200)
+        if pair_age > stale_timeout and float(status_a.get('size_matched', 0)) == 0 and float(status_b.get('size_matched', 0)) == 0:
+            return ('rotate', None)
+        return None
+
+    def _note_fill(self, order_id, size_matched):
+        """
+        Book the newly matched part of one of our orders into the PnL ledger.
+        Called from the user WS thread, the status poll and the chase pool: the
+        delta is taken and booked under hedge_lock so a fill reported twice is booked once.
+        """
+        with self.hedge_lock:
+            meta = self.order_meta.get(order_id)
+            if not meta: return
+            token_id, price, size = meta
+            delta = size_matched - self.filled_qty.get(order_id, 0.0)
+            if delta <= 1e-9: return
+            self.filled_qty[order_id] = size_matched
+            pnl_ledger.on_fill(token_id, "BUY", delta, price)
+            if size_matched >= size - 1e-9 and order_id not in self.pair_by_order:
+                self.order_meta.pop(order_id, None)  # Completed chase order: nothing more to book
+                self.filled_qty.pop(order_id, None)
+
+    def _book_chase(self, resp, leg, limit_price):
+        """Register a chase order for fill booking; a taker match is booked right away at its real price."""
+        order_id = resp.get('orderID')
+        if not order_id:
+            logger.warning(f"⚠️ Chase for {leg['side']} landed earlier (duplicate) and is no longer resting: fill not booked")
+            return
+        price = limit_price
+        book = poly_ws.orderbooks.get(leg['token'])
+        if book: price = from_poly_book(book).best_ask() or limit_price
+        making, taking = float(resp.get('makingAmount') or 0), float(resp.get('takingAmount') or 0)
+        if making > 0 and taking > 0: price = making / taking  # BUY: USDC paid / shares received
+        with self.hedge_lock:
+            self.order_meta[order_id] = (leg['token'], price, float(leg['size']))
+        if taking > 0: self._note_fill(order_id, taking)
+
+    def _apply_actions(self, actions):
+        """
+        Carry out the decisions for many pairs with grouped requests: one bulk cancel
+        for every hanging leg and stale order, then one batch post for all chase orders.
+        Releases risk for closed pairs and returns them.
+        """
+        to_cancel = []
+        for pair, (kind, leg) in actions:
+            if kind == 'chase':
+                logger.warning(f"⚠️ HEDGE HANGING! ({leg['waited']}) Chasing {leg['side']} for '{pair['market_question'][:30]}'")
+                to_cancel.append(leg['id'])
+            elif kind == 'rotate':
+                logger.info(f"♻️ ROTATION: Canceling stale unfilled trade for '{pair['market_question'][:30]}'")
+                to_cancel += [pair['yes_id'], pair['no_id']]
+
+        # STEP 1: Cancel hanging limit orders and stale pairs in one go
+        cancelled, gone, failed = self._cancel_orders(to_cancel)
+
+        closed, chases = [], []
+        for pair, (kind, leg) in actions:
+            if kind == 'filled':
+                logger.info(f"✅ Hedge Fully Filled: {pair['market_question'][:30]}")
+                closed.append(pair)
+            elif kind == 'rotate':
+                if pair['yes_id'] in failed or pair['no_id'] in failed:
+                    logger.error(f"❌ Rotation Cleanup Failed: cancel not confirmed, retrying next cycle")
+                else:
+                    closed.append(pair)
+            elif kind == 'chase':
+                if leg['id'] in failed: continue  # Leg may still be live: chasing now could double-fill
+                if leg['id'] in gone and self._is_filled(self._order_status(leg['id'])):
+                    logger.info(f"✅ Hedge Fully Filled: {pair['market_question'][:30]} ({leg['side']} filled before cancel)")
+                    closed.append(pair)
+                    continue
+                chases.append((pair, leg))
+
+        # STEP 2: Place MARKET-LIKE ORDERS (Aggressive Taker) to close the gaps
+        # We use a cap from config to ensure we don't overpay for a hedge.
+        if chases:
+            chase_price = getattr(config, 'MAX_CHASE_PRICE', 0.99)
+            # One signed chase per leg: a retry after a lost response is rejected as a
+            # duplicate (and reported as posted) instead of buying the hedge twice
+            signed = []
+            for _, leg in chases:
+                order = self.chase_orders.get(leg['id'])
+                if order is None:
+                    order = self.chase_orders[leg['id']] = self.clob.create_order(
+                        OrderArgs(price=chase_price, size=int(leg['size']), side="BUY", token_id=leg['token']))
+                signed.append(order)
+            for (pair, leg), resp in zip(chases, self._post_orders(signed)):
+                if resp.get('success'):
+                    self.chase_orders.pop(leg['id'], None)
+                    self._book_chase(resp, leg, chase_price)
+                    logger.info(f"🛡️ CHASE SUCCESSFUL: {leg['side']} filled via Market Order.")
+                    pair['chased'] = True
+                    closed.append(pair)
+                else:
+                    logger.error(f"🚨 CHASE FAILED: {resp.get('errorMsg')}")
+
+        for pair in closed:
+            # SIGNAL RISK MANAGER: Free up the slot and capital
+            risk_manager.release_trade(pair['event_id'], pair['market_id'], pair['size_usd'])
+        return closed
+
+    def _cancel_orders(self, order_ids, attempts=3):
+        """
+        Cancel many orders with one request per attempt. Cancelling is idempotent, so
+        transport errors are retried (with backoff) for the ids still unresolved.
+        Returns (cancelled, gone, failed): gone are ids the exchange refused because the
+        order is no longer live (matched or already cancelled), failed never got an answer.
+        """
+        pending = list(dict.fromkeys(i for i in order_ids if i))
+        cancelled, gone = set(), set()
+        for attempt in range(attempts):
+            if not pending: break
+            try:
+                resp = self.clob.cancel_orders(pending) or {}
+                cancelled.update(resp.get('canceled') or [])
+                gone.update((resp.get('not_canceled') or {}).keys())
+                pending = [i for i in pending if i not in cancelled and i not in gone]
+            except Exception as e:
+                logger.warning(f"⚠️ Bulk cancel failed (attempt {attempt + 1}/{attempts}): {e}")
+                time.sleep(0.2 * 2 ** attempt)
+        return cancelled, gone, set(pending)
+
+    def _post_orders(self, signed_orders, attempts=3):
+        """
+        Batch-post signed GTC orders. Retries resend the SAME signed orders, so an
+        order that already landed is rejected as a duplicate instead of filled twice;
+        duplicates are reported as posted (see _resolve_duplicates). When no attempt
+        gets an answer, orders found resting on the book are reported as posted too.
+        """
+        for attempt in range(attempts):
+            try:
+                resps = self.clob.post_orders([PostOrdersArgs(order=o, orderType=OrderType.GTC) for o in signed_orders])
+                if isinstance(resps, list) and len(resps) == len(signed_orders):
+                    return self._resolve_duplicates(signed_orders, resps)
+                logger.warning(f"⚠️ Unexpected batch response: {resps}")
+                break
+            except Exception as e:
+                logger.warning(f"⚠️ Batch post failed (attempt {attempt + 1}/{attempts}): {e}")
+                time.sleep(0.2 * 2 ** attempt)
+        return [{"success": True, "orderID": oid} if oid else {"success": False, "errorMsg": "batch post failed"}
+                for oid in self._landed_ids(signed_orders)]
+
+    def _order_status(self, order_id):
+        """Status of an order that left the open-orders list. Its state is final, so cache it."""
+        status = self.closed_orders.get(order_id)
+        if status is None:
+            status = self.clob.get_order(order_id) or {}
+            if status: self.closed_orders[order_id] = status
+        return status
+
+    def _fetch_order_states(self, order_ids):
+        """
+        Status of many orders from ONE open-orders call. Orders missing from it are
+        filled or cancelled; those come from the fill stream when it already saw them
+        complete, otherwise from a single cached lookup.
+        """
+        open_orders = {o.get('id'): o for o in (self.clob.get_orders() or [])}
+        states = {}
+        for oid in order_ids:
+            if oid in open_orders:
+                states[oid] = open_orders[oid]
+                continue
+            streamed = self.order_fills.get(oid)
+            if streamed and streamed.get('original_size') and self._is_filled(streamed):
+                states[oid] = streamed
+            else:
+                states[oid] = self._order_status(oid)
+        for oid, st in states.items():
+            self._note_fill(oid, float((st or {}).get('size_matched') or 0))
+        return states
 
     def check_and_chase_hedges(self):
         """
-        Loops through active hedge pairs. If one side is filled and the other isn't 
-        (after timeout), it cancels the bid and market-buys the missing side.
+        REST reconciliation of active hedge pairs. If one side is filled and the other
+        isn't (after timeout), it cancels the bid and market-buys the missing side.
+        With the user fill stream up this only catches missed events and stale
+        rotation; one-sided fills are normally chased from on_order_update.
+        A cycle costs one open-orders call, one bulk cancel and one batch post,
+        however many pairs are open.
         """
         if not self.clob or not self.hedge_pairs:
             return
 
-        import time
         now = datetime.now()
-        timeout = getattr(config, 'HEDGE_TIMEOUT_SEC', 300)
-        
-        remaining_pairs = []
-        for pair in self.hedge_pairs:
-            if pair.get('chased'): continue
-            
-            try:
-                # 1. Check Status of both orders
-                status_a = self.clob.get_order(pair['yes_id'])
-                status_b = self.clob.get_order(pair['no_id'])
-                
-                # Check if both are completely filled
-                fill_a = float(status_a.get('size_matched', 0)) >= float(status_a.get('original_size', 0))
-                fill_b = float(status_b.get('size_matched', 0)) >= float(status_b.get('original_size', 0))
-
-                if fill_a and fill_b:
-                    logger.info(f"✅ Hedge Fully Filled: {pair['market_question'][:30]}")
-                    # SIGNAL RISK MANAGER: Free up the slot and capital
-                    risk_manager.release_trade(pair['event_id'], pair['market_id'], pair['size_usd'])
-                    continue # Successfully closed!
-
-                # 2. Check for "Hanging" state (One filled, one not) after timeout
-                pair_age = (now - pair['timestamp']).total_seconds()
-                
-                if pair_age > timeout:
-                    target_id = None
-                    target_token = None
-                    target_size = None
-                    side_name = ""
-
-                    if fill_a and not fill_b:
-                        target_id, target_token, target_size, side_name = pair['no_id'], pair['no_token'], pair['size_no'], "NO"
-                    elif fill_b and not fill_a:
-                        target_id, target_token, target_size, side_name = pair['yes_id'], pair['yes_token'], pair['size_yes'], "YES"
-
-                    if target_id:
-                        logger.warning(f"⚠️ HEDGE HANGING! ({int(pair_age)}s) Chasing {side_name} for '{pair['market_question'][:30]}'")
-                        
-                        # STEP 1: Cancel the hanging Limit Order
-                        try: self.clob.cancel(target_id)
-                        except: pass
-                        
-                        # STEP 2: Place a MARKET-LIKE ORDER (Aggressive Taker) to close the gap
-                        # We use a cap from config to ensure we don't overpay for a hedge.
-                        chase_price = getattr(config, 'MAX_CHASE_PRICE', 0.99)
-                        chase_args = OrderArgs(price=chase_price, size=int(target_size), side="BUY", token_id=target_token)
-                        signed_chase = self.clob.create_order(chase_args)
-                        resp = self.clob.post_order(signed_chase)
-                        
-                        if resp.get('success'):
-                            logger.info(f"🛡️ CHASE SUCCESSFUL: {side_name} filled via Market Order.")
-                            pair['chased'] = True
-                            # SIGNAL RISK MANAGER: Free up the slot and capital
-                            risk_manager.release_trade(pair['event_id'], pair['market_id'], pair['size_usd'])
-                            continue
-                        else:
-                            logger.error(f"🚨 CHASE FAILED: {resp.get('errorMsg')}")
-
-                # 3. New STALE ORDER ROTATION (Capital Recycling)
-                # If BOTH sides are unfilled (0 shares matched) after 20 mins, cancel both.
-                stale_timeout = getattr(config, 'MAKER_ORDER_STALE_SEC', 1200)
-                if pair_age > stale_timeout and float(status_a.get('size_matched', 0)) == 0 and float(status_b.get('size_matched', 0)) == 0:
-                    logger.info(f"♻️ ROTATION: Canceling stale unfilled trade for '{pair['market_question'][:30]}'")
-                    try:
-                        self.clob.cancel(pair['yes_id'])
-                        self.clob.cancel(pair['no_id'])
-                        # SIGNAL RISK MANAGER: Free up the slot and capital
-                        risk_manager.release_trade(pair['event_id'], pair['market_id'], pair['size_usd'])
-                        continue # Removed from active tracking
-                    except Exception as e:
-                        logger.error(f"❌ Rotation Cleanup Failed: {e}")
-
-                remaining_pairs.append(pair)
-            except Exception as e:
-                logger.error(f"❌ Error checking hedge pair: {e}")
-                remaining_pairs.append(pair)
+        with self.hedge_lock:
+            pairs = []
+            for pair in list(self.hedge_pairs):
+                if pair.get('chased'):
+                    self._forget_pair(pair)
+                elif not pair.get('busy'):  # A fill event may be handling it right now
+                    pair['busy'] = True
+                    pairs.append(pair)
+        if not pairs: return
 
-        self.hedge_pairs = remaining_pairs
+        closed = []
+        try:
+            # 1. Check Status of every order in one request
+            states = self._fetch_order_states([oid for p in pairs for oid in (p['yes_id'], p['no_id'])])
+            actions = []
+            for pair in pairs:
+                action = self._decide_pair(pair, states.get(pair['yes_id']) or {}, states.get(pair['no_id']) or {}, now)
+                if action: actions.append((pair, action))
+            if actions: closed = self._apply_actions(actions)
+        except Exception as e:
+            logger.error(f"❌ Error checking hedge pairs: {e}")
+        finally:
+            with self.hedge_lock:
+                for pair in pairs:
+                    pair['busy'] = False
+                for pair in closed:
+                    self._forget_pair(pair)
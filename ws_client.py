@@ -2,6 +2,7 @@ import json
 import threading
 import websocket
 import time
+from latency_tracer import now_ns
 
 class PolyWebSocket:
     """
@@ -12,24 +13,39 @@ class PolyWebSocket:
         self.ws_url = "wss://ws-live-data.polymarket.com"
         self.orderbooks = {} # {asset_id: orderbook}
         self.last_update = {} # {asset_id: timestamp}
-        self.active_subscriptions = [] # To resubscribe after disconnect
+        self.active_subscriptions = set() # Every asset subscribed so far (resubscribed after a disconnect)
+        self.listeners = [] # Callbacks fn(asset_id, book) fired on every book update
+        self.recv_ns = {} # {asset_id: frame receive time (monotonic ns)}
+        self.apply_ns = {} # {asset_id: book applied to cache (monotonic ns)}
         self.ws = None
         self.thread = None
 
     def on_message(self, ws, message):
+        recv_ns = now_ns()
         data = json.loads(message)
         now = time.time()
         # Handle CLOB book updates
         if isinstance(data, list):
             for item in data:
                 if item.get('event_type') == 'book':
-                    asset_id = item.get('asset_id')
-                    self.orderbooks[asset_id] = item
-                    self.last_update[asset_id] = now
+                    self._apply_book(item, now, recv_ns)
         elif data.get('event_type') == 'book':
-            asset_id = data.get('asset_id')
-            self.orderbooks[asset_id] = data
-            self.last_update[asset_id] = now
+            self._apply_book(data, now, recv_ns)
+
+    def _apply_book(self, book, now, recv_ns=None):
+        asset_id = book.get('asset_id')
+        self.orderbooks[asset_id] = book
+        self.last_update[asset_id] = now
+        self.recv_ns[asset_id] = recv_ns or now_ns()
+        self.apply_ns[asset_id] = now_ns()
+        for listener in self.listeners:
+            try: listener(asset_id, book)
+            except Exception as e: print(f"WS listener error: {e}")
+
+    def add_listener(self, fn):
+        """Register fn(asset_id, book), called on the WS thread for every book update."""
+        if fn not in self.listeners:
+            self.listeners.append(fn)
 
     def on_error(self, ws, error):
         print(f"WS Error: {error}")
@@ -44,11 +60,19 @@ class PolyWebSocket:
         # Automatic Resubscription
         if self.active_subscriptions:
             print(f"🔄 Resubscribing to {len(self.active_subscriptions)} markets...")
-            self.subscribe(self.active_subscriptions)
+            self._send_subscribe(sorted(self.active_subscriptions))
 
     def subscribe(self, asset_ids):
-        """Subscribe to orderbook updates for specific assets."""
-        self.active_subscriptions = asset_ids # Store for reconnects
+        """
+        Subscribe to orderbook updates for these assets, in addition to the ones
+        already subscribed (several scanners share this connection).
+        """
+        new = [a for a in dict.fromkeys(asset_ids) if a not in self.active_subscriptions]
+        if not new: return
+        self.active_subscriptions.update(new)
+        self._send_subscribe(new)
+
+    def _send_subscribe(self, asset_ids):
         payload = {
             "type": "subscribe",
             "market_ids": asset_ids,
@@ -57,6 +81,11 @@ class PolyWebSocket:
         if self.ws and self.ws.sock and self.ws.sock.connected:
             self.ws.send(json.dumps(payload))
 
+    def trace_stamps(self, asset_id):
+        """Latency-trace seed for the cached book of this asset: [('ws_recv', ns), ('book_apply', ns)]."""
+        if asset_id not in self.apply_ns: return []
+        return [('ws_recv', self.recv_ns[asset_id]), ('book_apply', self.apply_ns[asset_id])]
+
     def is_fresh(self, asset_id, max_age_sec=60):
         """Check if cached data for this asset is recent."""
         last = self.last_update.get(asset_id, 0)
@@ -74,5 +103,89 @@ class PolyWebSocket:
         self.thread.daemon = True
         self.thread.start()
 
+
+class PolyUserWebSocket:
+    """
+    Authenticated user channel: pushes our own order updates as they happen.
+    'order' events (PLACEMENT / UPDATE / CANCELLATION) carry the cumulative
+    size_matched, so each one is a complete fill state for that order and is
+    forwarded as fn(order_id, size_matched, original_size, event_type).
+    """
+    PING_INTERVAL_SEC = 10
+
+    def __init__(self, api_key, secret, passphrase, on_order=None):
+        self.ws_url = "wss://ws-subscriptions-clob.polymarket.com/ws/user"
+        self.auth = {"apiKey": api_key, "secret": secret, "passphrase": passphrase}
+        self.listeners = [on_order] if on_order else []
+        self.last_message = 0
+        self.running = False
+        self.ws = None
+        self.thread = None
+
+    def add_listener(self, fn):
+        if fn not in self.listeners:
+            self.listeners.append(fn)
+
+    def on_message(self, ws, message):
+        self.last_message = time.time()
+        if message == "PONG": return
+        try: data = json.loads(message)
+        except ValueError: return
+        for item in (data if isinstance(data, list) else [data]):
+            if item.get('event_type') == 'order':
+                self._apply_order(item)
+
+    def _apply_order(self, event):
+        order_id = event.get('id')
+        if not order_id: return
+        size_matched = float(event.get('size_matched') or 0)
+        original_size = float(event.get('original_size') or 0)
+        for listener in self.listeners:
+            try: listener(order_id, size_matched, original_size, event.get('type'))
+            except Exception as e: print(f"User WS listener error: {e}")
+
+    def on_error(self, ws, error):
+        print(f"User WS Error: {error}")
+
+    def on_close(self, ws, close_status_code, close_msg):
+        if not self.running: return
+        print("### User WS Closed - Reconnecting in 5s ###")
+        time.sleep(5)
+        self.start()
+
+    def on_open(self, ws):
+        print("### User WS Opened ###")
+        ws.send(json.dumps({"auth": self.auth, "type": "user", "markets": []}))
+
+    def _keepalive(self, ws):
+        while self.running and self.ws is ws:
+            time.sleep(self.PING_INTERVAL_SEC)
+            try:
+                if ws.sock and ws.sock.connected: ws.send("PING")
+            except Exception: pass
+
+    def is_alive(self, max_silence_sec=30):
+        """Connected and heard from recently (PONGs count), so fills can be trusted to arrive."""
+        connected = bool(self.ws and self.ws.sock and self.ws.sock.connected)
+        return connected and (time.time() - self.last_message) < max_silence_sec
+
+    def start(self):
+        self.running = True
+        self.ws = websocket.WebSocketApp(
+            self.ws_url,
+            on_message=self.on_message,
+            on_error=self.on_error,
+            on_close=self.on_close,
+            on_open=self.on_open
+        )
+        self.thread = threading.Thread(target=self.ws.run_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        threading.Thread(target=self._keepalive, args=(self.ws,), daemon=True).start()
+
+    def stop(self):
+        self.running = False
+        if self.ws: self.ws.close()
+
 # Singleton instance
 poly_ws = PolyWebSocket()